@@ -0,0 +1,115 @@
+"""
+Benchmarks decoding of responses: time and allocations per command.
+
+Compares the current Response (slotted, with memoized message fields and the
+orjson backend if installed) to a plain decoding of every response, in which
+message fields are re-parsed on every access.
+
+Usage: python benchmarks/decoding.py [--commands N] [--accesses N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Dict
+from urllib.parse import parse_qsl
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+sys.path.insert(0, SRC_DIR)
+
+from heos._compat import orjson  # noqa: E402
+from heos.client import Response  # noqa: E402
+
+LINE = json.dumps(
+    {
+        "heos": {
+            "command": "player/get_volume",
+            "result": "success",
+            "message": "pid=-1465850739&level=20",
+        }
+    }
+).encode("utf-8")
+
+
+@dataclass
+class PlainResponse:
+    """Response as decoded before memoization (for comparison)."""
+
+    command: str
+    result: str
+    message: str
+    payload: Dict[str, Any]
+
+    @classmethod
+    def from_bytes(cls, bytes_: bytes):
+        data = json.loads(bytes_.decode("utf-8"))
+        return cls(
+            command=data["heos"]["command"],
+            result=data["heos"].get("result"),
+            message=data["heos"].get("message", ""),
+            payload=data.get("payload"),
+        )
+
+    @property
+    def message_fields(self) -> Dict[str, str]:
+        return dict(parse_qsl(self.message))
+
+
+def run(cls, n_commands, n_accesses):
+    # Everything that is allocated is kept alive (including the result of
+    # every message_fields access), so that allocations show up in a snapshot.
+    kept = []
+    for _ in range(n_commands):
+        response = cls.from_bytes(LINE)
+        kept.append(response)
+        for _ in range(n_accesses):
+            kept.append(response.message_fields)
+    return kept
+
+
+def measure(cls, n_commands, n_accesses):
+    start = time.perf_counter()
+    run(cls, n_commands, n_accesses)
+    elapsed = time.perf_counter() - start
+
+    # Measure allocations separately, as tracing slows everything down.
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = run(cls, n_commands, n_accesses)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in stats)
+    size = sum(stat.size_diff for stat in stats)
+    del kept
+
+    return elapsed, blocks, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--commands", type=int, default=20000)
+    parser.add_argument("--accesses", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"{args.commands} responses, {args.accesses} message field accesses each"
+        f" (JSON backend: {'orjson' if orjson is not None else 'json'})"
+    )
+
+    for label, cls in [("plain", PlainResponse), ("current", Response)]:
+        elapsed, blocks, size = measure(cls, args.commands, args.accesses)
+        print(
+            f"{label:<10} {elapsed / args.commands * 1e6:7.2f} us/command"
+            f"  {blocks / args.commands:6.1f} blocks/command"
+            f"  {size / args.commands:7.1f} bytes/command"
+        )
+
+
+if __name__ == "__main__":
+    main()
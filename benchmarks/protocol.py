@@ -0,0 +1,219 @@
+"""
+Benchmarks the HEOS protocol stack against the in-process device simulator.
+
+Reports command throughput and latency (sync client, pooled players and the
+pipelining async client), discovery wall time and CLI cold-start time.
+
+Usage: python benchmarks/protocol.py [--devices N] [--latency S] [--jitter S]
+                                     [--commands N] [--in-flight N] [--repeat N]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+sys.path.insert(0, SRC_DIR)
+
+from heos.aio import AsyncClient  # noqa: E402
+from heos.client import Client  # noqa: E402
+from heos.pool import ConnectionPool  # noqa: E402
+from heos.registry import Registry  # noqa: E402
+from heos.simulator import Simulator  # noqa: E402
+
+
+def percentile(timings, pct):
+    timings = sorted(timings)
+    index = min(len(timings) - 1, int(round(pct / 100 * (len(timings) - 1))))
+    return timings[index]
+
+
+def report_latency(label, timings, elapsed):
+    print(
+        f"{label:<32} {len(timings) / elapsed:9.0f} cmd/s"
+        f"  p50 {percentile(timings, 50) * 1000:7.2f} ms"
+        f"  p99 {percentile(timings, 99) * 1000:7.2f} ms"
+    )
+
+
+def report_wall(label, timings):
+    print(
+        f"{label:<32} median {statistics.median(timings) * 1000:8.2f} ms"
+        f"  min {min(timings) * 1000:8.2f} ms"
+    )
+
+
+def bench_client(host, pid, n_commands):
+    """Sequential commands over a single sync client."""
+
+    timings = []
+
+    with Client(host) as client:
+        start = time.perf_counter()
+        for _ in range(n_commands):
+            t0 = time.perf_counter()
+            client.send_command("player/get_volume", params={"pid": pid})
+            timings.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+
+    return timings, elapsed
+
+
+def bench_player(registry, n_commands):
+    """Sequential property reads through pooled players, round-robin."""
+
+    players = list(registry.players.values())
+    timings = []
+
+    start = time.perf_counter()
+    for idx in range(n_commands):
+        t0 = time.perf_counter()
+        players[idx % len(players)].volume
+        timings.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+
+    return timings, elapsed
+
+
+def bench_async(host, pid, n_commands, in_flight):
+    """Pipelined commands over a single async client."""
+
+    async def _run():
+        client = AsyncClient(host)
+        await client.connect()
+
+        timings = []
+        semaphore = asyncio.Semaphore(in_flight)
+
+        async def _send():
+            async with semaphore:
+                t0 = time.perf_counter()
+                await client.send_command("player/get_volume", params={"pid": pid})
+                timings.append(time.perf_counter() - t0)
+
+        try:
+            start = time.perf_counter()
+            await asyncio.gather(*(_send() for _ in range(n_commands)))
+            elapsed = time.perf_counter() - start
+        finally:
+            await client.close()
+
+        return timings, elapsed
+
+    return asyncio.run(_run())
+
+
+def bench_discovery(tmp_dir, pool, repeat):
+    """Full discovery (SSDP search plus querying a device) into a fresh cache."""
+
+    file_path = os.path.join(tmp_dir, "discover.heos")
+    timings = []
+
+    for _ in range(repeat):
+        if os.path.exists(file_path):
+            os.unlink(file_path)
+
+        start = time.perf_counter()
+        Registry(file_path=file_path, pool=pool)
+        timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+def bench_cli(tmp_dir, player_name, repeat):
+    """Cold start of the CLI setting a volume, using a cached registry."""
+
+    env = dict(
+        os.environ,
+        PYTHONPATH=SRC_DIR,
+        HEOS_DAEMON_SOCKET=os.path.join(tmp_dir, "no-daemon.sock"),
+    )
+    command = [
+        sys.executable,
+        "-W",
+        "ignore",
+        "-c",
+        "from heos.cli.main import cli; cli()",
+        "player",
+        "--name",
+        player_name,
+        "set-volume",
+        "30",
+    ]
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            command,
+            env=env,
+            cwd=tmp_dir,
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--commands", type=int, default=2000)
+    parser.add_argument("--in-flight", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(
+        f"{args.devices} simulated devices, latency {args.latency * 1000:.1f} ms"
+        f" +/- {args.jitter * 1000:.1f} ms"
+    )
+
+    with Simulator(
+        n_devices=args.devices, latency=args.latency, jitter=args.jitter
+    ) as simulator, tempfile.TemporaryDirectory() as tmp_dir:
+        host = simulator.hosts[0]
+        pid = next(iter(simulator.players))
+
+        pool = ConnectionPool()
+        try:
+            timings = bench_discovery(tmp_dir, pool, args.repeat)
+            report_wall("discovery", timings)
+
+            report_latency("sync client", *bench_client(host, pid, args.commands))
+
+            registry = Registry(
+                file_path=os.path.join(tmp_dir, "discover.heos"), pool=pool
+            )
+            report_latency("pooled players", *bench_player(registry, args.commands))
+
+            report_latency(
+                f"async client ({args.in_flight} in flight)",
+                *bench_async(host, pid, args.commands, args.in_flight),
+            )
+        finally:
+            pool.close()
+
+        try:
+            import click  # noqa: F401
+        except ImportError:
+            print("click not installed, skipping CLI cold start")
+        else:
+            os.replace(
+                os.path.join(tmp_dir, "discover.heos"),
+                os.path.join(tmp_dir, ".heos"),
+            )
+            player_name = simulator.players[pid].name
+            report_wall("CLI cold start", bench_cli(tmp_dir, player_name, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
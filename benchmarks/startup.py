@@ -0,0 +1,131 @@
+"""
+Benchmarks CLI startup: module import times and loading of the .heos cache.
+
+Usage: python benchmarks/startup.py [--players N] [--repeat N]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+sys.path.insert(0, SRC_DIR)
+
+from heos.registry import GroupEntry, PlayerEntry, Registry  # noqa: E402
+
+
+def time_import(module, repeat):
+    """Times importing a module in a fresh interpreter (in milliseconds)."""
+
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    timings = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", f"import {module}"],
+            env=env,
+            check=True,
+        )
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return timings
+
+
+def build_registry(file_path, n_players):
+    # Bypass __init__ to avoid discovery, we only need the save logic.
+    registry = Registry.__new__(Registry)
+
+    registry.file_path = file_path
+    registry._discovered_at = time.time()
+    registry._players = {
+        f"Player {i}": PlayerEntry(
+            name=f"Player {i}",
+            model="HEOS 1",
+            host=f"192.168.1.{i % 254 + 1}",
+            id=i,
+            expires=time.time() + 3600,
+        )
+        for i in range(n_players)
+    }
+    registry._groups = {
+        f"Group {i}": GroupEntry(
+            name=f"Group {i}",
+            id=i,
+            leader=f"Player {i * 2}",
+            members=[f"Player {i * 2 + 1}"],
+        )
+        for i in range(n_players // 2)
+    }
+
+    return registry
+
+
+def time_load(file_path, repeat):
+    """Times loading a registry from the given cache file (in milliseconds)."""
+
+    timings = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        Registry(file_path=file_path, revalidate=False)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return timings
+
+
+def write_yaml(registry, file_path):
+    import yaml
+
+    config = {
+        "players": [asdict(entry) for entry in registry._players.values()],
+        "groups": [asdict(entry) for entry in registry._groups.values()],
+    }
+
+    with open(file_path, "w") as file_:
+        yaml.dump(config, file_)
+
+
+def report(label, timings):
+    print(
+        f"{label:<32} median {statistics.median(timings):8.2f} ms"
+        f"  min {min(timings):8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    report("python (baseline)", time_import("sys", args.repeat))
+    report("import heos", time_import("heos", args.repeat))
+    report("import heos.registry", time_import("heos.registry", args.repeat))
+
+    try:
+        import click  # noqa: F401
+    except ImportError:
+        print("click not installed, skipping CLI import")
+    else:
+        report("import heos.cli.main", time_import("heos.cli.main", args.repeat))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_path = os.path.join(tmp_dir, "registry.json")
+        yaml_path = os.path.join(tmp_dir, "registry.yaml")
+
+        registry = build_registry(json_path, args.players)
+        registry.save()
+        write_yaml(registry, yaml_path)
+
+        report(f"load JSON cache ({args.players})", time_load(json_path, args.repeat))
+        report(f"load YAML cache ({args.players})", time_load(yaml_path, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
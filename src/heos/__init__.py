@@ -1,3 +1,23 @@
-from .client import Client
-from .player import Player, PlayerGroup
-from .registry import Registry
+# Exports are imported lazily (see __getattr__ below), so that importing a
+# single submodule (e.g. by the CLI) doesn't pull in the whole package.
+_EXPORTS = {
+    "AsyncClient": ".aio",
+    "Client": ".client",
+    "Player": ".player",
+    "PlayerGroup": ".player",
+    "Registry": ".registry",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    import importlib
+
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+
+    return value
@@ -0,0 +1,20 @@
+import sys
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Keyword arguments for dataclasses that should use __slots__ (which is only
+# supported by dataclasses from Python 3.10 onwards).
+SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+# JSON decoder used for responses, using the (faster) orjson if installed.
+if orjson is not None:
+    json_loads = orjson.loads
+else:
+    import json
+
+    json_loads = json.loads
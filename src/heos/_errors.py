@@ -0,0 +1,7 @@
+def error_message(error: Exception) -> str:
+    """Message of an error, as reported to users (e.g. in batch results)."""
+
+    # KeyErrors quote their message when converted to a string.
+    if isinstance(error, KeyError) and error.args:
+        return str(error.args[0])
+    return str(error)
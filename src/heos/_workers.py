@@ -0,0 +1,121 @@
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, Iterator, Tuple
+
+# Task to run: (key, host, function). Keys identify the task in the results.
+Task = Tuple[Hashable, str, Callable[[], Any]]
+
+
+def run_tasks(
+    tasks: Iterable[Task],
+    concurrency: int = 16,
+    per_host: int = None,
+    timeout: float = None,
+    total_timeout: float = None,
+    name: str = "heos-worker",
+) -> Iterator[Tuple[Hashable, Any, Exception]]:
+    """
+    Runs tasks concurrently, yielding (key, value, error) tuples as they complete.
+
+    Tasks are queued per host and a task is only started once its host has a
+    free slot (at most `per_host` tasks run per host), so that a busy host
+    doesn't hold up tasks for other hosts. At most `concurrency` tasks run at
+    the same time.
+
+    Tasks that haven't completed within `timeout` seconds after they started,
+    or by the time `total_timeout` seconds have passed for all tasks, fail
+    with a TimeoutError. Tasks run on daemon threads, so tasks that are still
+    running by then are abandoned without holding up the process. Tasks that
+    haven't started yet when the caller stops iterating are dropped.
+    """
+
+    deadline = time.monotonic() + total_timeout if total_timeout is not None else None
+    results = queue.Queue()
+
+    order: Dict[Hashable, int] = {}
+    queued: Dict[str, Deque[Tuple[Hashable, Callable[[], Any]]]] = {}
+    for key, host, func in tasks:
+        order[key] = len(order)
+        queued.setdefault(host, deque()).append((key, func))
+
+    # Running tasks: key -> (host, time at which the task times out).
+    running: Dict[Hashable, Tuple[str, float]] = {}
+    busy: Dict[str, int] = {}
+
+    def _run(key, func):
+        try:
+            results.put((key, func(), None))
+        except Exception as err:  # pylint: disable=broad-except
+            results.put((key, None, err))
+
+    def _start():
+        # Hand out free slots to hosts in turn, skipping hosts that are busy.
+        started = True
+        while started and queued and len(running) < concurrency:
+            started = False
+            for host in list(queued):
+                if len(running) >= concurrency:
+                    break
+                if per_host is not None and busy.get(host, 0) >= per_host:
+                    continue
+
+                key, func = queued[host].popleft()
+                if not queued[host]:
+                    del queued[host]
+
+                busy[host] = busy.get(host, 0) + 1
+                expires = time.monotonic() + timeout if timeout is not None else None
+                running[key] = (host, expires)
+
+                threading.Thread(
+                    target=_run, args=(key, func), name=name, daemon=True
+                ).start()
+                started = True
+
+    def _finish(key):
+        host, _ = running.pop(key)
+        busy[host] -= 1
+
+    _start()
+
+    while running:
+        wait_until = min(
+            (
+                expires
+                for expires in [deadline, *(item[1] for item in running.values())]
+                if expires is not None
+            ),
+            default=None,
+        )
+        wait = None if wait_until is None else max(0.0, wait_until - time.monotonic())
+
+        try:
+            key, value, error = results.get(timeout=wait)
+        except queue.Empty:
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                break
+
+            for key, (_, expires) in list(running.items()):
+                if expires is not None and expires <= now:
+                    # Abandon the task, freeing its slot for the next task.
+                    _finish(key)
+                    yield key, None, TimeoutError(f"Timed out after {timeout} seconds")
+        else:
+            if key not in running:
+                # Task that was abandoned after timing out.
+                continue
+
+            _finish(key)
+            yield key, value, error
+
+        _start()
+
+    remaining = [
+        *running,
+        *(key for host_tasks in queued.values() for key, _ in host_tasks),
+    ]
+    for key in sorted(remaining, key=order.__getitem__):
+        yield key, None, TimeoutError(f"Timed out after {total_timeout} seconds")
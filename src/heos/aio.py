@@ -0,0 +1,192 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Tuple
+
+from .client import LineBuffer, Response, encode_query
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncClient:
+    """
+    Asyncio client for interacting with HEOS devices.
+
+    In contrast to the (blocking) Client, this client keeps multiple commands
+    in flight on a single connection. Responses are matched back to their
+    originating commands using the echoed command name and message fields,
+    meaning that throughput scales with the number of outstanding commands
+    rather than with the round trip latency of the device.
+
+    If the connection drops (or the device sends something that can't be
+    parsed), all commands in flight fail. Errors raised by event handlers are
+    logged, without affecting the connection.
+    """
+
+    def __init__(self, host: str, port: int = 1255, timeout: float = None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+        self._reader = None
+        self._writer = None
+        self._read_task = None
+        self._connect_lock = None
+
+        self._pending: Dict[str, Deque[Tuple[Dict[str, str], asyncio.Future]]] = {}
+        self._event_handlers: List[Callable[[Response], Any]] = []
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, exc_traceback):
+        await self.close()
+
+    @property
+    def connected(self) -> bool:
+        """Whether the client currently has an open connection."""
+        return self._writer is not None and not self._writer.is_closing()
+
+    @property
+    def in_flight(self) -> int:
+        """Number of commands that are awaiting a response."""
+        return sum(len(waiters) for waiters in self._pending.values())
+
+    async def connect(self):
+        """Opens the connection to the device (if not already open)."""
+
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+
+        async with self._connect_lock:
+            if self.connected:
+                return
+
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), timeout=self.timeout
+            )
+            self._read_task = asyncio.ensure_future(self._read_loop())
+
+    async def send_command(self, command: str, params: Dict[str, Any] = None):
+        """Sends a heos command to the device, with optional parameters."""
+
+        await self.connect()
+
+        future = asyncio.get_running_loop().create_future()
+        expected = {key: str(value) for key, value in (params or {}).items()}
+        self._pending.setdefault(command, deque()).append((expected, future))
+
+        self._writer.write(encode_query(command, params))
+
+        try:
+            await self._writer.drain()
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        finally:
+            if not future.done():
+                future.cancel()
+
+    async def wait_closed(self):
+        """Waits until the connection has been closed (by either side)."""
+
+        if self._read_task is not None:
+            await asyncio.wait([self._read_task])
+
+    def add_event_handler(self, handler: Callable[[Response], Any]):
+        """Registers a callback that is called for every event sent by the device."""
+        self._event_handlers.append(handler)
+
+    def remove_event_handler(self, handler: Callable[[Response], Any]):
+        """Removes a previously registered event callback."""
+        self._event_handlers.remove(handler)
+
+    async def close(self):
+        """Closes the connection, failing any commands still in flight."""
+
+        if self._read_task is not None:
+            self._read_task.cancel()
+            try:
+                await self._read_task
+            except asyncio.CancelledError:
+                pass
+            self._read_task = None
+
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+            self._reader = self._writer = None
+
+        self._fail_pending(ConnectionError(f"Connection to {self.host} closed"))
+
+    async def _read_loop(self):
+        buffer = LineBuffer()
+
+        try:
+            while True:
+                data = await self._reader.read(65536)
+                if not data:
+                    raise ConnectionError("Connection closed by device")
+                buffer.feed(data)
+
+                line = buffer.next_line()
+                while line is not None:
+                    self._dispatch(*line)
+                    line = buffer.next_line()
+        except Exception as err:  # pylint: disable=broad-except
+            # No responses can arrive without the read loop, so fail any
+            # command that is still waiting for one and drop the connection.
+            if isinstance(err, OSError):
+                err = ConnectionError(f"Lost connection to {self.host}: {err}")
+            self._fail_pending(err)
+            if self._writer is not None:
+                self._writer.close()
+
+    def _dispatch(self, kind: str, line: bytes):
+        if kind == LineBuffer.EVENT:
+            if self._event_handlers:
+                response = Response.from_bytes(line)
+                for handler in list(self._event_handlers):
+                    try:
+                        handler(response)
+                    except Exception:  # pylint: disable=broad-except
+                        logger.exception("Event handler failed for %s", response)
+        else:
+            response = Response.from_bytes(line)
+            future = self._match(response)
+            if future is not None:
+                future.set_result(response)
+
+    def _match(self, response: Response):
+        """Finds the oldest pending command that the given response belongs to."""
+
+        waiters = self._pending.get(response.command)
+        if not waiters:
+            return None
+
+        # Drop commands that were cancelled or timed out in the mean time.
+        if any(future.done() for _, future in waiters):
+            waiters = self._pending[response.command] = deque(
+                waiter for waiter in waiters if not waiter[1].done()
+            )
+
+        # Parameters that are not echoed by the device (e.g. in some error
+        # responses) match any value. Responses whose parameters conflict with
+        # those of every pending command (e.g. a late response to a command
+        # that timed out) are dropped.
+        fields = response.message_fields
+        for idx, (expected, future) in enumerate(waiters):
+            if all(fields.get(key, value) == value for key, value in expected.items()):
+                del waiters[idx]
+                return future
+
+        return None
+
+    def _fail_pending(self, error: Exception):
+        pending, self._pending = self._pending, {}
+        for waiters in pending.values():
+            for _, future in waiters:
+                if not future.done():
+                    future.set_exception(error)
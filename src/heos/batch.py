@@ -0,0 +1,188 @@
+import json
+from dataclasses import dataclass
+from enum import Enum
+from functools import partial
+from typing import Any, Dict, Iterable, Iterator, List
+
+from ._errors import error_message
+from ._workers import run_tasks
+from .browse import Paged
+from .ramp import Ramp
+
+
+@dataclass
+class Operation:
+    """
+    Class representing a single operation on a player or group in a batch.
+
+    The action is either the name of a property (e.g. "volume" or "mute") or
+    the name of a method (e.g. "play" or "pause"). Properties are set to the
+    given value, or read if no value is given. Methods are called with the
+    given value as argument (if any), or with the items of the value as
+    keyword arguments if the value is a dict.
+    """
+
+    kind: str
+    name: str
+    action: str
+    value: Any = None
+
+    @classmethod
+    def from_dict(cls, dict_: Dict[str, Any]):
+        """
+        Builds an instance from a dict, for example:
+
+            {"player": "Kitchen", "action": "volume", "value": 20}
+            {"group": "Downstairs", "action": "pause"}
+        """
+
+        if "kind" in dict_:
+            kind, name = dict_["kind"], dict_["name"]
+        elif "player" in dict_:
+            kind, name = "player", dict_["player"]
+        elif "group" in dict_:
+            kind, name = "group", dict_["group"]
+        else:
+            raise ValueError(f"Operation {dict_} does not specify a player or group")
+
+        return cls(
+            kind=kind, name=name, action=dict_["action"], value=dict_.get("value")
+        )
+
+    def apply(self, target) -> Any:
+        """Applies the operation to the given player or group."""
+
+        if self.action.startswith("_"):
+            raise ValueError(f"Invalid action {self.action!r}")
+
+        attr = getattr(type(target), self.action, None)
+
+        if isinstance(attr, property):
+            if self.value is None:
+                return getattr(target, self.action)
+            setattr(target, self.action, self.value)
+            return None
+
+        if callable(attr):
+            method = getattr(target, self.action)
+            if self.value is None:
+                return method()
+            if isinstance(self.value, dict):
+                return method(**self.value)
+            return method(self.value)
+
+        raise ValueError(f"Unknown action {self.action!r} for {self.kind}")
+
+
+@dataclass
+class Result:
+    """Class representing the result of a batch operation."""
+
+    index: int
+    operation: Operation
+    value: Any = None
+    error: Exception = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the operation succeeded."""
+        return self.error is None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converts the result to a (JSON-serializable) dict."""
+
+        result = {
+            "index": self.index,
+            "kind": self.operation.kind,
+            "name": self.operation.name,
+            "action": self.operation.action,
+            "ok": self.ok,
+        }
+
+        if self.ok:
+            value = self.value
+            if isinstance(value, Enum):
+                value = value.value
+            elif isinstance(value, Paged):
+                value = list(value)
+            elif isinstance(value, Ramp):
+                value = value.to_dict()
+            result["value"] = value
+        else:
+            result["error"] = error_message(self.error)
+            result["error_type"] = type(self.error).__name__
+
+        return result
+
+
+def run_batch(
+    registry,
+    operations: Iterable[Operation],
+    concurrency: int = 16,
+    timeout: float = None,
+    total_timeout: float = None,
+) -> Iterator[Result]:
+    """
+    Applies operations concurrently, yielding results as they complete.
+
+    Operations are queued by the host of their target, with each host running
+    at most as many operations concurrently as the registry's connection pool
+    allows per host. Across hosts, at most `concurrency` operations run at the
+    same time. Operations that fail are reported in their result, without
+    aborting the rest of the batch.
+
+    Operations that haven't completed within `timeout` seconds (per operation)
+    or within `total_timeout` seconds (for the batch as a whole) are reported
+    as timed out (see heos._workers.run_tasks).
+    """
+
+    operations = list(operations)
+    tasks = []
+
+    for index, operation in enumerate(operations):
+        try:
+            target = _resolve(registry, operation)
+        except (KeyError, ValueError) as err:
+            yield Result(index, operation, error=err)
+            continue
+
+        tasks.append((index, target.host, partial(operation.apply, target)))
+
+    for index, value, error in run_tasks(
+        tasks,
+        concurrency=concurrency,
+        per_host=registry.pool.max_per_host,
+        timeout=timeout,
+        total_timeout=total_timeout,
+        name="heos-batch",
+    ):
+        yield Result(index, operations[index], value=value, error=error)
+
+
+def _resolve(registry, operation: Operation):
+    if operation.kind == "player":
+        targets = registry.players
+    elif operation.kind == "group":
+        targets = registry.groups
+    else:
+        raise ValueError(f"Unknown kind {operation.kind!r}")
+
+    try:
+        return targets[operation.name]
+    except KeyError:
+        raise KeyError(f"Unknown {operation.kind} {operation.name!r}") from None
+
+
+def parse_operations(content: str) -> List[Operation]:
+    """Parses operations from a JSON list or from JSON lines."""
+
+    content = content.strip()
+    if not content:
+        return []
+
+    if content.startswith("["):
+        dicts = json.loads(content)
+    else:
+        dicts = [json.loads(line) for line in content.splitlines() if line.strip()]
+
+    return [Operation.from_dict(dict_) for dict_ in dicts]
@@ -0,0 +1,132 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from .client import Response
+from .pool import ConnectionPool, default_pool
+
+
+class Paged:
+    """
+    Lazily fetched listing (e.g. a queue or browsed container) of a HEOS device.
+
+    Items are fetched in pages of `page_size` items (using the range parameter
+    of the underlying command) whilst iterating. Whilst the current page is
+    being consumed, the next page is fetched in a background thread, so that
+    only a bounded number of items is held in memory, no matter how large the
+    listing is. Every iteration starts fetching from the first item again.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[int, int], Tuple[List[Dict[str, Any]], int]],
+        page_size: int = 100,
+        prefetch: bool = True,
+    ):
+        if page_size < 1:
+            raise ValueError("Page size must be at least 1")
+
+        self._fetch = fetch
+        self.page_size = page_size
+        self.prefetch = prefetch
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if not self.prefetch:
+            start = 0
+            while start is not None:
+                items, start = self._fetch_page(start)
+                yield from items
+            return
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="heos-page")
+
+        try:
+            future = executor.submit(self._fetch_page, 0)
+            while future is not None:
+                items, start = future.result()
+
+                # Fetch the next page whilst the caller consumes this one.
+                future = (
+                    executor.submit(self._fetch_page, start)
+                    if start is not None
+                    else None
+                )
+
+                yield from items
+        finally:
+            executor.shutdown(wait=False)
+
+    def _fetch_page(self, start: int):
+        """Fetches the page starting at `start`, returning it with the next start."""
+
+        items, count = self._fetch(start, start + self.page_size - 1)
+
+        end = start + len(items)
+        if not items or (count is None and len(items) < self.page_size):
+            return items, None
+        if count is not None and end >= count:
+            return items, None
+
+        return items, end
+
+    @staticmethod
+    def parse_response(response: Response) -> Tuple[List[Dict[str, Any]], int]:
+        """Extracts items and total count (if reported) from a paged response."""
+
+        count = response.message_fields.get("count")
+        return response.payload or [], int(count) if count is not None else None
+
+
+@dataclass
+class Browser:
+    """
+    Class for browsing music sources (e.g. streaming services or media servers).
+
+    Browsing works the same for any device in the system, so the browser can
+    use any (known) host.
+    """
+
+    host: str
+    pool: ConnectionPool = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.pool is None:
+            self.pool = default_pool()
+
+    def _send_command(self, command: str, params: Dict[str, Any]) -> Response:
+        with self.pool.connection(self.host) as client:
+            response = client.send_command(command, params=params)
+        response.raise_for_result()
+        return response
+
+    @property
+    def sources(self) -> List[Dict[str, Any]]:
+        """Available music sources (e.g. {"name": ..., "sid": ...})."""
+        return self._send_command("browse/get_music_sources", params={}).payload
+
+    def browse(self, sid: int, cid: str = None, page_size: int = 100) -> Paged:
+        """Lists the items of a music source, or of a container within a source."""
+
+        params = {"sid": sid}
+        if cid is not None:
+            params["cid"] = cid
+
+        return Paged(self._fetcher("browse/browse", params), page_size=page_size)
+
+    def search(
+        self, sid: int, query: str, criteria: int, page_size: int = 100
+    ) -> Paged:
+        """Searches a music source, using one of its search criteria (scid)."""
+
+        params = {"sid": sid, "search": query, "scid": criteria}
+        return Paged(self._fetcher("browse/search", params), page_size=page_size)
+
+    def _fetcher(self, command: str, params: Dict[str, Any]):
+        def _fetch(start, end):
+            response = self._send_command(
+                command, params={**params, "range": f"{start},{end}"}
+            )
+            return Paged.parse_response(response)
+
+        return _fetch
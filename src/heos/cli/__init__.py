@@ -1 +1 @@
-from . import main, player, group, registry
+from .main import cli
@@ -0,0 +1,60 @@
+import json
+import sys
+
+import click
+
+from ..batch import parse_operations
+from .main import load_registry
+
+
+@click.command()
+@click.argument("file", type=click.File("r"), default="-")
+@click.option(
+    "--concurrency",
+    type=int,
+    default=16,
+    help="Maximum number of operations to run concurrently.",
+)
+@click.option(
+    "--timeout",
+    type=float,
+    default=None,
+    help="Maximum time (in seconds) to wait for each operation.",
+)
+@click.option(
+    "--total-timeout",
+    type=float,
+    default=None,
+    help="Maximum time (in seconds) to wait for all operations.",
+)
+@click.pass_context
+def batch(ctx, file, concurrency, timeout, total_timeout):
+    """
+    Applies a batch of operations read from FILE (or stdin).
+
+    Operations are given as a JSON list or as JSON lines, for example:
+
+    \b
+        {"player": "Kitchen", "action": "volume", "value": 20}
+        {"group": "Downstairs", "action": "pause"}
+
+    Prints the result of every operation as a JSON line as soon as it completes.
+    """
+
+    operations = parse_operations(file.read())
+
+    registry = load_registry(ctx)
+
+    failed = False
+    results = registry.batch(
+        operations,
+        concurrency=concurrency,
+        timeout=timeout,
+        total_timeout=total_timeout,
+    )
+    for result in results:
+        print(json.dumps(result.to_dict()), flush=True)
+        failed = failed or not result.ok
+
+    if failed:
+        sys.exit(1)
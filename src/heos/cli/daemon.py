@@ -0,0 +1,53 @@
+import logging
+
+import click
+
+from ..daemon import Daemon, default_socket_path
+from ..registry import Registry
+from ..scheduler import Scheduler
+
+
+@click.command()
+@click.option(
+    "--socket",
+    "socket_path",
+    default=None,
+    help=f"Path of the control socket (default: {default_socket_path()}).",
+)
+@click.option(
+    "--rediscover/--no-rediscover",
+    default=False,
+    help=(
+        "Whether to rediscover devices. Uses cached devices "
+        "if present when False (default)."
+    ),
+)
+@click.option(
+    "--metrics/--no-metrics",
+    "collect_metrics",
+    default=True,
+    help="Whether to collect command metrics (see heos stats).",
+)
+@click.option(
+    "--rate",
+    type=float,
+    default=None,
+    help="Maximum number of commands per second per device (default: no limit).",
+)
+def daemon(socket_path, rediscover, collect_metrics, rate):
+    """Runs a daemon that other heos commands send their commands through."""
+
+    # Commands from (e.g. many concurrent) clients are scheduled, coalescing
+    # volume changes and sharing reads.
+    registry = Registry(scheduler=Scheduler(rate=rate))
+
+    if rediscover:
+        registry.discover()
+
+    daemon = Daemon(registry, socket_path=socket_path, collect_metrics=collect_metrics)
+    logging.info(f"Listening for commands on {daemon.socket_path}")
+
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
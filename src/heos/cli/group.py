@@ -1,14 +1,11 @@
-import logging
-import sys
-
 import click
 
-from .main import cli
-from ..registry import Registry
+from .main import load_registry
+from .targets import apply_to_targets, select_targets, target_options
 
 
-@cli.group()
-@click.option("--name", required=True, help="Name of the player group.")
+@click.group()
+@target_options("group")
 @click.option(
     "--rediscover/--no-rediscover",
     default=False,
@@ -18,46 +15,42 @@ from ..registry import Registry
     ),
 )
 @click.pass_context
-def group(ctx, name, rediscover):
-    """Controls for player groups."""
+def group(ctx, names, all_, concurrency, timeout, total_timeout, rediscover):
+    """
+    Controls for player groups.
+
+    Commands are sent to all selected groups concurrently.
+    """
 
     ctx.ensure_object(dict)
 
-    registry = Registry()
+    registry = load_registry(ctx)
 
     if rediscover:
         registry.discover()
 
-    try:
-        group = registry.groups[name]
-    except KeyError:
-        logging.error(
-            f"Unknown group '{name}', available groups "
-            f"are: {list(registry.groups.keys())}"
-        )
-        sys.exit(1)
-
-    ctx.obj["group"] = group
+    ctx.obj.update(
+        registry=registry,
+        kind="group",
+        names=select_targets("group", registry.groups.keys(), names, all_),
+        concurrency=concurrency,
+        timeout=timeout,
+        total_timeout=total_timeout,
+    )
 
 
 @group.command()
 @click.pass_context
 def mute(ctx):
     """Mutes a player group."""
-
-    with ctx.obj["group"] as group:
-        group.mute = True
-        logging.info(f"Muted group '{group.name}'")
+    apply_to_targets(ctx, "mute", True, message="Muted group '{name}'")
 
 
 @group.command()
 @click.pass_context
 def unmute(ctx):
     """Unmutes a player group."""
-
-    with ctx.obj["group"] as group:
-        group.mute = False
-        logging.info(f"Unmuted group '{group.name}'")
+    apply_to_targets(ctx, "mute", False, message="Unmuted group '{name}'")
 
 
 @group.command()
@@ -66,33 +59,59 @@ def unmute(ctx):
 def set_volume(ctx, level):
     """Sets the volume on a player group."""
 
-    with ctx.obj["group"] as group:
-        group.volume = level
-        logging.info(f"Set volume on group '{group.name}' to {group.volume}")
+    apply_to_targets(
+        ctx, "volume", level, message=f"Set volume on group '{{name}}' to {level}"
+    )
+
+
+@group.command()
+@click.argument("level", type=int)
+@click.option(
+    "--duration",
+    type=float,
+    default=5.0,
+    help="Duration of the fade in seconds (default: 5).",
+)
+@click.option(
+    "--curve",
+    type=click.Choice(["linear", "ease-in", "ease-out", "ease-in-out"]),
+    default="linear",
+    help="Curve that the volume follows (default: linear).",
+)
+@click.option(
+    "--interval",
+    type=float,
+    default=0.1,
+    help="Time (in seconds) between volume steps (default: 0.1).",
+)
+@click.pass_context
+def fade(ctx, level, duration, curve, interval):
+    """Fades the volume of a player group to LEVEL."""
+
+    apply_to_targets(
+        ctx,
+        "ramp_volume",
+        {"level": level, "duration": duration, "curve": curve, "interval": interval},
+        message=f"Faded volume on group '{{name}}' to {level}",
+    )
 
 
 @group.command()
 @click.pass_context
 def play(ctx):
     """Starts/resumes playback on a player group."""
-
-    with ctx.obj["group"] as group:
-        group.play()
+    apply_to_targets(ctx, "play")
 
 
 @group.command()
 @click.pass_context
 def pause(ctx):
     """Pauses playback on a player group."""
-
-    with ctx.obj["group"] as group:
-        group.pause()
+    apply_to_targets(ctx, "pause")
 
 
 @group.command()
 @click.pass_context
 def stop(ctx):
     """Stops playback on a player group."""
-
-    with ctx.obj["group"] as group:
-        group.stop()
+    apply_to_targets(ctx, "stop")
@@ -1,3 +1,4 @@
+import importlib
 import logging
 
 import click
@@ -5,6 +6,71 @@ import click
 logging.basicConfig(level=logging.INFO)
 
 
-@click.group()
+class LazyGroup(click.Group):
+    """
+    Click group that only imports the modules of its subcommands when needed.
+
+    This avoids importing the whole library (and its dependencies) for every
+    invocation of the CLI, which keeps startup times low.
+    """
+
+    def __init__(self, *args, lazy_subcommands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Mapping of command name -> "module:attribute".
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_subcommands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.lazy_subcommands:
+            module_name, attr = self.lazy_subcommands[cmd_name].split(":")
+            module = importlib.import_module(module_name, __package__)
+            return getattr(module, attr)
+        return super().get_command(ctx, cmd_name)
+
+    def invoke(self, ctx):
+        try:
+            return super().invoke(ctx)
+        except ConnectionError as err:
+            # E.g. the daemon went away or a device can't be reached.
+            raise click.ClickException(str(err)) from err
+
+
+def load_registry(ctx: click.Context):
+    """
+    Returns the registry of a running daemon, or a local registry if none is running.
+
+    Using the daemon's registry saves setting up the registry (and connections
+    to devices) for every invocation of the CLI.
+    """
+
+    # Only the (small) client side of the daemon is imported, which returns
+    # right away if there is no control socket (i.e. no daemon is running).
+    from ..remote import DaemonClient
+
+    client = DaemonClient.connect()
+    if client is not None:
+        ctx.call_on_close(client.close)
+        return client.registry()
+
+    from ..registry import Registry
+
+    return Registry()
+
+
+@click.group(
+    cls=LazyGroup,
+    lazy_subcommands={
+        "batch": ".batch:batch",
+        "daemon": ".daemon:daemon",
+        "group": ".group:group",
+        "player": ".player:player",
+        "registry": ".registry:registry",
+        "scene": ".scene:scene",
+        "stats": ".stats:stats",
+        "status": ".status:status",
+    },
+)
 def cli():
     pass
@@ -1,14 +1,11 @@
-import logging
-import sys
-
 import click
 
-from .main import cli
-from ..registry import Registry
+from .main import load_registry
+from .targets import apply_to_targets, select_targets, target_options
 
 
-@cli.group()
-@click.option("--name", required=True, help="Name of the player.")
+@click.group()
+@target_options("player")
 @click.option(
     "--rediscover/--no-rediscover",
     default=False,
@@ -18,46 +15,42 @@ from ..registry import Registry
     ),
 )
 @click.pass_context
-def player(ctx, name, rediscover):
-    """Controls for players."""
+def player(ctx, names, all_, concurrency, timeout, total_timeout, rediscover):
+    """
+    Controls for players.
+
+    Commands are sent to all selected players concurrently.
+    """
 
     ctx.ensure_object(dict)
 
-    registry = Registry()
+    registry = load_registry(ctx)
 
     if rediscover:
         registry.discover()
 
-    try:
-        player = registry.players[name]
-    except KeyError:
-        logging.error(
-            f"Unknown player '{name}', available players "
-            f"are: {list(registry.players.keys())}"
-        )
-        sys.exit(1)
-
-    ctx.obj["player"] = player
+    ctx.obj.update(
+        registry=registry,
+        kind="player",
+        names=select_targets("player", registry.players.keys(), names, all_),
+        concurrency=concurrency,
+        timeout=timeout,
+        total_timeout=total_timeout,
+    )
 
 
 @player.command()
 @click.pass_context
 def mute(ctx):
     """Mutes a player."""
-
-    with ctx.obj["player"] as player:
-        player.mute = True
-        logging.info(f"Muted player '{player.name}'")
+    apply_to_targets(ctx, "mute", True, message="Muted player '{name}'")
 
 
 @player.command()
 @click.pass_context
 def unmute(ctx):
     """Unmutes a player."""
-
-    with ctx.obj["player"] as player:
-        player.mute = False
-        logging.info(f"Unmuted player '{player.name}'")
+    apply_to_targets(ctx, "mute", False, message="Unmuted player '{name}'")
 
 
 @player.command()
@@ -66,33 +59,83 @@ def unmute(ctx):
 def set_volume(ctx, level):
     """Sets the volume on a player."""
 
-    with ctx.obj["player"] as player:
-        player.volume = level
-        logging.info(f"Set volume on player '{player.name}' to {player.volume}")
+    # Levels are clamped by the player, no need to read the volume back.
+    level = min(max(level, 0), 100)
+    apply_to_targets(
+        ctx, "volume", level, message=f"Set volume on player '{{name}}' to {level}"
+    )
+
+
+@player.command()
+@click.argument("level", type=int)
+@click.option(
+    "--duration",
+    type=float,
+    default=5.0,
+    help="Duration of the fade in seconds (default: 5).",
+)
+@click.option(
+    "--curve",
+    type=click.Choice(["linear", "ease-in", "ease-out", "ease-in-out"]),
+    default="linear",
+    help="Curve that the volume follows (default: linear).",
+)
+@click.option(
+    "--interval",
+    type=float,
+    default=0.1,
+    help="Time (in seconds) between volume steps (default: 0.1).",
+)
+@click.pass_context
+def fade(ctx, level, duration, curve, interval):
+    """Fades the volume of a player to LEVEL."""
+
+    apply_to_targets(
+        ctx,
+        "ramp_volume",
+        {"level": level, "duration": duration, "curve": curve, "interval": interval},
+        message=f"Faded volume on player '{{name}}' to {level}",
+    )
 
 
 @player.command()
 @click.pass_context
 def play(ctx):
     """Starts/resumes playback on a player."""
-
-    with ctx.obj["player"] as player:
-        player.play()
+    apply_to_targets(ctx, "play")
 
 
 @player.command()
 @click.pass_context
 def pause(ctx):
     """Pauses playback on a player."""
-
-    with ctx.obj["player"] as player:
-        player.pause()
+    apply_to_targets(ctx, "pause")
 
 
 @player.command()
 @click.pass_context
 def stop(ctx):
     """Stops playback on a player."""
+    apply_to_targets(ctx, "stop")
+
+
+@player.command()
+@click.option(
+    "--limit", type=int, default=None, help="Maximum number of items to show."
+)
+@click.pass_context
+def queue(ctx, limit):
+    """Lists the items in the queue of a player."""
+
+    from itertools import islice
+
+    names = ctx.obj["names"]
+    if len(names) != 1:
+        raise click.UsageError("The queue can only be listed for a single player.")
 
-    with ctx.obj["player"] as player:
-        player.stop()
+    with ctx.obj["registry"].players[names[0]] as player:
+        for item in islice(player.queue, limit):
+            click.echo(
+                f"{item.get('qid', '-')}. {item.get('song', '')}"
+                f" - {item.get('artist', '')}"
+            )
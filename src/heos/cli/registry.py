@@ -1,10 +1,9 @@
 import click
 
-from .main import cli
-from ..registry import Registry
+from .main import load_registry
 
 
-@cli.group()
+@click.group()
 @click.option(
     "--rediscover/--no-rediscover",
     default=False,
@@ -19,7 +18,7 @@ def registry(ctx, rediscover):
 
     ctx.ensure_object(dict)
 
-    registry = Registry()
+    registry = load_registry(ctx)
 
     if rediscover:
         registry.discover()
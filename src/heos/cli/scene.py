@@ -0,0 +1,84 @@
+import json
+import sys
+from dataclasses import asdict
+
+import click
+
+from ..scene import Scene
+from .main import load_registry
+
+
+@click.group()
+def scene():
+    """Apply scenes (grouping and state of players)."""
+
+
+@scene.command()
+@click.argument("file", type=click.File("r"), default="-")
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    default=False,
+    help="Only print the operations that would be sent.",
+)
+@click.option(
+    "--rollback/--no-rollback",
+    default=True,
+    help="Whether to undo applied changes if any change fails (default: True).",
+)
+@click.option(
+    "--concurrency",
+    type=int,
+    default=16,
+    help="Maximum number of operations to run concurrently.",
+)
+@click.option(
+    "--timeout",
+    type=float,
+    default=None,
+    help="Maximum time (in seconds) to wait for each read and operation.",
+)
+@click.pass_context
+def apply(ctx, file, dry_run, rollback, concurrency, timeout):
+    """
+    Applies the scene read from FILE (or stdin), given as JSON or YAML, e.g.:
+
+    \b
+        groups:
+          - leader: Living Room
+            members: [Kitchen]
+        players:
+          Living Room: {volume: 20, play_state: play}
+          Kitchen: {volume: 15, mute: false}
+
+    Only sends commands for state that differs from the scene. Prints the
+    result of every change (and of any rollback) as a JSON line.
+    """
+
+    try:
+        scene_ = Scene.parse(file.read())
+    except (ValueError, TypeError) as err:
+        raise click.ClickException(f"Invalid scene: {err}")
+
+    registry = load_registry(ctx)
+
+    try:
+        if dry_run:
+            for operation in registry.plan_scene(scene_, timeout=timeout):
+                print(json.dumps(asdict(operation)))
+            return
+
+        result = registry.apply_scene(
+            scene_, concurrency=concurrency, timeout=timeout, rollback=rollback
+        ).to_dict()
+    except KeyError as err:
+        # Unknown players.
+        raise click.ClickException(err.args[0])
+
+    for change in result["results"]:
+        print(json.dumps(change))
+    for change in result["rollback"]:
+        print(json.dumps({**change, "rollback": True}))
+
+    if not result["ok"]:
+        sys.exit(1)
@@ -0,0 +1,29 @@
+import json
+
+import click
+
+from ..remote import DaemonClient
+
+
+@click.command()
+@click.option(
+    "--format",
+    "format_",
+    type=click.Choice(["prometheus", "json"]),
+    default="prometheus",
+    help="Output format (default: prometheus).",
+)
+def stats(format_):
+    """Dumps the command metrics collected by a running daemon."""
+
+    client = DaemonClient.connect()
+    if client is None:
+        raise click.ClickException("No running daemon found (see heos daemon)")
+
+    with client:
+        result = client.stats(format_)
+
+    if format_ == "json":
+        click.echo(json.dumps(result, indent=2))
+    else:
+        click.echo(result, nl=False)
@@ -0,0 +1,89 @@
+import json
+import sys
+
+import click
+
+from .main import load_registry
+
+# Columns of the table format: (header, width).
+COLUMNS = [("NAME", 20), ("VOLUME", 6), ("MUTE", 5), ("STATE", 6), ("NOW PLAYING", 0)]
+
+
+@click.command()
+@click.option(
+    "--format",
+    "format_",
+    type=click.Choice(["table", "json"]),
+    default="table",
+    help="Output format: a table or JSON lines (default: table).",
+)
+@click.option(
+    "--concurrency",
+    type=int,
+    default=16,
+    help="Maximum number of reads to run concurrently.",
+)
+@click.option(
+    "--timeout",
+    type=float,
+    default=5.0,
+    help="Maximum time (in seconds) to wait for all players.",
+)
+@click.pass_context
+def status(ctx, format_, concurrency, timeout):
+    """
+    Prints the status of all players.
+
+    Players are printed as soon as their volume, mute, play state and
+    now playing info have been read.
+    """
+
+    registry = load_registry(ctx)
+
+    if format_ == "table":
+        _print_row(header for header, _ in COLUMNS)
+
+    failed = False
+    for player_status in registry.snapshot(concurrency=concurrency, timeout=timeout):
+        if format_ == "json":
+            print(json.dumps(player_status.to_dict()), flush=True)
+        else:
+            _print_row(_format_row(player_status.to_dict()))
+        failed = failed or not player_status.ok
+
+    if failed:
+        sys.exit(1)
+
+
+def _format_row(status):
+    now_playing = status["now_playing"] or {}
+    media = " - ".join(
+        now_playing[key] for key in ("song", "artist") if now_playing.get(key)
+    )
+
+    if status["errors"]:
+        media = f"{media} (failed: {', '.join(status['errors'])})".lstrip()
+
+    mute = status["mute"]
+    if mute is not None:
+        mute = "yes" if mute else "no"
+
+    return [
+        status["name"],
+        _or_dash(status["volume"]),
+        _or_dash(mute),
+        _or_dash(status["play_state"]),
+        media,
+    ]
+
+
+def _or_dash(value):
+    return "-" if value is None else str(value)
+
+
+def _print_row(values):
+    cells = [
+        f"{value:<{width}}" if width else value
+        for value, (_, width) in zip(values, COLUMNS)
+    ]
+    print("  ".join(cells).rstrip(), flush=True)
@@ -0,0 +1,114 @@
+import fnmatch
+import logging
+import sys
+from typing import Any, Iterable, List
+
+import click
+
+from ..batch import Operation
+
+
+def target_options(kind: str):
+    """Options for selecting one or more targets (players or groups) by name."""
+
+    def _decorator(func):
+        options = [
+            click.option(
+                "--name",
+                "names",
+                multiple=True,
+                help=(
+                    f"Name of the {kind} (can be given multiple times and can "
+                    "contain wildcards, e.g. 'Living*')."
+                ),
+            ),
+            click.option(
+                "--all", "all_", is_flag=True, default=False, help=f"Every {kind}."
+            ),
+            click.option(
+                "--concurrency",
+                type=int,
+                default=16,
+                help="Maximum number of targets to control concurrently.",
+            ),
+            click.option(
+                "--timeout",
+                type=float,
+                default=None,
+                help="Maximum time (in seconds) to wait for each target.",
+            ),
+            click.option(
+                "--total-timeout",
+                type=float,
+                default=None,
+                help="Maximum time (in seconds) to wait for all targets.",
+            ),
+        ]
+
+        for option in reversed(options):
+            func = option(func)
+        return func
+
+    return _decorator
+
+
+def select_targets(
+    kind: str, available: Iterable[str], patterns: Iterable[str], all_: bool
+) -> List[str]:
+    """Returns the names of the targets matching the given names/globs (or all)."""
+
+    available = list(available)
+
+    if all_:
+        return available
+
+    if not patterns:
+        raise click.UsageError("Missing option '--name' (or '--all').")
+
+    selected = []
+    for pattern in patterns:
+        matches = [name for name in available if fnmatch.fnmatchcase(name, pattern)]
+        if not matches:
+            logging.error(
+                f"Unknown {kind} '{pattern}', available {kind}s are: {available}"
+            )
+            sys.exit(1)
+        selected.extend(name for name in matches if name not in selected)
+
+    return selected
+
+
+def apply_to_targets(ctx: click.Context, action: str, value: Any = None, message=None):
+    """
+    Applies an action to all selected targets concurrently (see heos.batch).
+
+    Results are logged as soon as they complete, using the given message
+    (formatted with the name of the target) for targets that succeeded.
+    """
+
+    obj = ctx.obj
+    kind = obj["kind"]
+
+    operations = [
+        Operation(kind=kind, name=name, action=action, value=value)
+        for name in obj["names"]
+    ]
+
+    failed = False
+    for result in obj["registry"].batch(
+        operations,
+        concurrency=obj["concurrency"],
+        timeout=obj["timeout"],
+        total_timeout=obj["total_timeout"],
+    ):
+        name = result.operation.name
+        if result.ok:
+            if message is not None:
+                logging.info(message.format(name=name))
+        else:
+            error = result.to_dict()["error"]
+            logging.error(f"Failed on {kind} '{name}': {error}")
+            failed = True
+
+    if failed:
+        sys.exit(1)
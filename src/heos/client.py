@@ -1,9 +1,14 @@
-import json
-from dataclasses import dataclass
-from telnetlib import Telnet
-from typing import Any, Dict
+import socket
+import sys
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
 from urllib.parse import urlencode, parse_qsl
 
+from . import metrics
+from ._compat import SLOTS, json_loads
+
 
 class Client:
     """
@@ -11,11 +16,48 @@ class Client:
 
     Follows the specification in:
     http://rn.dmglobal.com/euheos/HEOS_CLI_ProtocolSpecification.pdf
+
+    Lines received from the device are routed based on their type: interim
+    "command under process" replies are skipped, events (if any) are passed to
+    `on_event` and only the actual response is returned to the caller.
+
+    If given an `on_metrics` callback (or if any hooks are registered in
+    heos.metrics), the client measures every command it sends (see
+    heos.metrics.CommandMetrics). Otherwise no measurements are taken at all.
+
+    Commands that fail with a transient (connection) error are retried up to
+    `retries` times on a new connection, waiting `backoff` seconds (doubling
+    for every retry) in between. Commands that are not idempotent (e.g.
+    play_next) are only retried if they could not be sent at all. Commands
+    are not retried if the device can't be connected to at all, as it is
+    most likely gone (e.g. after a DHCP change).
     """
 
-    def __init__(self, host: str):
+    # Maximum time (in seconds) to wait in between retries.
+    MAX_BACKOFF = 2.0
+
+    def __init__(
+        self,
+        host: str,
+        timeout: float = None,
+        port: int = 1255,
+        on_event: Callable[["Response"], Any] = None,
+        on_metrics: Callable[[metrics.CommandMetrics], Any] = None,
+        retries: int = 0,
+        backoff: float = 0.05,
+        connect_timeout: float = None,
+    ):
         self.host = host
-        self._telnet = None
+        self.timeout = timeout
+        self.port = port
+        self.on_event = on_event
+        self.on_metrics = on_metrics
+        self.retries = retries
+        self.backoff = backoff
+        self.connect_timeout = connect_timeout
+
+        self._sock = None
+        self._buffer = LineBuffer()
 
     def __enter__(self):
         return self
@@ -24,44 +66,384 @@ class Client:
         self.close()
 
     @property
-    def telnet(self):
-        """Telnet client used for interacting with the device."""
-        if self._telnet is None:
-            self._telnet = Telnet(self.host, port=1255)
-        return self._telnet
+    def sock(self) -> socket.socket:
+        """Socket used for interacting with the device."""
+
+        if self._sock is None:
+            timeout = self.connect_timeout
+            if timeout is None:
+                timeout = self.timeout
+
+            if timeout is None:
+                self._sock = socket.create_connection((self.host, self.port))
+            else:
+                self._sock = socket.create_connection(
+                    (self.host, self.port), timeout=timeout
+                )
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._buffer = LineBuffer()
+        return self._sock
+
+    @property
+    def connected(self) -> bool:
+        """Whether the client has an open connection that is still alive."""
+
+        if self._sock is None:
+            return False
+
+        timeout = self._sock.gettimeout()
+
+        try:
+            self._sock.setblocking(False)
+            # A closed connection reads as EOF, whereas any pending data means
+            # we are out of sync with the device. Only an empty (but open)
+            # connection is considered to be alive.
+            self._sock.recv(1, socket.MSG_PEEK)
+        except BlockingIOError:
+            return not self._buffer
+        except OSError:
+            return False
+        finally:
+            self._sock.settimeout(timeout)
+
+        return False
 
     def send_command(self, command: str, params: Dict[str, Any] = None):
         """Sends a heos command to the device, with optional parameters."""
+        return self.send_query(Query(command=command, params=params))
+
+    def send_query(self, query: "Query"):
+        """
+        Sends a (prebuilt) query to the device.
+
+        Queries cache their encoded form, so sending the same query object
+        repeatedly avoids encoding the command again.
+        """
+
+        if self.on_metrics is None and not metrics.HOOKS:
+            return self._send_with_retries(query)
+
+        measured = metrics.CommandMetrics(host=self.host, command=query.command)
+        try:
+            return self._send_with_retries(query, measured=measured)
+        except Exception as err:
+            measured.error = err
+            raise
+        finally:
+            metrics.emit(measured, self.on_metrics)
+
+    def _send_with_retries(
+        self, query: "Query", measured: metrics.CommandMetrics = None
+    ):
+        attempt = 0
+
+        while True:
+            try:
+                return self._send_query(query, measured=measured)
+            except OSError as err:
+                # We can't tell where we are in the stream, so start afresh.
+                self.close()
+
+                if (
+                    attempt >= self.retries
+                    or isinstance(err, ConnectError)
+                    or not is_retryable(query.command, err)
+                ):
+                    raise
+
+            time.sleep(min(self.backoff * 2**attempt, self.MAX_BACKOFF))
+            attempt += 1
+
+            if measured is not None:
+                measured.retries += 1
 
-        query = Query(command=command, params=params)
-        self.telnet.write(bytes(query) + b"\n")
+    def _send_query(self, query: "Query", measured: metrics.CommandMetrics = None):
+        if measured is not None:
+            started = time.perf_counter()
+            connecting = self._sock is None
 
-        response = Response.from_bytes(self.telnet.read_until(b"\r\n"))
+        try:
+            sock = self.sock
+        except OSError as err:
+            raise ConnectError(f"Could not connect to {self.host}: {err}") from err
 
-        return response
+        if measured is not None:
+            now = time.perf_counter()
+            if connecting:
+                measured.phases["connect"] = now - started
+            started = now
+
+        data = query.line
+        sock.settimeout(self.timeout)
+
+        try:
+            sock.sendall(data)
+        except ConnectionError as err:
+            # The connection was already closed by the device (e.g. reset
+            # after a reboot), before it could have read the command.
+            raise NotSentError(f"Could not send command to {self.host}: {err}") from err
+
+        if measured is not None:
+            now = time.perf_counter()
+            measured.phases["write"] = now - started
+            measured.bytes_out = len(data)
+            started, decoding = now, 0.0
+
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+
+        while True:
+            kind, line = self._read_line(deadline, measured=measured)
+
+            if kind == LineBuffer.EVENT and self.on_event is None:
+                continue
+
+            if measured is None:
+                response = Response.from_bytes(line)
+            else:
+                decode_started = time.perf_counter()
+                response = Response.from_bytes(line)
+                decoding += time.perf_counter() - decode_started
+
+            if kind == LineBuffer.EVENT:
+                self.on_event(response)
+                continue
+
+            # Skip stray responses to earlier commands (e.g. one that timed out).
+            if response.command == query.command:
+                if measured is not None:
+                    elapsed = time.perf_counter() - started
+                    measured.phases["wait"] = elapsed - decoding
+                    measured.phases["decode"] = decoding
+                return response
+
+    def _read_line(
+        self, deadline: float = None, measured: metrics.CommandMetrics = None
+    ):
+        while True:
+            line = self._buffer.next_line()
+            if line is not None:
+                return line
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(
+                        f"Timed out waiting for a response from {self.host}"
+                    )
+                self._sock.settimeout(remaining)
+
+            try:
+                received = self._buffer.recv_from(self._sock)
+            except socket.timeout:
+                raise TimeoutError(
+                    f"Timed out waiting for a response from {self.host}"
+                ) from None
+
+            if not received:
+                raise ConnectionError(f"Connection closed by {self.host}")
+
+            if measured is not None:
+                measured.bytes_in += received
 
     def close(self):
-        if self._telnet is not None:
-            self._telnet.close()
-            self._telnet = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+class NotSentError(ConnectionError):
+    """Raised if a command could not be sent to the device at all."""
+
+
+class ConnectError(NotSentError):
+    """Raised if the device could not be connected to."""
+
+
+def is_idempotent(command: str) -> bool:
+    """Whether sending a command more than once has the same effect as once."""
+
+    action = command.rpartition("/")[2]
+    return action.startswith(("get_", "set_")) or action in (
+        "heart_beat",
+        "browse",
+        "search",
+    )
+
+
+def is_retryable(command: str, error: Exception) -> bool:
+    """Whether a command that failed with the given error can safely be resent."""
 
+    if isinstance(error, NotSentError):
+        return True
+    return isinstance(error, OSError) and is_idempotent(command)
 
-@dataclass
+
+class LineBuffer:
+    """
+    Incremental framer that splits data received from a device into lines.
+
+    Data is received straight into the free space at the end of a single
+    reusable buffer. Complete lines are located without re-scanning data that
+    was already searched, and are classified by inspecting only the head of
+    the line, so that (potentially large) lines are only copied out of the
+    buffer once, when they are needed. A line that makes up most of the
+    buffer isn't copied at all, but handed over together with the buffer.
+    Interim "command under process" replies are dropped without being copied.
+    """
+
+    EVENT = "event"
+    RESPONSE = "response"
+
+    # Number of bytes at the start of a line that are inspected when
+    # classifying it. The command and message precede any payload.
+    HEAD_SIZE = 256
+
+    def __init__(self, chunk_size: int = 65536):
+        self.chunk_size = chunk_size
+
+        # Received data is buffer[start:end], followed by free space.
+        self._buffer = bytearray(chunk_size)
+        self._start = 0
+        self._end = 0
+        self._scanned = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def feed(self, data: bytes):
+        """Appends received data to the buffer."""
+
+        self._reserve(len(data))
+        self._buffer[self._end : self._end + len(data)] = data
+        self._end += len(data)
+
+    def recv_from(self, sock: socket.socket) -> int:
+        """Receives data from the given socket into the buffer."""
+
+        self._reserve(self.chunk_size)
+        with memoryview(self._buffer) as view, view[self._end :] as free:
+            received = sock.recv_into(free)
+        self._end += received
+        return received
+
+    def next_line(self) -> Optional[Tuple[str, bytes]]:
+        """Returns the next complete line and its kind, or None if incomplete."""
+
+        buffer = self._buffer
+
+        while True:
+            # Resume searching where we left off (minus one byte, in case the
+            # last chunk ended in between the CR and LF).
+            end = buffer.find(b"\r\n", max(self._start, self._scanned - 1), self._end)
+            if end < 0:
+                self._scanned = self._end
+                return None
+
+            start = self._start
+            self._start = self._scanned = end + 2
+
+            head_end = min(end, start + self.HEAD_SIZE)
+            if buffer.find(b"command under process", start, head_end) >= 0:
+                self._compact()
+                continue
+
+            if buffer.find(b'"event/', start, head_end) >= 0:
+                kind = self.EVENT
+            else:
+                kind = self.RESPONSE
+
+            if self._start == self._end and (end - start) * 2 >= len(buffer):
+                # The line is all of the received data and takes up most of
+                # the buffer, so hand it over instead of copying it.
+                del buffer[end:]
+                del buffer[:start]
+                self._buffer = bytearray(self.chunk_size)
+                self._start = self._end = self._scanned = 0
+                return kind, buffer
+
+            with memoryview(buffer) as view:
+                line = bytes(view[start:end])
+
+            self._compact()
+
+            return kind, line
+
+    def _reserve(self, size: int):
+        # Makes room for (at least) `size` bytes after the received data.
+        free = len(self._buffer) - self._end
+        if free < size:
+            self._buffer += bytes(size - free)
+
+    def _compact(self):
+        # Only move data once at least half of the received data has been
+        # consumed, so that compaction is amortized over many lines.
+        if self._start and self._start * 2 >= self._end:
+            del self._buffer[: self._start]
+            self._end -= self._start
+            self._scanned -= self._start
+            self._start = 0
+
+
+@dataclass(frozen=True, **SLOTS)
 class Query:
     """Class respresenting a HEOS device command or query."""
 
     command: str
     params: Dict[str, Any] = None
 
+    # Encoded line, built on first access.
+    _line: bytes = field(default=None, init=False, repr=False, compare=False)
+
     def __str__(self):
-        param_str = "?" + urlencode(self.params) if self.params else ""
-        return f"heos://{self.command}{param_str}"
+        return bytes(self).decode("ascii")
 
     def __bytes__(self):
-        return str(self).encode("ascii")
+        return self.line[:-1]
+
+    @property
+    def line(self) -> bytes:
+        """Encoded query, as sent to the device (including the newline)."""
+
+        if self._line is None:
+            object.__setattr__(self, "_line", encode_query(self.command, self.params))
+        return self._line
+
+
+# Maximum number of encoded queries that are cached.
+QUERY_CACHE_SIZE = 1024
+
 
+def encode_query(command: str, params: Dict[str, Any] = None) -> bytes:
+    """
+    Encodes a command and its parameters as a line to send to a device.
+
+    Encoded lines are cached (in a bounded LRU cache) by command and parameters,
+    as the same few commands tend to be sent over and over again.
+    """
+
+    if not params:
+        return _encode_query(command, ())
+
+    items = tuple(params.items())
+
+    try:
+        # Value types are part of the key, as equal values of different types
+        # (e.g. True and 1) are encoded differently.
+        return _encode_query(command, items, tuple(map(type, params.values())))
+    except TypeError:
+        # Unhashable parameter values, which we can't cache.
+        return _encode_query.__wrapped__(command, items)
 
-@dataclass
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _encode_query(command: str, items: Tuple[Tuple[str, Any], ...], _types=()):
+    # Devices expect lists (e.g. "pid=1,2") and inputs (e.g. "inputs/aux_in_1")
+    # as is, only "&", "=" and "%" (and spaces) need to be encoded.
+    param_str = "?" + urlencode(items, safe=",/:") if items else ""
+    return f"heos://{command}{param_str}\n".encode("ascii")
+
+
+@dataclass(frozen=True, **SLOTS)
 class Response:
     """Class representing a response from a HEOS device."""
 
@@ -70,22 +452,33 @@ class Response:
     message: str
     payload: Dict[str, Any]
 
+    # Message fields, parsed on first access.
+    _fields: Dict[str, str] = field(default=None, init=False, repr=False, compare=False)
+
     @classmethod
     def from_bytes(cls, bytes_: bytes):
         """Builds an instance from the given response bytes."""
 
-        data = json.loads(bytes_.decode("utf-8"))
+        data = json_loads(bytes_)
+        heos = data["heos"]
         return cls(
-            command=data["heos"]["command"],
-            result=data["heos"]["result"],
-            message=data["heos"]["message"],
+            command=heos["command"],
+            # Events sent by the device do not include a result.
+            result=heos.get("result"),
+            message=heos.get("message", ""),
             payload=data.get("payload"),
         )
 
     @property
     def message_fields(self) -> Dict[str, str]:
-        """Parsed message fields."""
-        return dict(parse_qsl(self.message))
+        """Parsed message fields (shared between accesses, so treat as read-only)."""
+
+        if self._fields is None:
+            # Field names are interned, as the same few names occur in
+            # (nearly) every response.
+            fields = {sys.intern(key): value for key, value in parse_qsl(self.message)}
+            object.__setattr__(self, "_fields", fields)
+        return self._fields
 
     def raise_for_result(self):
         """Raises an error if the response result was not successful."""
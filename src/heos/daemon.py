@@ -0,0 +1,256 @@
+import json
+import os
+import socketserver
+from dataclasses import asdict
+from enum import Enum
+from typing import Any, Dict, Iterable, Iterator
+
+from . import metrics
+from ._errors import error_message
+from .batch import Operation
+from .browse import Paged
+from .player import Player, PlayerGroup
+from .ramp import Ramp
+from .remote import DaemonClient, default_socket_path
+from .scene import Scene
+
+
+class Daemon:
+    """
+    Long-running process that serves HEOS commands over a local control socket.
+
+    The daemon holds the registry, its (warm) pooled connections and an event
+    driven state cache in memory, so that clients (e.g. the CLI) only pay for a
+    single local round trip per command, instead of setting up the registry
+    and a connection to the device themselves.
+
+    Requests and responses are sent as JSON lines. Requests address a player,
+    group or the registry itself, for example:
+
+        {"kind": "player", "name": "Kitchen", "action": "set", "attr": "volume",
+         "value": 20}
+
+    Requests whose results come in one by one (batches, snapshots and paged
+    listings such as the queue) are answered with a line marking the stream,
+    a line per result (with an "item") as soon as it is available and the
+    usual final line. Only the properties and methods of players and groups
+    can be accessed (see heos.remote for the client side).
+    """
+
+    def __init__(
+        self,
+        registry,
+        socket_path: str = None,
+        listen: bool = True,
+        collect_metrics: bool = True,
+    ):
+        self.registry = registry
+        self.socket_path = socket_path or default_socket_path()
+        self.listen = listen
+        self.collect_metrics = collect_metrics
+
+        self._server = None
+        self._listener = None
+        self._tracker = None
+
+    def serve_forever(self):
+        """Serves requests until shutdown is called (or the process is stopped)."""
+
+        if os.path.exists(self.socket_path):
+            client = DaemonClient.connect(self.socket_path)
+            if client is not None:
+                client.close()
+                raise RuntimeError(f"Daemon already running on {self.socket_path}")
+
+            # Stale socket file left behind by a daemon that was killed.
+            os.unlink(self.socket_path)
+
+        if self.collect_metrics:
+            metrics.enable()
+
+        if self.listen and self.registry.players:
+            self._listener = self.registry.listen()
+
+            try:
+                self._tracker = self.registry.track()
+            except OSError:
+                # Can't listen for SSDP announcements (e.g. no multicast),
+                # the registry is still revalidated once entries expire.
+                self._tracker = None
+
+        daemon = self
+
+        class _Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    responses = daemon.handle_request(line)
+                    try:
+                        for response in responses:
+                            self.wfile.write(response)
+                    except OSError:
+                        # The client went away (e.g. interrupted) in the mean
+                        # time, so stop whatever is still running for it.
+                        responses.close()
+                        return
+
+        self._server = socketserver.ThreadingUnixStreamServer(
+            self.socket_path, _Handler
+        )
+        self._server.daemon_threads = True
+
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            os.unlink(self.socket_path)
+
+            if self._listener is not None:
+                self._listener.stop()
+            if self._tracker is not None:
+                self._tracker.stop()
+
+    def shutdown(self):
+        """Stops serving requests (from another thread)."""
+
+        if self._server is not None:
+            self._server.shutdown()
+
+    def handle_request(self, line: bytes) -> Iterator[bytes]:
+        """Handles a (JSON-encoded) request, yielding its (encoded) response lines."""
+
+        try:
+            request = json.loads(line)
+            result = self._dispatch(request)
+
+            if isinstance(result, _Stream):
+                yield _encode({"ok": True, "stream": True})
+                for item in result.items:
+                    yield _encode({"ok": True, "item": _to_json(item)})
+                result = None
+
+            # Encoded here, so that results that can't be encoded are
+            # reported as an error (instead of dropping the connection).
+            response = _encode({"ok": True, "result": _to_json(result)})
+        except Exception as err:  # pylint: disable=broad-except
+            yield _encode(
+                {"ok": False, "error": error_message(err), "type": type(err).__name__}
+            )
+            return
+
+        yield response
+
+    def _dispatch(self, request):
+        kind = request["kind"]
+
+        if kind == "registry":
+            return self._dispatch_registry(request)
+        if kind == "stats":
+            return self._dispatch_stats(request)
+
+        if kind == "player":
+            target = self.registry.players[request["name"]]
+        elif kind == "group":
+            target = self.registry.groups[request["name"]]
+        else:
+            raise ValueError(f"Unknown request kind {kind!r}")
+
+        action, attr = request["action"], request["attr"]
+
+        # Only give access to the public interface of players and groups
+        # (as mirrored by RemoteTarget), not to their internals (e.g. pool).
+        member = None if attr.startswith("_") else getattr(type(target), attr, None)
+
+        if action == "get" and isinstance(member, property):
+            result = getattr(target, attr)
+        elif action == "set" and isinstance(member, property) and member.fset:
+            setattr(target, attr, request["value"])
+            return None
+        elif action == "call" and callable(member):
+            result = getattr(target, attr)(*request.get("args", []))
+        elif action in ("get", "set", "call"):
+            raise ValueError(f"Cannot {action} {attr!r} of a {kind}")
+        else:
+            raise ValueError(f"Unknown action {action!r}")
+
+        if isinstance(result, Paged):
+            # Sent page by page, instead of loading the whole listing first.
+            return _Stream(result)
+        return result
+
+    def _dispatch_registry(self, request):
+        action = request["action"]
+
+        if action == "names":
+            return {
+                "players": list(self.registry.players.keys()),
+                "groups": list(self.registry.groups.keys()),
+            }
+        if action == "discover":
+            self.registry.discover()
+            return None
+        if action == "batch":
+            operations = [Operation(**operation) for operation in request["operations"]]
+            results = self.registry.batch(
+                operations,
+                concurrency=request.get("concurrency", 16),
+                timeout=request.get("timeout"),
+                total_timeout=request.get("total_timeout"),
+            )
+            return _Stream(result.to_dict() for result in results)
+        if action == "plan_scene":
+            operations = self.registry.plan_scene(
+                Scene.from_dict(request["scene"]), timeout=request.get("timeout", 5.0)
+            )
+            return [asdict(operation) for operation in operations]
+        if action == "apply_scene":
+            result = self.registry.apply_scene(
+                Scene.from_dict(request["scene"]),
+                concurrency=request.get("concurrency", 16),
+                timeout=request.get("timeout"),
+                rollback=request.get("rollback", True),
+            )
+            return result.to_dict()
+        if action == "snapshot":
+            statuses = self.registry.snapshot(
+                concurrency=request.get("concurrency", 16),
+                timeout=request.get("timeout", 5.0),
+            )
+            return _Stream(status.to_dict() for status in statuses)
+
+        raise ValueError(f"Unknown registry action {action!r}")
+
+    def _dispatch_stats(self, request):
+        registry = metrics.default_registry()
+        format_ = request.get("format", "json")
+
+        if format_ == "json":
+            return registry.to_dict()
+        if format_ == "prometheus":
+            return registry.to_prometheus()
+
+        raise ValueError(f"Unknown stats format {format_!r}")
+
+
+class _Stream:
+    """Result of a request that is sent as a line per item (see Daemon)."""
+
+    def __init__(self, items: Iterable[Any]):
+        self.items = items
+
+
+def _encode(response: Dict[str, Any]) -> bytes:
+    return json.dumps(response).encode("utf-8") + b"\n"
+
+
+def _to_json(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (Player, PlayerGroup)):
+        return value.name
+    if isinstance(value, Ramp):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return {key: _to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, Paged)):
+        return [_to_json(item) for item in value]
+    return value
@@ -0,0 +1,274 @@
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+from .aio import AsyncClient
+from .client import Response
+from .nowplaying import NowPlayingCache
+from .state import StateCache
+from .topology import Topology
+
+
+@dataclass
+class Event:
+    """Class representing a change event pushed by a HEOS device."""
+
+    name: str
+    fields: Dict[str, str]
+
+    @classmethod
+    def from_response(cls, response: Response):
+        """Builds an instance from an (event) response."""
+        return cls(
+            name=response.command[len("event/") :], fields=response.message_fields
+        )
+
+
+class EventListener:
+    """
+    Listens for change events from a HEOS device on a dedicated connection.
+
+    Received events are used to keep a StateCache up to date, which players and
+    groups can use to serve property reads without any network traffic. Events
+    can also be consumed directly, either by registering a callback or by
+    iterating over the listener asynchronously:
+
+        async for event in listener:
+            print(event.name, event.fields)
+
+    As any HEOS device reports changes for the whole system, a single listener
+    is enough to track all players and groups. Whenever groups change, the new
+    groups are passed to the topology index and/or to `on_groups` (if given),
+    as the payload of a group/get_groups response. Likewise, whenever players
+    change (e.g. are renamed), the new players are passed to `on_players` as
+    the payload of a player/get_players response.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        state: StateCache = None,
+        port: int = 1255,
+        reconnect_delay: float = 5.0,
+        topology: Topology = None,
+        now_playing: NowPlayingCache = None,
+        on_groups: Callable[[List[Dict[str, Any]]], Any] = None,
+        on_players: Callable[[List[Dict[str, Any]]], Any] = None,
+    ):
+        self.host = host
+        self.state = state if state is not None else StateCache()
+        self.topology = topology
+        self.now_playing = now_playing
+        self.on_groups = on_groups
+        self.on_players = on_players
+        self.port = port
+        self.reconnect_delay = reconnect_delay
+
+        self._client = None
+        self._callbacks: List[Callable[[Event], Any]] = []
+        self._queues: List[asyncio.Queue] = []
+
+        self._loop = None
+        self._stopped = None
+        self._thread = None
+
+    def __aiter__(self):
+        return self._iter_events()
+
+    async def _iter_events(self):
+        queue = asyncio.Queue()
+        self._queues.append(queue)
+
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._queues.remove(queue)
+
+    def add_callback(self, callback: Callable[[Event], Any]):
+        """Registers a callback that is called for every received event."""
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[Event], Any]):
+        """Removes a previously registered callback."""
+        self._callbacks.remove(callback)
+
+    async def run(self):
+        """Listens for events until stopped, reconnecting if the connection drops."""
+
+        self._loop = asyncio.get_running_loop()
+        if self._stopped is None:
+            self._stopped = asyncio.Event()
+
+        while not self._stopped.is_set():
+            try:
+                await self._listen()
+            except (OSError, ValueError, asyncio.TimeoutError):
+                pass
+            finally:
+                # We may miss events while disconnected, so anything
+                # that is cached can no longer be trusted.
+                self.state.deactivate()
+
+            try:
+                await asyncio.wait_for(
+                    self._stopped.wait(), timeout=self.reconnect_delay
+                )
+            except asyncio.TimeoutError:
+                pass
+
+        self._stopped = None
+
+    async def _listen(self):
+        async with AsyncClient(self.host, port=self.port) as client:
+            self._client = client
+            client.add_event_handler(self._handle_event)
+
+            try:
+                response = await client.send_command(
+                    "system/register_for_change_events", params={"enable": "on"}
+                )
+                response.raise_for_result()
+                self.state.activate()
+
+                # Players and groups may have changed whilst we weren't listening.
+                if self.on_players is not None or self._tracks_groups:
+                    await self._refresh_players()
+
+                # Wait for either the connection to drop or the listener to be
+                # stopped. The read loop of the client fails any pending
+                # command once the connection is lost.
+                closed = asyncio.ensure_future(client.wait_closed())
+                stopped = asyncio.ensure_future(self._stopped.wait())
+                await asyncio.wait(
+                    [closed, stopped], return_when=asyncio.FIRST_COMPLETED
+                )
+                closed.cancel()
+                stopped.cancel()
+            finally:
+                self._client = None
+
+    def start(self):
+        """Starts listening in a background thread (for use from synchronous code)."""
+
+        if self._thread is not None:
+            return
+
+        started = threading.Event()
+
+        async def _run():
+            self._loop = asyncio.get_running_loop()
+            self._stopped = asyncio.Event()
+            started.set()
+            await self.run()
+
+        self._thread = threading.Thread(
+            target=asyncio.run, args=(_run(),), name="heos-events", daemon=True
+        )
+        self._thread.start()
+        started.wait()
+
+    def stop(self):
+        """Stops listening for events."""
+
+        if self._loop is not None and self._stopped is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _handle_event(self, response: Response):
+        event = Event.from_response(response)
+
+        self._update_state(event)
+
+        for callback in list(self._callbacks):
+            callback(event)
+
+        for queue in self._queues:
+            queue.put_nowait(event)
+
+    def _update_state(self, event: Event):
+        fields = event.fields
+
+        if event.name == "player_state_changed":
+            self.state.update_player(fields["pid"], play_state=fields["state"])
+        elif event.name == "player_volume_changed":
+            self.state.update_player(
+                fields["pid"], volume=int(fields["level"]), mute=fields["mute"] == "on"
+            )
+        elif event.name == "group_volume_changed":
+            self.state.update_group(
+                fields["gid"], volume=int(fields["level"]), mute=fields["mute"] == "on"
+            )
+        elif event.name == "player_now_playing_changed":
+            self.state.invalidate_player(fields["pid"], "now_playing")
+            if self.now_playing is not None:
+                self.now_playing.invalidate(fields["pid"])
+            asyncio.ensure_future(self._refresh_now_playing(fields["pid"]))
+        elif event.name == "groups_changed":
+            self.state.invalidate_groups()
+            if self._tracks_groups:
+                asyncio.ensure_future(self._refresh_groups())
+        elif event.name == "players_changed":
+            self.state.invalidate_players()
+            if self.on_players is not None or self._tracks_groups:
+                asyncio.ensure_future(self._refresh_players())
+
+    @property
+    def _tracks_groups(self) -> bool:
+        return self.topology is not None or self.on_groups is not None
+
+    async def _refresh_groups(self):
+        client = self._client
+        if client is None:
+            return
+
+        try:
+            response = await client.send_command("group/get_groups")
+        except (OSError, asyncio.TimeoutError):
+            return
+
+        if response.result == "success":
+            if self.topology is not None:
+                self.topology.update_from_payload(response.payload)
+            if self.on_groups is not None:
+                self.on_groups(response.payload)
+
+    async def _refresh_players(self):
+        client = self._client
+        if client is None:
+            return
+
+        if self.on_players is not None:
+            try:
+                response = await client.send_command("player/get_players")
+            except (OSError, asyncio.TimeoutError):
+                return
+
+            if response.result == "success":
+                self.on_players(response.payload)
+
+        # Groups refer to players by name, so are refreshed as well.
+        if self._tracks_groups:
+            await self._refresh_groups()
+
+    async def _refresh_now_playing(self, pid: str):
+        client = self._client
+        if client is None:
+            return
+
+        since = self.state.version
+        try:
+            response = await client.send_command(
+                "player/get_now_playing_media", params={"pid": pid}
+            )
+        except (OSError, asyncio.TimeoutError):
+            return
+
+        if response.result == "success":
+            self.state.update_player(pid, since=since, now_playing=response.payload)
+            if self.now_playing is not None:
+                self.now_playing.update(pid, response.payload)
@@ -0,0 +1,81 @@
+import threading
+import time
+from typing import Callable, Dict, List
+
+from .client import Query, Response, is_retryable
+from .pool import PoolTimeoutError
+
+
+class Failover:
+    """
+    Fails commands over to other known hosts if a host can't be reached.
+
+    As every HEOS device can control the whole system, a command for a player
+    whose host is unreachable (e.g. after a reboot or DHCP change) can be sent
+    to any other device instead. Hosts that fail are tried last for the next
+    `cooldown` seconds, and the registry is asked to refresh their entries in
+    the background, so that it picks up the new address of the device. Waiting
+    for a free pooled connection (i.e. a busy host) doesn't count as a failure.
+    """
+
+    def __init__(self, registry, cooldown: float = 30.0):
+        self.registry = registry
+        self.cooldown = cooldown
+
+        self._lock = threading.Lock()
+        self._failed: Dict[str, float] = {}
+
+    def hosts(self, host: str) -> List[str]:
+        """Hosts to try for a command to the given host, in order."""
+
+        candidates = [host] + [other for other in self.registry.hosts if other != host]
+
+        now = time.monotonic()
+        with self._lock:
+            failed = {
+                candidate
+                for candidate, failed_at in self._failed.items()
+                if now - failed_at < self.cooldown
+            }
+
+        # Stable sort, keeping the given host first unless it failed recently.
+        return sorted(candidates, key=lambda candidate: candidate in failed)
+
+    def send(
+        self, host: str, query: Query, send: Callable[[str, Query], Response]
+    ) -> Response:
+        """Sends a query using the given function, failing over to other hosts."""
+
+        hosts = self.hosts(host)
+
+        for idx, candidate in enumerate(hosts):
+            try:
+                response = send(candidate, query)
+            except PoolTimeoutError:
+                raise
+            except OSError as err:
+                self.mark_failed(candidate)
+
+                if idx == len(hosts) - 1 or not is_retryable(query.command, err):
+                    raise
+            else:
+                self.mark_healthy(candidate)
+                return response
+
+    def mark_failed(self, host: str):
+        """Marks a host as unreachable, refreshing its entries in the background."""
+
+        with self._lock:
+            already_failed = host in self._failed
+            self._failed[host] = time.monotonic()
+
+        if not already_failed:
+            self.registry.expire(host)
+            self.registry.revalidate_in_background()
+
+    def mark_healthy(self, host: str):
+        """Marks a host as reachable again."""
+
+        if host in self._failed:
+            with self._lock:
+                self._failed.pop(host, None)
@@ -0,0 +1,275 @@
+import bisect
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Tuple
+
+
+@dataclass
+class CommandMetrics:
+    """
+    Measurements for a single command sent by a client.
+
+    Phases (in seconds) are "connect" (only if a connection had to be opened),
+    "write", "wait" (for the response to arrive) and "decode" (of the JSON
+    response and of any events received in the mean time).
+    """
+
+    host: str
+    command: str
+    phases: Dict[str, float] = field(default_factory=dict)
+    bytes_out: int = 0
+    bytes_in: int = 0
+    retries: int = 0
+    error: Exception = None
+
+    @property
+    def duration(self) -> float:
+        """Total time spent on the command (in seconds)."""
+        return sum(self.phases.values())
+
+
+# Hooks that are called with the metrics of every command sent by any client.
+# Clients only take measurements if a hook is registered (or if they were
+# given their own on_metrics callback), so this costs next to nothing if empty.
+HOOKS: List[Callable[[CommandMetrics], Any]] = []
+
+
+def add_hook(hook: Callable[[CommandMetrics], Any]):
+    """Registers a hook that is called with the metrics of every command."""
+    HOOKS.append(hook)
+
+
+def remove_hook(hook: Callable[[CommandMetrics], Any]):
+    """Removes a previously registered hook."""
+    HOOKS.remove(hook)
+
+
+def emit(metrics: CommandMetrics, callback: Callable[[CommandMetrics], Any] = None):
+    """Passes command metrics to the given callback and to all registered hooks."""
+
+    if callback is not None:
+        callback(metrics)
+
+    for hook in list(HOOKS):
+        hook(metrics)
+
+
+class Histogram:
+    """Histogram of observed values, using fixed (upper bound) buckets."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """Cumulative counts per bucket (keyed by upper bound), as in Prometheus."""
+
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+
+        total, cumulative = 0, []
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            cumulative.append((bound, total))
+
+        return cumulative
+
+
+class MetricsRegistry:
+    """
+    In-memory registry of command metrics, aggregated into histograms/counters.
+
+    Instances are callable, so that they can be registered directly as hook
+    (see add_hook) or passed as on_metrics callback to a client. Collected
+    metrics can be exported in the Prometheus text format or as JSON.
+    """
+
+    # Bucket upper bounds (in seconds) for timing histograms.
+    BUCKETS = (
+        0.0005,
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+        10.0,
+    )
+
+    DESCRIPTIONS = {
+        "heos_command_duration_seconds": "Total time taken by HEOS commands.",
+        "heos_command_phase_seconds": "Time taken by each phase of HEOS commands.",
+        "heos_command_bytes_sent_total": "Bytes sent to HEOS devices.",
+        "heos_command_bytes_received_total": "Bytes received from HEOS devices.",
+        "heos_command_retries_total": "Retries of HEOS commands.",
+        "heos_command_errors_total": "HEOS commands that failed with an error.",
+    }
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Tuple], Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+
+    def __call__(self, metrics: CommandMetrics):
+        self.record(metrics)
+
+    def record(self, metrics: CommandMetrics):
+        """Aggregates the metrics of a single command."""
+
+        command = (("command", metrics.command),)
+
+        with self._lock:
+            self._observe("heos_command_duration_seconds", command, metrics.duration)
+
+            for phase, duration in metrics.phases.items():
+                self._observe(
+                    "heos_command_phase_seconds",
+                    command + (("phase", phase),),
+                    duration,
+                )
+
+            self._increment("heos_command_bytes_sent_total", command, metrics.bytes_out)
+            self._increment(
+                "heos_command_bytes_received_total", command, metrics.bytes_in
+            )
+
+            if metrics.retries:
+                self._increment("heos_command_retries_total", command, metrics.retries)
+
+            if metrics.error is not None:
+                self._increment(
+                    "heos_command_errors_total",
+                    command + (("error", type(metrics.error).__name__),),
+                    1,
+                )
+
+    def _observe(self, name, labels, value):
+        histogram = self._histograms.get((name, labels))
+        if histogram is None:
+            histogram = self._histograms[(name, labels)] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def _increment(self, name, labels, value):
+        self._counters[(name, labels)] = self._counters.get((name, labels), 0) + value
+
+    def reset(self):
+        """Clears all collected metrics."""
+
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Exports collected metrics as a (JSON-serializable) dict."""
+
+        with self._lock:
+            histograms = [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "buckets": dict(histogram.cumulative()),
+                    "sum": histogram.sum,
+                    "count": histogram.count,
+                }
+                for (name, labels), histogram in sorted(self._histograms.items())
+            ]
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+
+        return {"histograms": histograms, "counters": counters}
+
+    def to_json(self) -> str:
+        """Exports collected metrics as JSON."""
+        return json.dumps(self.to_dict())
+
+    def to_prometheus(self) -> str:
+        """Exports collected metrics in the Prometheus text exposition format."""
+
+        lines = []
+        described = set()
+
+        def _describe(name, type_):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {self.DESCRIPTIONS.get(name, name)}")
+                lines.append(f"# TYPE {name} {type_}")
+
+        with self._lock:
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                _describe(name, "histogram")
+                for bound, count in histogram.cumulative():
+                    bucket_labels = _format_labels(labels + (("le", bound),))
+                    lines.append(f"{name}_bucket{bucket_labels} {count}")
+                lines.append(
+                    f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}"
+                )
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+            for (name, labels), value in sorted(self._counters.items()):
+                _describe(name, "counter")
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def default_registry() -> MetricsRegistry:
+    """Returns the (shared) default metrics registry."""
+
+    global _default_registry
+
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = MetricsRegistry()
+        return _default_registry
+
+
+def enable() -> MetricsRegistry:
+    """Starts collecting metrics of all commands in the default registry."""
+
+    registry = default_registry()
+    if registry not in HOOKS:
+        add_hook(registry)
+    return registry
+
+
+def disable():
+    """Stops collecting metrics in the default registry."""
+
+    registry = default_registry()
+    if registry in HOOKS:
+        remove_hook(registry)
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+
+    def _escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
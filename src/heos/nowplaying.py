@@ -0,0 +1,214 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Callback for changes of the media that a player is playing: (pid, now_playing).
+Callback = Callable[[int, Dict[str, Any]], Any]
+
+
+def media_key(now_playing: Dict[str, Any]) -> Tuple:
+    """
+    Key identifying the media that is being played (e.g. a track in the queue).
+
+    Media is identified by its media id and queue id. Stations keep the same
+    media id whilst playing different songs, so their song is included too.
+    """
+
+    if not now_playing:
+        return ()
+
+    key = (now_playing.get("mid"), now_playing.get("qid"))
+    if now_playing.get("type") == "station" or key == (None, None):
+        key += (now_playing.get("song"), now_playing.get("artist"))
+    return key
+
+
+class NowPlayingCache:
+    """
+    Cache of the media that players are playing, with change notifications.
+
+    Cached media is served for `ttl` seconds (or not at all if `ttl` is 0, in
+    which case the cache only detects changes). Whenever new media info comes
+    in (e.g. after the TTL expired or after a now playing changed event),
+    callbacks are only called if the media actually changed (see media_key),
+    so that displays only need to redraw when the track changes. If given an
+    artwork cache, the artwork of new media is fetched in the background.
+    """
+
+    def __init__(self, ttl: float = 5.0, artwork: "ArtworkCache" = None):
+        self.ttl = ttl
+        self.artwork = artwork
+
+        self._lock = threading.Lock()
+        self._entries: Dict[int, Tuple[float, Tuple, Dict[str, Any]]] = {}
+        self._callbacks: List[Callback] = []
+
+    def add_callback(self, callback: Callback):
+        """Registers a callback that is called when a player plays new media."""
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback: Callback):
+        """Removes a previously registered callback."""
+        self._callbacks.remove(callback)
+
+    def get(self, pid: int) -> Optional[Dict[str, Any]]:
+        """Returns the cached media of a player, or None if unknown or expired."""
+
+        entry = self._entries.get(int(pid))
+        if entry is None or time.monotonic() - entry[0] >= self.ttl:
+            return None
+        return entry[2]
+
+    def update(self, pid: int, now_playing: Dict[str, Any]) -> bool:
+        """Caches the media of a player, returning whether the media changed."""
+
+        pid, key = int(pid), media_key(now_playing)
+
+        with self._lock:
+            previous = self._entries.get(pid)
+            self._entries[pid] = (time.monotonic(), key, now_playing)
+            changed = previous is None or previous[1] != key
+
+        if changed:
+            image_url = (now_playing or {}).get("image_url")
+            if self.artwork is not None and image_url:
+                self.artwork.prefetch(image_url)
+
+            for callback in list(self._callbacks):
+                callback(pid, now_playing)
+
+        return changed
+
+    def invalidate(self, pid: int):
+        """Expires the cached media of a player (keeping it to detect changes)."""
+
+        with self._lock:
+            entry = self._entries.get(int(pid))
+            if entry is not None:
+                self._entries[int(pid)] = (float("-inf"), entry[1], entry[2])
+
+    def artwork_path(self, pid: int) -> Optional[str]:
+        """Local path of the artwork of the cached media (if already fetched)."""
+
+        entry = self._entries.get(int(pid))
+        image_url = (entry[2] or {}).get("image_url") if entry is not None else None
+        if self.artwork is None or not image_url:
+            return None
+        return self.artwork.cached(image_url)
+
+
+class ArtworkCache:
+    """
+    Bounded on-disk LRU cache of artwork images, keyed by their URL.
+
+    Images are stored in `directory`, which holds at most `max_entries` images
+    and `max_bytes` bytes. Images that were used least recently are removed
+    first (using their modification time, which is updated on every use).
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_entries: int = 256,
+        max_bytes: int = 64 * 1024 * 1024,
+        timeout: float = 5.0,
+    ):
+        self.directory = os.path.expanduser(directory)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._fetching = set()
+
+    def path(self, url: str) -> str:
+        """Path at which the image for the given URL is (or would be) stored."""
+
+        name = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name)
+
+    def cached(self, url: str) -> Optional[str]:
+        """Returns the path of the image for the given URL, if it was fetched."""
+
+        path = self.path(url)
+        try:
+            # Mark the image as recently used.
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def get(self, url: str) -> str:
+        """Returns the path of the image for the given URL, fetching it if needed."""
+
+        path = self.cached(url)
+        if path is not None:
+            return path
+
+        from urllib.request import urlopen
+
+        with urlopen(url, timeout=self.timeout) as response:
+            data = response.read()
+
+        path = self.path(url)
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Write to a temporary file first, so readers never see partial images.
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as file_:
+            file_.write(data)
+        os.replace(tmp_path, path)
+
+        self._evict()
+
+        return path
+
+    def prefetch(self, url: str):
+        """Fetches the image for the given URL in the background (if not cached)."""
+
+        if self.cached(url) is not None:
+            return
+
+        with self._lock:
+            if url in self._fetching:
+                return
+            self._fetching.add(url)
+
+        threading.Thread(
+            target=self._prefetch, args=(url,), name="heos-artwork", daemon=True
+        ).start()
+
+    def _prefetch(self, url):
+        try:
+            self.get(url)
+        except (OSError, ValueError):
+            # Artwork is optional, we'll try again when it's needed.
+            pass
+        finally:
+            with self._lock:
+                self._fetching.discard(url)
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            with os.scandir(self.directory) as dir_entries:
+                for entry in dir_entries:
+                    if entry.is_file() and not entry.name.endswith(".tmp"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            # Least recently used entries first.
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+
+            while entries and (
+                len(entries) > self.max_entries or total > self.max_bytes
+            ):
+                _, size, path = entries.pop(0)
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                total -= size
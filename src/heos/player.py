@@ -1,8 +1,16 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Dict
+from typing import Any, Dict, Iterable
 
-from .client import Client
+from .browse import Paged
+from .client import Query, Response
+from .failover import Failover
+from .nowplaying import NowPlayingCache
+from .pool import ConnectionPool, default_pool
+from .ramp import Ramp
+from .scheduler import Scheduler
+from .state import StateCache
+from .topology import Topology
 
 
 class PlayState(Enum):
@@ -13,35 +21,144 @@ class PlayState(Enum):
     stop = "stop"
 
 
+# Fields holding the connection pool, caches etc., which players and groups
+# share with the players they create (e.g. the leader of a group).
+SHARED_FIELDS = ("pool", "state", "scheduler", "failover", "now_playing_cache")
+
+
 @dataclass
-class Player:
-    """
-    Class representing a HEOS player, used for issuing commands to specific players.
-    """
+class _Target:
+    """Base class of players and groups, sending commands on their behalf."""
+
+    # Parameter identifying the target in commands and kind of its state.
+    _ID_PARAM = None
+    _KIND = None
 
     id: int
     name: str
     host: str
+    pool: ConnectionPool = field(default=None, repr=False, compare=False)
+    state: StateCache = field(default=None, repr=False, compare=False)
+    scheduler: Scheduler = field(default=None, repr=False, compare=False)
+    failover: Failover = field(default=None, repr=False, compare=False)
+    now_playing_cache: NowPlayingCache = field(default=None, repr=False, compare=False)
+
+    # Prebuilt queries for commands that only take the id of the target.
+    _queries: Dict[str, Query] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
 
     def __post_init__(self):
-        self.client = Client(self.host)
+        if self.pool is None:
+            self.pool = default_pool()
 
     def __enter__(self):
         return self
 
     def __exit__(self, exec_type, exec_value, exec_traceback):
-        self.client.close()
+        # Connections are returned to the pool after every command,
+        # so there is nothing left to close here.
+        pass
+
+    def _send_command(
+        self, command: str, params: Dict[str, Any], key: Any = None
+    ) -> Response:
+        return self._send_query(Query(command=command, params=params), key=key)
+
+    def _send_query(self, query: Query, key: Any = None) -> Response:
+        if self.failover is not None:
+            response = self.failover.send(
+                self.host, query, lambda host, query: self._send_to(host, query, key)
+            )
+        else:
+            response = self._send_to(self.host, query, key)
+        response.raise_for_result()
+        return response
+
+    def _send_to(self, host: str, query: Query, key: Any = None) -> Response:
+        if self.scheduler is not None:
+            # Writes with the same key (e.g. volume changes) are coalesced.
+            return self.scheduler.send(host, query, key=key)
+
+        with self.pool.connection(host) as client:
+            return client.send_query(query)
+
+    def _query(self, command: str) -> Query:
+        """Returns the (prebuilt) query for a command that only takes the id."""
+
+        query = self._queries.get(command)
+        if query is None:
+            query = self._queries[command] = Query(
+                command, params={self._ID_PARAM: self.id}
+            )
+        return query
+
+    def _get_cached(self, key: str):
+        if self.state is None:
+            return None
+        return getattr(self.state, f"get_{self._KIND}")(self.id, key)
+
+    def _cache_version(self):
+        # Taken before sending a command, see StateCache.update_player.
+        return self.state.version if self.state is not None else None
+
+    def _set_cached(self, since, **values):
+        if self.state is not None:
+            getattr(self.state, f"update_{self._KIND}")(self.id, since=since, **values)
+
+    def _player(self, pid: int, name: str) -> "Player":
+        """Player on the same host, sharing the pool, caches etc. of this target."""
+
+        shared = {attr: getattr(self, attr) for attr in SHARED_FIELDS}
+        return Player(id=pid, name=name, host=self.host, **shared)
+
+    def ramp_volume(
+        self,
+        level: int,
+        duration: float,
+        curve: str = "linear",
+        interval: float = 0.1,
+        wait: bool = True,
+    ) -> Ramp:
+        """
+        Gradually changes the volume to `level` over `duration` seconds.
+
+        The volume follows the given curve (see heos.ramp.CURVES), in steps
+        of `interval` seconds. Returns the ramp, which is still running (and
+        can be cancelled) if `wait` is False.
+        """
+
+        ramp = Ramp(self, level, duration, curve=curve, interval=interval).start()
+        if wait:
+            ramp.wait()
+        return ramp
+
+
+@dataclass
+class Player(_Target):
+    """
+    Class representing a HEOS player, used for issuing commands to specific players.
+
+    If given an (active) state cache, property reads are served from the cache
+    where possible, instead of querying the device.
+    """
+
+    _ID_PARAM = "pid"
+    _KIND = "player"
 
     @property
     def volume(self) -> int:
         """Player volume."""
 
-        response = self.client.send_command(
-            "player/get_volume", params={"pid": self.id}
-        )
-        response.raise_for_result()
+        volume = self._get_cached("volume")
+
+        if volume is None:
+            since = self._cache_version()
+            response = self._send_query(self._query("player/get_volume"))
+            volume = int(response.message_fields["level"])
+            self._set_cached(since, volume=volume)
 
-        return int(response.message_fields["level"])
+        return volume
 
     @volume.setter
     def volume(self, value: int):
@@ -50,52 +167,93 @@ class Player:
         elif value > 100:
             value = 100
 
-        response = self.client.send_command(
-            "player/set_volume", params={"pid": self.id, "level": value}
+        since = self._cache_version()
+        response = self._send_command(
+            "player/set_volume",
+            params={"pid": self.id, "level": value},
+            key=("player/set_volume", self.id),
         )
-        response.raise_for_result()
+
+        # The response may be for a newer (coalesced) value.
+        self._set_cached(since, volume=int(response.message_fields.get("level", value)))
 
     @property
     def mute(self) -> bool:
         """Player mute status."""
 
-        response = self.client.send_command("player/get_mute", params={"pid": self.id})
-        response.raise_for_result()
+        mute = self._get_cached("mute")
 
-        return response.message_fields["state"] == "on"
+        if mute is None:
+            since = self._cache_version()
+            response = self._send_query(self._query("player/get_mute"))
+            mute = response.message_fields["state"] == "on"
+            self._set_cached(since, mute=mute)
+
+        return mute
 
     @mute.setter
     def mute(self, value: bool):
-        response = self.client.send_command(
+        since = self._cache_version()
+        response = self._send_command(
             "player/set_mute",
             params={"pid": self.id, "state": "on" if value else "off"},
+            key=("player/set_mute", self.id),
         )
-        response.raise_for_result()
+        state = response.message_fields.get("state", "on" if value else "off")
+        self._set_cached(since, mute=state == "on")
 
     @property
     def now_playing(self) -> Dict[Any, Any]:
         """Media that is currently being played."""
 
-        response = self.client.send_command(
-            "player/get_now_playing_media", params={"pid": self.id}
-        )
-        response.raise_for_result()
+        now_playing = self._get_cached("now_playing")
+
+        if now_playing is None and self.now_playing_cache is not None:
+            now_playing = self.now_playing_cache.get(self.id)
+
+        if now_playing is None:
+            since = self._cache_version()
+            response = self._send_query(self._query("player/get_now_playing_media"))
+            now_playing = response.payload
+            self._set_cached(since, now_playing=now_playing)
 
-        return response.payload
+            if self.now_playing_cache is not None:
+                self.now_playing_cache.update(self.id, now_playing)
+
+        return now_playing
 
     @property
     def play_state(self) -> PlayState:
-        response = self.client.send_command(
-            "player/get_play_state", params={"pid": self.id}
-        )
-        response.raise_for_result()
+        state = self._get_cached("play_state")
+
+        if state is None:
+            since = self._cache_version()
+            response = self._send_query(self._query("player/get_play_state"))
+            state = response.message_fields["state"]
+            self._set_cached(since, play_state=state)
 
         state_mapping = {
             "play": PlayState.play,
             "pause": PlayState.pause,
             "stop": PlayState.stop,
         }
-        return state_mapping[response.message_fields["state"]]
+        return state_mapping[state]
+
+    @property
+    def queue(self) -> Paged:
+        """Items in the player queue, fetched lazily in pages whilst iterating."""
+        return self.get_queue()
+
+    def get_queue(self, page_size: int = 100) -> Paged:
+        """Items in the player queue, fetched lazily in pages of `page_size` items."""
+
+        def _fetch(start, end):
+            response = self._send_command(
+                "player/get_queue", params={"pid": self.id, "range": f"{start},{end}"}
+            )
+            return Paged.parse_response(response)
+
+        return Paged(_fetch, page_size=page_size)
 
     def play(self):
         """Starts/resumes playback."""
@@ -117,46 +275,82 @@ class Player:
             self._set_play_state(PlayState.play)
 
     def _set_play_state(self, state: PlayState):
-        response = self.client.send_command(
-            "player/set_play_state", params={"pid": self.id, "state": state.value}
+        since = self._cache_version()
+        response = self._send_command(
+            "player/set_play_state",
+            params={"pid": self.id, "state": state.value},
+            key=("player/set_play_state", self.id),
+        )
+        self._set_cached(
+            since, play_state=response.message_fields.get("state", state.value)
         )
-        response.raise_for_result()
 
     def play_next(self):
         """Plays the next item in the player queue."""
 
-        response = self.client.send_command(
-            "player/play_next", params={"pid": self.id}
-        )
-        response.raise_for_result()
+        self._send_query(self._query("player/play_next"))
+        self._invalidate_now_playing(self.id)
 
     def play_previous(self):
         """Plays the previous item in the player queue."""
 
-        response = self.client.send_command(
-            "player/play_previous", params={"pid": self.id}
+        self._send_query(self._query("player/play_previous"))
+        self._invalidate_now_playing(self.id)
+
+    def play_input(self, input_name: str):
+        """Plays one of the inputs of the player (e.g. "inputs/aux_in_1")."""
+
+        since = self._cache_version()
+        self._send_command(
+            "browse/play_input", params={"pid": self.id, "input": input_name}
         )
-        response.raise_for_result()
+        self._set_cached(since, play_state=PlayState.play.value)
+        self._invalidate_now_playing(self.id)
+
+    def set_group(self, member_ids: Iterable[int]):
+        """
+        Groups the given players (by id) with this player as leader.
+
+        Players are moved out of any group they were in. Passing no members
+        ungroups the player.
+        """
+
+        pids = [self.id, *member_ids]
+        self._send_command(
+            "group/set_group", params={"pid": ",".join(str(pid) for pid in pids)}
+        )
+
+        # Members play whatever the leader is playing.
+        self._invalidate_now_playing(*pids)
+
+    def _invalidate_now_playing(self, *pids: int):
+        # Called after commands that change the media that players are playing.
+        for pid in pids:
+            if self.state is not None:
+                self.state.invalidate_player(pid, "now_playing")
+            if self.now_playing_cache is not None:
+                self.now_playing_cache.invalidate(pid)
 
 
 @dataclass
-class PlayerGroup:
+class PlayerGroup(_Target):
     """
     Class representing a HEOS player group, used for issuing commands to the group.
-    """
 
-    id: int
-    name: str
-    host: str
+    If the id of the group leader is known up front (e.g. from the registry),
+    playback commands are sent to the leader directly, without first looking
+    up the group info on the device. If given a topology index that knows the
+    group, the leader and members are resolved from the index instead.
+    """
 
-    def __post_init__(self):
-        self.client = Client(self.host)
+    _ID_PARAM = "gid"
+    _KIND = "group"
 
-    def __enter__(self):
-        return self
+    leader_id: int = None
+    topology: Topology = field(default=None, repr=False, compare=False)
 
-    def __exit__(self, exec_type, exec_value, exec_traceback):
-        self.client.close()
+    # Player used for sending commands to the leader (reused between commands).
+    _leader_player: Player = field(default=None, init=False, repr=False, compare=False)
 
     @property
     def players(self) -> Dict[str, Player]:
@@ -164,16 +358,24 @@ class PlayerGroup:
         return self._get_players()
 
     def _get_players(self, role=None):
-        response = self.client.send_command(
-            "group/get_group_info", params={"gid": self.id}
-        )
-        response.raise_for_result()
+        group = self.topology.group(self.id) if self.topology is not None else None
+
+        if group is not None:
+            roles = [(group.leader, "leader")]
+            roles += [(pid, "member") for pid in group.members]
+            names = {pid: self.topology.name_of(pid) for pid, _ in roles}
+
+            if None not in names.values():
+                return {
+                    names[pid]: self._player(pid, names[pid])
+                    for pid, player_role in roles
+                    if role is None or player_role == role
+                }
+
+        response = self._send_query(self._query("group/get_group_info"))
 
         return {
-            # Use own host for communicating with player for now.
-            player["name"]: Player(
-                id=player["pid"], name=player["name"], host=self.host
-            )
+            player["name"]: self._player(player["pid"], player["name"])
             for player in response.payload["players"]
             if role is None or player["role"] == role
         }
@@ -188,82 +390,110 @@ class PlayerGroup:
         """Following members (e.g. non-leaders) in the group."""
         return self._get_players(role="member")
 
+    def _leader(self) -> Player:
+        """Player leading the group, looked up on the device only if unknown."""
+
+        leader_id = None
+        if self.topology is not None:
+            leader_id = self.topology.leader_of(self.id)
+
+        if leader_id is None:
+            if self.leader_id is None:
+                self.leader_id = self.leader.id
+            leader_id = self.leader_id
+
+        # Commands sent to the leader act on behalf of the whole group.
+        if self._leader_player is None or self._leader_player.id != leader_id:
+            self._leader_player = self._player(leader_id, self.name)
+
+        return self._leader_player
+
     @property
     def volume(self) -> int:
         """Group volume."""
 
-        response = self.client.send_command("group/get_volume", params={"gid": self.id})
-        response.raise_for_result()
+        volume = self._get_cached("volume")
+
+        if volume is None:
+            since = self._cache_version()
+            response = self._send_query(self._query("group/get_volume"))
+            volume = int(response.message_fields["level"])
+            self._set_cached(since, volume=volume)
 
-        return int(response.message_fields["level"])
+        return volume
 
     @volume.setter
     def volume(self, value: int):
         if not 0 <= value <= 100:
             raise ValueError("Volume must be between 0 and 100")
 
-        response = self.client.send_command(
-            "group/set_volume", params={"gid": self.id, "level": value}
+        since = self._cache_version()
+        response = self._send_command(
+            "group/set_volume",
+            params={"gid": self.id, "level": value},
+            key=("group/set_volume", self.id),
         )
-        response.raise_for_result()
+        self._set_cached(since, volume=int(response.message_fields.get("level", value)))
 
     @property
     def mute(self) -> bool:
         """Group mute status."""
 
-        response = self.client.send_command("group/get_mute", params={"gid": self.id})
-        response.raise_for_result()
+        mute = self._get_cached("mute")
+
+        if mute is None:
+            since = self._cache_version()
+            response = self._send_query(self._query("group/get_mute"))
+            mute = response.message_fields["state"] == "on"
+            self._set_cached(since, mute=mute)
 
-        return response.message_fields["state"] == "on"
+        return mute
 
     @mute.setter
     def mute(self, value: bool):
-        response = self.client.send_command(
+        since = self._cache_version()
+        response = self._send_command(
             "group/set_mute",
             params={"gid": self.id, "state": "on" if value else "off"},
+            key=("group/set_mute", self.id),
         )
-        response.raise_for_result()
+        state = response.message_fields.get("state", "on" if value else "off")
+        self._set_cached(since, mute=state == "on")
 
     @property
     def now_playing(self):
         """Media that is currently being played."""
-
-        with self.leader as player:
-            return player.now_playing
+        return self._leader().now_playing
 
     @property
     def play_state(self):
-        with self.leader as player:
-            return player.play_state
+        return self._leader().play_state
+
+    @property
+    def queue(self) -> Paged:
+        """Items in the group queue, fetched lazily in pages whilst iterating."""
+        return self._leader().queue
 
     def play(self):
         """Starts/resumes playback."""
-        with self.leader as player:
-            player.play()
+        self._leader().play()
 
     def pause(self):
         """Pauses playback."""
-        with self.leader as player:
-            player.pause()
+        self._leader().pause()
 
     def stop(self):
         """Stops playback."""
-        with self.leader as player:
-            player.stop()
+        self._leader().stop()
 
     def toggle_play(self, stop_state: PlayState = PlayState.pause):
         """Toggles play state between play and pause/stop states."""
-        with self.leader as player:
-            player.toggle_play(stop_state=stop_state)
+        self._leader().toggle_play(stop_state=stop_state)
 
     def play_next(self):
         """Plays the next item in the queue."""
-
-        with self.leader as player:
-            player.play_next()
+        self._leader().play_next()
 
     def play_previous(self):
         """Plays the previous item in the queue."""
-
-        with self.leader as player:
-            player.play_previous()
+        self._leader().play_previous()
@@ -0,0 +1,178 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+from .client import Client
+
+
+class PoolTimeoutError(TimeoutError):
+    """Raised if no connection to a host became available (i.e. the pool is busy)."""
+
+
+class ConnectionPool:
+    """
+    Pool of client connections to HEOS devices, keyed by host.
+
+    Players and groups that point to the same host share (warm) connections
+    from the pool, instead of each opening their own connection. Idle
+    connections are evicted after `idle_timeout` seconds and are checked for
+    liveness before being reused if they have been idle for more than
+    `check_after` seconds.
+
+    Clients created by the pool retry commands that fail with a transient
+    error (e.g. a connection that was closed by the device) up to `retries`
+    times, with an exponential backoff starting at `backoff` seconds. Commands
+    fail if the device hasn't answered within `timeout` seconds, or right away
+    if it can't be connected to within `connect_timeout` seconds (which is
+    short, as devices are on the local network).
+    """
+
+    def __init__(
+        self,
+        max_per_host: int = 2,
+        idle_timeout: float = 60.0,
+        check_after: float = 1.0,
+        acquire_timeout: float = 10.0,
+        retries: int = 2,
+        backoff: float = 0.05,
+        connect_timeout: float = 1.0,
+        timeout: float = 10.0,
+    ):
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self.check_after = check_after
+        self.acquire_timeout = acquire_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+
+        self._condition = threading.Condition()
+        self._idle: Dict[str, List[Tuple[Client, float]]] = {}
+        self._in_use: Dict[str, int] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    @contextmanager
+    def connection(self, host: str) -> Iterator[Client]:
+        """Checks out a client for the given host, returning it to the pool after."""
+
+        client = self.acquire(host)
+        try:
+            yield client
+        except BaseException:
+            # We cannot tell whether the connection is still in a usable
+            # state (e.g. a partially read response), so we discard it.
+            self.release(client, discard=True)
+            raise
+        else:
+            self.release(client)
+
+    def acquire(self, host: str) -> Client:
+        """Checks out a client for the given host, waiting if it is at capacity."""
+
+        deadline = time.monotonic() + self.acquire_timeout
+
+        with self._condition:
+            while True:
+                self._evict_idle()
+
+                client = self._pop_idle(host)
+                if client is not None:
+                    break
+
+                if self._open_count(host) < self.max_per_host:
+                    client = Client(
+                        host,
+                        timeout=self.timeout,
+                        retries=self.retries,
+                        backoff=self.backoff,
+                        connect_timeout=self.connect_timeout,
+                    )
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._condition.wait(timeout=remaining):
+                    raise PoolTimeoutError(
+                        f"Timed out waiting for a free connection to {host}"
+                    )
+
+            self._in_use[host] = self._in_use.get(host, 0) + 1
+            return client
+
+    def release(self, client: Client, discard: bool = False):
+        """Returns a client to the pool, closing it if it should be discarded."""
+
+        with self._condition:
+            self._in_use[client.host] -= 1
+
+            if discard:
+                client.close()
+            else:
+                self._idle.setdefault(client.host, []).append(
+                    (client, time.monotonic())
+                )
+
+            self._condition.notify()
+
+    def close(self):
+        """Closes all idle connections in the pool."""
+
+        with self._condition:
+            for idle in self._idle.values():
+                for client, _ in idle:
+                    client.close()
+            self._idle.clear()
+
+    def _open_count(self, host):
+        return self._in_use.get(host, 0) + len(self._idle.get(host, []))
+
+    def _pop_idle(self, host):
+        idle = self._idle.get(host)
+
+        while idle:
+            # Reuse the most recently used connection, as it is the most
+            # likely to still be alive.
+            client, released_at = idle.pop()
+
+            if time.monotonic() - released_at < self.check_after or client.connected:
+                return client
+
+            client.close()
+
+        return None
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+
+        for host, idle in self._idle.items():
+            expired = [client for client, released_at in idle if released_at < cutoff]
+
+            if expired:
+                for client in expired:
+                    client.close()
+                self._idle[host] = [
+                    (client, released_at)
+                    for client, released_at in idle
+                    if released_at >= cutoff
+                ]
+
+
+_DEFAULT_POOL = None
+_DEFAULT_POOL_LOCK = threading.Lock()
+
+
+def default_pool() -> ConnectionPool:
+    """Returns the process-wide connection pool, used if no pool is given explicitly."""
+
+    global _DEFAULT_POOL
+
+    with _DEFAULT_POOL_LOCK:
+        if _DEFAULT_POOL is None:
+            _DEFAULT_POOL = ConnectionPool()
+        return _DEFAULT_POOL
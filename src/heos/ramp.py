@@ -0,0 +1,161 @@
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable
+
+# Curves mapping the progress of a ramp (0..1) to the progress of its volume.
+CURVES: Dict[str, Callable[[float], float]] = {
+    "linear": lambda progress: progress,
+    "ease-in": lambda progress: progress**2,
+    "ease-out": lambda progress: 1 - (1 - progress) ** 2,
+    "ease-in-out": lambda progress: (1 - math.cos(math.pi * progress)) / 2,
+}
+
+# Ramps that are running, keyed by the player or group they change.
+_ACTIVE: Dict[Hashable, "Ramp"] = {}
+_ACTIVE_LOCK = threading.Lock()
+
+
+class Ramp:
+    """
+    Gradually changes the volume of a player or group in a background thread.
+
+    Steps are scheduled every `interval` seconds on a monotonic clock. Every
+    step sets the volume for the time at which it is actually sent, so if the
+    device falls behind (i.e. a step takes longer than the interval), the
+    steps that were missed are skipped instead of queued up. This way, the
+    ramp ends on time (give or take a round trip), at the target level. Steps
+    that wouldn't change the volume aren't sent at all.
+
+    Ramps for different players and groups run independently, so many zones
+    can be faded at the same time. Starting a ramp for a player or group
+    cancels any ramp that was still running for it.
+    """
+
+    def __init__(
+        self,
+        target,
+        level: int,
+        duration: float,
+        curve: str = "linear",
+        interval: float = 0.1,
+    ):
+        if not 0 <= level <= 100:
+            raise ValueError("Volume must be between 0 and 100")
+        if curve not in CURVES:
+            raise ValueError(
+                f"Unknown curve {curve!r}, expected one of: {', '.join(CURVES)}"
+            )
+        if interval <= 0:
+            raise ValueError("Interval must be positive")
+
+        self.target = target
+        self.level = level
+        self.duration = max(0.0, duration)
+        self.curve = curve
+        self.interval = interval
+
+        # Number of volume changes that were sent and of steps that were skipped.
+        self.steps = 0
+        self.skipped = 0
+        self.error = None
+
+        self._key = (type(target).__name__, target.id)
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+        self._thread = None
+
+    @property
+    def done(self) -> bool:
+        """Whether the ramp finished (or was cancelled)."""
+        return self._done.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the ramp was cancelled."""
+        return self._cancelled.is_set()
+
+    def start(self) -> "Ramp":
+        """Starts the ramp, cancelling any other ramp for the same player or group."""
+
+        with _ACTIVE_LOCK:
+            previous = _ACTIVE.get(self._key)
+            _ACTIVE[self._key] = self
+
+        if previous is not None:
+            previous.cancel()
+
+        self._thread = threading.Thread(target=self._run, name="heos-ramp", daemon=True)
+        self._thread.start()
+
+        return self
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Waits for the ramp to finish, returning whether it finished in time.
+
+        Raises the error that stopped the ramp, if any.
+        """
+
+        finished = self._done.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return finished
+
+    def cancel(self):
+        """Stops the ramp, leaving the volume at the last step that was sent."""
+        self._cancelled.set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converts the ramp (status) to a (JSON-serializable) dict."""
+
+        return {
+            "level": self.level,
+            "duration": self.duration,
+            "curve": self.curve,
+            "steps": self.steps,
+            "skipped": self.skipped,
+            "done": self.done,
+            "cancelled": self.cancelled,
+        }
+
+    def _run(self):
+        try:
+            self._ramp()
+        except Exception as err:  # pylint: disable=broad-except
+            self.error = err
+        finally:
+            with _ACTIVE_LOCK:
+                if _ACTIVE.get(self._key) is self:
+                    del _ACTIVE[self._key]
+            self._done.set()
+
+    def _ramp(self):
+        curve = CURVES[self.curve]
+
+        # Read the start level only once (served from the state cache, if any).
+        start_level = last_level = self.target.volume
+        start = time.monotonic()
+        tick = 0
+
+        while not self._cancelled.is_set():
+            elapsed = time.monotonic() - start
+            progress = min(1.0, elapsed / self.duration) if self.duration else 1.0
+
+            level = round(start_level + (self.level - start_level) * curve(progress))
+            if level != last_level:
+                self.target.volume = level
+                last_level = level
+                self.steps += 1
+
+            if progress >= 1.0:
+                return
+
+            # Skip ticks that passed whilst we were waiting for the device.
+            elapsed = time.monotonic() - start
+            next_tick = max(tick + 1, math.floor(elapsed / self.interval) + 1)
+            self.skipped += next_tick - tick - 1
+            tick = next_tick
+
+            deadline = start + min(tick * self.interval, self.duration)
+            self._cancelled.wait(max(0.0, deadline - time.monotonic()))
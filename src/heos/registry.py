@@ -1,116 +1,670 @@
-from dataclasses import dataclass, asdict
-from pathlib import Path
-from typing import List
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, asdict, replace
+from typing import Any, Dict, Iterable, Iterator, List
 
-import yaml
-
-from . import ssdp
-from .client import Client
+from ._compat import SLOTS
+from .client import Query, Response
+from .failover import Failover
+from .nowplaying import NowPlayingCache
 from .player import Player, PlayerGroup
+from .pool import ConnectionPool, default_pool
+from .state import StateCache
+from .topology import GroupInfo, Topology
 
 
 class Registry:
-    """Registry that discovers and provides access to HEOS players and player groups."""
+    """
+    Registry that discovers and provides access to HEOS players and player groups.
+
+    Discovered players are cached in a .heos file, together with an expiry time
+    based on the SSDP max-age advertised by each device. Expired entries are
+    revalidated in a background thread, whilst (possibly stale) cached entries
+    are served in the mean time.
+    """
 
     HEOS_URN = "urn:schemas-denon-com:device:ACT-Denon:1"
 
-    def __init__(self, file_path=".heos"):
+    # Max-age (in seconds) used for devices that did not advertise one.
+    DEFAULT_MAX_AGE = 180
+
+    # Version of the .heos cache file format.
+    CACHE_VERSION = 1
+
+    def __init__(
+        self,
+        file_path=".heos",
+        pool: ConnectionPool = None,
+        state: StateCache = None,
+        revalidate: bool = True,
+        scheduler: "Scheduler" = None,
+        failover: bool = True,
+        now_playing: NowPlayingCache = None,
+    ):
         self.file_path = file_path
+        self.pool = pool or default_pool()
+        self.state = state if state is not None else StateCache()
+        self.scheduler = scheduler
+
+        # Commands fail over to other known hosts if a host can't be reached.
+        self.failover = Failover(self) if failover else None
+        self.topology = Topology()
+
+        # Now playing info is only cached (for a TTL) if asked for, as changes
+        # made elsewhere (e.g. using the app) would go unnoticed in the mean time.
+        self.now_playing = (
+            now_playing if now_playing is not None else NowPlayingCache(ttl=0)
+        )
 
         self._players = {}
         self._groups = {}
+        self._discovered_at = None
+
+        self._player_objs = None
+        self._group_objs = None
 
-        if Path(self.file_path).exists():
+        # Serialises updates of the entries (revalidation, renewals, expiry...).
+        self._revalidate_lock = threading.Lock()
+        self._revalidate_thread = None
+
+        if os.path.exists(self.file_path):
             self.load()
+            if revalidate and self.expired:
+                self.revalidate_in_background()
         else:
             self.discover()
 
     @property
     def players(self):
         """Returns a dict of known players."""
-        return {
-            player.name: Player(id=player.id, name=player.name, host=player.host)
-            for player in self._players.values()
-        }
+
+        if self._player_objs is None:
+            self._player_objs = {
+                player.name: Player(
+                    id=player.id, name=player.name, host=player.host, **self._shared()
+                )
+                for player in self._players.values()
+            }
+
+        return self._player_objs
 
     @property
     def groups(self):
         """Returns a dict of known player groups."""
+
+        if self._group_objs is None:
+            self._group_objs = {
+                group.name: PlayerGroup(
+                    id=group.id,
+                    name=group.name,
+                    host=self._players[group.leader].host,
+                    leader_id=self.topology.leader_of(group.id),
+                    topology=self.topology,
+                    **self._shared(),
+                )
+                for group in self._groups.values()
+                # Skip groups led by players we don't know (yet).
+                if group.leader in self._players
+            }
+
+        return self._group_objs
+
+    def _shared(self) -> Dict[str, Any]:
+        # Pool, caches etc. shared by all players and groups (see SHARED_FIELDS).
         return {
-            group.name: PlayerGroup(
-                id=group.id, name=group.name, host=self._players[group.leader].host,
-            )
-            for group in self._groups.values()
+            "pool": self.pool,
+            "state": self.state,
+            "scheduler": self.scheduler,
+            "failover": self.failover,
+            "now_playing_cache": self.now_playing,
         }
 
-    def discover(self) -> None:
-        """Discovers players on the local network using SSDP."""
+    @property
+    def browser(self) -> "Browser":
+        """Browser for the music sources available to the system."""
+
+        if not self._players:
+            raise ValueError("No known players to browse with")
+
+        from .browse import Browser
+
+        return Browser(host=next(iter(self._players.values())).host, pool=self.pool)
+
+    @property
+    def hosts(self) -> List[str]:
+        """Distinct hosts of the known players."""
+        return list(dict.fromkeys(player.host for player in self._players.values()))
+
+    @property
+    def discovered_at(self) -> float:
+        """Time (in seconds since the epoch) at which devices were last discovered."""
+        return self._discovered_at
+
+    @property
+    def expired(self) -> List[str]:
+        """Names of players whose entries have expired."""
+
+        now = time.time()
+        return [
+            player.name for player in self._players.values() if player.expires <= now
+        ]
+
+    def expire(self, host: str):
+        """Expires entries for players on the given host (e.g. if unreachable)."""
+
+        with self._revalidate_lock:
+            players = {
+                name: replace(player, expires=0.0) if player.host == host else player
+                for name, player in self._players.items()
+            }
+            self._set_entries(players, self._groups)
+
+    def revalidate(self, timeout: float = 5.0, discover: bool = True) -> None:
+        """
+        Revalidates expired entries by querying a single known device.
+
+        Devices whose entries have not expired are tried first. Falls back to
+        a full discovery if none of the known devices can be reached (and
+        `discover` is True). If no devices can be found at all, the stale
+        entries are kept and an error is raised.
+        """
+
+        with self._revalidate_lock:
+            expired = set(self.expired)
+            if not expired:
+                return
+
+            expired_hosts = {
+                player.host
+                for player in self._players.values()
+                if player.name in expired
+            }
+            hosts = sorted(
+                {player.host for player in self._players.values()},
+                key=lambda host: host in expired_hosts,
+            )
+
+            for host in hosts:
+                try:
+                    self._update_from(host, expired, timeout=timeout)
+                except (OSError, EOFError, ValueError, KeyError):
+                    continue
+                return
+
+        # Don't start a (slow) full discovery in a process that is exiting.
+        if not discover or not threading.main_thread().is_alive():
+            raise ConnectionError(
+                f"None of the known devices responded ({', '.join(hosts)})"
+            )
+
+        self.discover(timeout=timeout)
+
+    def refresh_from(self, host: str, timeout: float = 5.0) -> None:
+        """
+        Updates all entries using the given device (e.g. one that just appeared).
+
+        Entries of players on the given host are renewed, other entries keep
+        their expiry. Raises an error if the device can't be queried.
+        """
+
+        with self._revalidate_lock:
+            expired = {
+                name for name, player in self._players.items() if player.host == host
+            }
+            self._update_from(host, expired, timeout=timeout)
+
+    def _update_from(self, host, expired, timeout=None):
+        players, groups = self._query_host(host, timeout=timeout)
+
+        now = time.time()
+        current = {player.id: player for player in self._players.values()}
+
+        for pid, player in players.items():
+            previous = current.get(pid)
+            if previous is not None and previous.name not in expired:
+                # Keep the expiry of entries that were still valid.
+                players[pid] = replace(
+                    player, max_age=previous.max_age, expires=previous.expires
+                )
+            else:
+                max_age = (
+                    previous.max_age if previous is not None else self.DEFAULT_MAX_AGE
+                )
+                players[pid] = replace(player, max_age=max_age, expires=now + max_age)
+
+        self._set_entries(
+            players={entry.name: entry for entry in players.values()},
+            groups={entry.name: entry for entry in groups.values()},
+        )
+        self.save()
+
+    def renew(self, host: str, max_age: int = None):
+        """Renews entries for players on the given host (e.g. on an announcement)."""
+
+        with self._revalidate_lock:
+            now = time.time()
+            players = {}
+            for name, player in self._players.items():
+                if player.host == host:
+                    player_max_age = max_age if max_age is not None else player.max_age
+                    player = replace(
+                        player, max_age=player_max_age, expires=now + player_max_age
+                    )
+                players[name] = player
+
+            self._set_entries(players, self._groups)
+
+    def revalidate_in_background(self) -> threading.Thread:
+        """Revalidates expired entries in a background thread."""
+
+        if self._revalidate_thread is None or not self._revalidate_thread.is_alive():
+            # Daemon thread, so that revalidating never holds up the process exit.
+            self._revalidate_thread = threading.Thread(
+                target=self._revalidate_quietly, name="heos-revalidate", daemon=True
+            )
+            self._revalidate_thread.start()
+
+        return self._revalidate_thread
+
+    def _revalidate_quietly(self):
+        try:
+            self.revalidate()
+        except (OSError, RuntimeError):
+            # Keep serving the stale entries, we'll try again next time.
+            pass
+
+    def batch(
+        self,
+        operations: Iterable["Operation"],
+        concurrency=16,
+        timeout=None,
+        total_timeout=None,
+    ) -> Iterator["Result"]:
+        """
+        Applies a batch of operations to players and groups concurrently.
+
+        Yields a result for every operation as it completes (see heos.batch).
+        """
+
+        from .batch import run_batch
+
+        return run_batch(
+            self,
+            operations,
+            concurrency=concurrency,
+            timeout=timeout,
+            total_timeout=total_timeout,
+        )
+
+    def snapshot(
+        self, concurrency=16, timeout=5.0, names: Iterable[str] = None
+    ) -> Iterator["PlayerStatus"]:
+        """
+        Reads the status (volume, mute, play state and now playing) of all players.
+
+        Yields the status of every player (or of the players with the given
+        names) as it completes (see heos.snapshot).
+        """
+
+        from .snapshot import take_snapshot
+
+        return take_snapshot(
+            self, concurrency=concurrency, timeout=timeout, names=names
+        )
+
+    def plan_scene(self, scene: "Scene", timeout: float = 5.0) -> List["Operation"]:
+        """Returns the operations needed to apply a scene (see heos.scene)."""
+
+        from .scene import plan_scene
+
+        return [
+            change.operation
+            for phase in plan_scene(self, scene, timeout=timeout)
+            for change in phase
+        ]
+
+    def apply_scene(
+        self, scene: "Scene", concurrency=16, timeout=None, rollback=True
+    ) -> "SceneResult":
+        """
+        Applies a scene, only sending the commands for state that differs.
+
+        Changes that succeeded are rolled back if any of the changes fails,
+        unless `rollback` is False (see heos.scene).
+        """
+
+        from .scene import apply_scene
+
+        return apply_scene(
+            self, scene, concurrency=concurrency, timeout=timeout, rollback=rollback
+        )
+
+    def listen(self) -> "EventListener":
+        """
+        Starts listening for change events in the background.
 
-        ssdp_responses = ssdp.discover(self.HEOS_URN)
+        Whilst the listener is running, player and group properties are served
+        from the registry's state cache, instead of querying the devices, and
+        the known players and groups (and their topology) are kept up to date.
+        Now playing changes are passed on to the registry's now playing cache
+        (and its callbacks).
+        """
 
+        if not self._players:
+            raise ValueError("No known players to listen to")
+
+        from .events import EventListener
+
+        host = next(iter(self._players.values())).host
+        listener = EventListener(
+            host,
+            state=self.state,
+            now_playing=self.now_playing,
+            on_groups=self.update_groups,
+            on_players=self.update_players,
+        )
+        listener.start()
+
+        return listener
+
+    def track(self, interfaces: Iterable[str] = None) -> "DeviceTracker":
+        """
+        Starts tracking devices in the background, using their SSDP announcements.
+
+        Devices announce themselves when they join the network (or change
+        address) and say goodbye when they leave. Whilst tracking, entries are
+        renewed or updated as soon as this happens, without any polling.
+        """
+
+        from .tracking import DeviceTracker
+
+        tracker = DeviceTracker(self, interfaces=interfaces)
+        tracker.start()
+
+        return tracker
+
+    def discover(
+        self,
+        max_workers: int = 8,
+        timeout: float = 5.0,
+        interfaces: Iterable[str] = None,
+        ttl: int = None,
+    ) -> None:
+        """
+        Discovers players on the local network using SSDP.
+
+        As every HEOS device reports the players and groups of the whole
+        system, discovered devices are queried concurrently (using at most
+        `max_workers` threads, with a timeout of `timeout` seconds per device)
+        and the first device that answers is taken as authoritative.
+
+        Searches are sent on all local interfaces, unless specific `interfaces`
+        (names or addresses) are given. The multicast `ttl` of searches can be
+        raised to reach devices behind multicast routers.
+        """
+
+        # Imported lazily to keep loading a cached registry fast.
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        from . import ssdp
+
+        answered = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+
+        def _on_done(future):
+            if not future.cancelled() and future.exception() is None:
+                answered.set()
+
+        hosts, futures, max_ages = [], [], {}
         players, groups = {}, {}
-        for ssdp_response in ssdp_responses:
-            with Client(ssdp_response.host) as client:
-
-                # Identify players.
-                response = client.send_command("player/get_players")
-                for entry in response.payload:
-                    players[entry["name"]] = PlayerEntry(
-                        name=entry["name"],
-                        model=entry["model"],
-                        host=entry["ip"],
-                        id=entry["pid"],
+
+        try:
+            # Start querying devices as soon as they respond to the SSDP
+            # search, until one of them has given us an answer.
+            responses = ssdp.iter_discover(
+                self.HEOS_URN,
+                stop=answered,
+                interfaces=interfaces,
+                ttl=ttl if ttl is not None else ssdp.DEFAULT_TTL,
+            )
+            for ssdp_response in responses:
+                if ssdp_response.cache is not None:
+                    max_ages[ssdp_response.host] = int(ssdp_response.cache)
+
+                if ssdp_response.host not in hosts:
+                    hosts.append(ssdp_response.host)
+                    future = executor.submit(
+                        self._query_host, ssdp_response.host, timeout=timeout
                     )
+                    future.add_done_callback(_on_done)
+                    futures.append(future)
+
+            for future in as_completed(futures):
+                try:
+                    host_players, host_groups = future.result()
+                except (OSError, EOFError, ValueError, KeyError):
+                    # Unhealthy device, wait for any of the others to answer.
+                    continue
+
+                players.update(host_players)
+                groups.update(host_groups)
+                break
+        finally:
+            # Don't wait for the remaining devices, as we already have our answer.
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+        if hosts and not players:
+            raise ConnectionError(
+                f"None of the discovered devices responded ({', '.join(hosts)})"
+            )
+
+        if not players:
+            # Never replace known entries with an empty result (e.g. if the
+            # devices are offline), nor save it, so that we try again next time.
+            if self._players:
+                raise ConnectionError("No devices found")
+            return
+
+        now = time.time()
+        players = {
+            pid: replace(
+                entry,
+                max_age=max_ages.get(entry.host, self.DEFAULT_MAX_AGE),
+                expires=now + max_ages.get(entry.host, self.DEFAULT_MAX_AGE),
+            )
+            for pid, entry in players.items()
+        }
+
+        with self._revalidate_lock:
+            self._discovered_at = now
+            self._set_entries(
+                players={entry.name: entry for entry in players.values()},
+                groups={entry.name: entry for entry in groups.values()},
+            )
+            self.save()
+
+    @staticmethod
+    def _query_host(host: str, timeout: float = None):
+        """Queries a device for the players and groups in the system (keyed by id)."""
+
+        from .client import Client
+
+        with Client(host, timeout=timeout) as client:
+
+            # Identify players.
+            response = client.send_command("player/get_players")
+            response.raise_for_result()
+
+            players = {
+                entry["pid"]: PlayerEntry.from_payload(entry)
+                for entry in response.payload
+            }
+
+            # Identify groups.
+            response = client.send_command("group/get_groups")
+            response.raise_for_result()
+
+            groups = {
+                entry["gid"]: GroupEntry.from_payload(entry)
+                for entry in response.payload
+            }
 
-                # Identify groups.
-                response = client.send_command("group/get_groups")
-                for entry in response.payload:
-                    leader = [
-                        player["name"]
-                        for player in entry["players"]
-                        if player["role"] == "leader"
-                    ][0]
-                    members = [
-                        player["name"]
-                        for player in entry["players"]
-                        if player["role"] == "member"
-                    ]
-
-                    groups[entry["name"]] = GroupEntry(
-                        name=entry["name"],
-                        id=entry["gid"],
-                        leader=leader,
-                        members=members,
+        return players, groups
+
+    def refresh_groups(self) -> List[GroupInfo]:
+        """Updates the groups from a device (e.g. after regrouping players)."""
+
+        query = Query("group/get_groups")
+
+        if self.failover is not None:
+            response = self.failover.send(self.hosts[0], query, self._send_to)
+        else:
+            response = self._send_to(self.hosts[0], query)
+        response.raise_for_result()
+
+        return self.update_groups(response.payload)
+
+    def update_players(self, payload: List[Dict[str, Any]]):
+        """Replaces the known players with those of a player/get_players response."""
+
+        with self._revalidate_lock:
+            now = time.time()
+            current = {player.id: player for player in self._players.values()}
+
+            players = {}
+            for entry in payload:
+                player = PlayerEntry.from_payload(entry)
+                previous = current.get(player.id)
+                if previous is not None:
+                    player = replace(
+                        player, max_age=previous.max_age, expires=previous.expires
                     )
+                else:
+                    player = replace(player, expires=now + player.max_age)
+                players[player.name] = player
 
-        self._players = players
-        self._groups = groups
-        self.save()
+            # Groups refer to players by name, which may have changed.
+            new_names = {player.id: player.name for player in players.values()}
+            names = {
+                name: new_names.get(player.id, name)
+                for name, player in self._players.items()
+            }
+            groups = {
+                name: replace(
+                    group,
+                    leader=names.get(group.leader, group.leader),
+                    members=[names.get(member, member) for member in group.members],
+                )
+                for name, group in self._groups.items()
+            }
+
+            self._set_entries(players, groups)
+            self.save()
+
+    def update_groups(self, payload: List[Dict[str, Any]]) -> List[GroupInfo]:
+        """Replaces the known groups with those of a group/get_groups response."""
+
+        groups = (GroupEntry.from_payload(entry) for entry in payload)
+        with self._revalidate_lock:
+            self._set_entries(self._players, {group.name: group for group in groups})
+            self.save()
+
+        return self.topology.groups
+
+    def _send_to(self, host: str, query: Query) -> Response:
+        with self.pool.connection(host) as client:
+            return client.send_query(query)
 
     def load(self):
-        """Loads the registry from a .heos cache file."""
+        """
+        Loads the registry from a .heos cache file.
+
+        Cache files are stored as JSON, keyed by player/group name. Cache files
+        in the older YAML format are still read (and converted on the next save).
+        """
 
         with open(self.file_path) as file_:
-            config = yaml.safe_load(file_)
+            content = file_.read()
+
+        if content.lstrip().startswith("{"):
+            config = json.loads(content)
+            players_conf = config.get("players", {}).values()
+            groups_conf = config.get("groups", {}).values()
+        else:
+            import yaml
+
+            config = yaml.safe_load(content) or {}
             players_conf = config.get("players", [])
             groups_conf = config.get("groups", [])
 
-        self._players = {entry["name"]: PlayerEntry(**entry) for entry in players_conf}
-        self._groups = {entry["name"]: GroupEntry(**entry) for entry in groups_conf}
+        self._discovered_at = config.get("discovered_at")
+        self._set_entries(
+            players={entry["name"]: PlayerEntry(**entry) for entry in players_conf},
+            groups={entry["name"]: GroupEntry(**entry) for entry in groups_conf},
+        )
+
+    def _set_entries(self, players, groups):
+        # Player and group objects only need to be rebuilt if the players (or
+        # their addresses) or groups change, and not e.g. on renewals.
+        def _addresses(entries):
+            return {name: (entry.id, entry.host) for name, entry in entries.items()}
+
+        players_changed = _addresses(players) != _addresses(self._players)
+        groups_changed = players_changed or groups != self._groups
+
+        self._players = players
+        self._groups = groups
+
+        self.topology.set_players((name, entry.id) for name, entry in players.items())
+        self.topology.set_groups(
+            GroupInfo(
+                id=int(group.id),
+                name=group.name,
+                leader=players[group.leader].id,
+                members=tuple(
+                    players[member].id for member in group.members if member in players
+                ),
+            )
+            for group in groups.values()
+            if group.leader in players
+        )
+
+        # Invalidate player/group objects built from the previous entries.
+        if players_changed:
+            self._player_objs = None
+        if groups_changed:
+            self._group_objs = None
 
     def save(self):
-        """Saves the registry from a .heos cache file."""
+        """Saves the registry to a .heos cache file."""
 
         config = {
-            "players": [asdict(player) for player in self._players.values()],
-            "groups": [asdict(group) for group in self._groups.values()],
+            "version": self.CACHE_VERSION,
+            "discovered_at": self._discovered_at,
+            "players": {name: asdict(entry) for name, entry in self._players.items()},
+            "groups": {name: asdict(entry) for name, entry in self._groups.items()},
         }
 
-        with open(self.file_path, "w") as file_:
-            yaml.dump(config, file_)
+        import tempfile
+
+        # Write to a temporary file first and move it into place, so that
+        # readers never see a partially written cache file.
+        directory = os.path.dirname(os.path.abspath(self.file_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".heos-", suffix=".tmp")
 
+        try:
+            with os.fdopen(fd, "w") as file_:
+                json.dump(config, file_, separators=(",", ":"))
+            os.replace(tmp_path, self.file_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
 
-@dataclass
+
+@dataclass(frozen=True, **SLOTS)
 class PlayerEntry:
     """Player config entry."""
 
@@ -118,9 +672,20 @@ class PlayerEntry:
     model: str
     host: str
     id: int
+    max_age: int = Registry.DEFAULT_MAX_AGE
+
+    # Entries without an expiry (e.g. from older cache files) are expired.
+    expires: float = 0.0
 
+    @classmethod
+    def from_payload(cls, entry: Dict[str, Any]):
+        """Builds an instance from an entry of a player/get_players response."""
+        return cls(
+            name=entry["name"], model=entry["model"], host=entry["ip"], id=entry["pid"]
+        )
 
-@dataclass
+
+@dataclass(frozen=True, **SLOTS)
 class GroupEntry:
     """Player group config entry."""
 
@@ -128,3 +693,16 @@ class GroupEntry:
     id: str
     leader: str
     members: List[str]
+
+    @classmethod
+    def from_payload(cls, entry: Dict[str, Any]):
+        """Builds an instance from an entry of a group/get_groups response."""
+
+        leader = [
+            player["name"] for player in entry["players"] if player["role"] == "leader"
+        ][0]
+        members = [
+            player["name"] for player in entry["players"] if player["role"] == "member"
+        ]
+
+        return cls(name=entry["name"], id=entry["gid"], leader=leader, members=members)
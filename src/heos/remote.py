@@ -0,0 +1,319 @@
+import json
+import os
+import socket
+from typing import Any, Dict, Iterable, Iterator, List
+
+# Client side of the daemon (see heos.daemon). Used by every CLI invocation,
+# so the rest of the library is only imported once it is needed.
+
+
+def default_socket_path() -> str:
+    """Path of the daemon's control socket (overridable using HEOS_DAEMON_SOCKET)."""
+
+    if "HEOS_DAEMON_SOCKET" in os.environ:
+        return os.environ["HEOS_DAEMON_SOCKET"]
+
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR", "/tmp")
+    return os.path.join(runtime_dir, f"heos-{os.getuid()}.sock")
+
+
+class DaemonError(ConnectionError):
+    """Raised if a request can't be sent to (or answered by) the daemon."""
+
+
+class DaemonClient:
+    """
+    Client for sending requests to a running daemon over its control socket.
+
+    Requests can take long (e.g. fading the volume), so responses are awaited
+    without a timeout. The daemon bounds the commands it sends to devices.
+    """
+
+    def __init__(self, sock: socket.socket):
+        self._sock = sock
+        self._file = sock.makefile("rwb")
+
+    @classmethod
+    def connect(cls, socket_path: str = None, timeout: float = 5.0):
+        """
+        Connects to a running daemon, returning None if no daemon is running.
+
+        The `timeout` only applies to connecting, not to requests.
+        """
+
+        socket_path = socket_path or default_socket_path()
+        if not os.path.exists(socket_path):
+            return None
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            sock.close()
+            return None
+
+        sock.settimeout(None)
+        return cls(sock)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def request(self, **request) -> Any:
+        """
+        Sends a request to the daemon and returns its result.
+
+        Results that the daemon sends as a line per item (e.g. batch results or
+        a queue) are returned as an iterator, which yields the items as they
+        come in. It should be consumed before sending the next request.
+        """
+
+        self._send(request)
+
+        response = self._receive()
+        if response.get("stream"):
+            return self._items()
+        return response["result"]
+
+    def _items(self) -> Iterator[Any]:
+        done = False
+        try:
+            while True:
+                response = self._receive()
+                if "item" not in response:
+                    done = True
+                    return
+                yield response["item"]
+        finally:
+            if not done:
+                # The remaining items would be read as the response to the
+                # next request, so the connection can't be used anymore.
+                self.close()
+
+    def _send(self, request):
+        try:
+            self._file.write(json.dumps(request).encode("utf-8") + b"\n")
+            self._file.flush()
+        except OSError as err:
+            raise DaemonError(f"Lost connection to the daemon: {err}") from err
+
+    def _receive(self) -> Dict[str, Any]:
+        try:
+            line = self._file.readline()
+        except OSError as err:
+            raise DaemonError(f"Lost connection to the daemon: {err}") from err
+
+        if not line:
+            raise DaemonError("Daemon closed the connection")
+
+        response = json.loads(line)
+        if not response["ok"]:
+            error_type = _ERROR_TYPES.get(response["type"], RuntimeError)
+            raise error_type(response["error"])
+
+        return response
+
+    def stats(self, format_: str = "json"):
+        """Returns the command metrics collected by the daemon."""
+        return self.request(kind="stats", format=format_)
+
+    def registry(self) -> "RemoteRegistry":
+        """Returns a proxy for the daemon's registry."""
+        return RemoteRegistry(self)
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+
+class RemoteRegistry:
+    """Proxy for the registry held by the daemon, mirroring the Registry interface."""
+
+    def __init__(self, client: DaemonClient):
+        self._client = client
+        self._names = None
+
+    @property
+    def players(self) -> Dict[str, "RemoteTarget"]:
+        """Returns a dict of players known to the daemon."""
+
+        from .player import Player
+
+        return {
+            name: RemoteTarget(self._client, kind="player", name=name, cls=Player)
+            for name in self._get_names()["players"]
+        }
+
+    @property
+    def groups(self) -> Dict[str, "RemoteTarget"]:
+        """Returns a dict of player groups known to the daemon."""
+
+        from .player import PlayerGroup
+
+        return {
+            name: RemoteTarget(self._client, kind="group", name=name, cls=PlayerGroup)
+            for name in self._get_names()["groups"]
+        }
+
+    def discover(self):
+        """Lets the daemon rediscover players on the local network."""
+        self._client.request(kind="registry", action="discover")
+        self._names = None
+
+    def batch(
+        self,
+        operations: Iterable["Operation"],
+        concurrency=16,
+        timeout=None,
+        total_timeout=None,
+    ) -> Iterator["Result"]:
+        """Lets the daemon apply a batch of operations (see Registry.batch)."""
+
+        from dataclasses import asdict
+
+        operations = list(operations)
+        results = self._client.request(
+            kind="registry",
+            action="batch",
+            operations=[asdict(operation) for operation in operations],
+            concurrency=concurrency,
+            timeout=timeout,
+            total_timeout=total_timeout,
+        )
+
+        for result in results:
+            yield _result_from_dict(result, operations[result["index"]])
+
+    def plan_scene(self, scene: "Scene", timeout: float = 5.0) -> List["Operation"]:
+        """Lets the daemon plan the operations for a scene (see Registry.plan_scene)."""
+
+        from .batch import Operation
+
+        operations = self._client.request(
+            kind="registry", action="plan_scene", scene=scene.to_dict(), timeout=timeout
+        )
+        return [Operation(**operation) for operation in operations]
+
+    def apply_scene(
+        self, scene: "Scene", concurrency=16, timeout=None, rollback=True
+    ) -> "SceneResult":
+        """Lets the daemon apply a scene (see Registry.apply_scene)."""
+
+        from .batch import Operation
+        from .scene import SceneResult
+
+        result = self._client.request(
+            kind="registry",
+            action="apply_scene",
+            scene=scene.to_dict(),
+            concurrency=concurrency,
+            timeout=timeout,
+            rollback=rollback,
+        )
+
+        def _results(results):
+            # Scene results report the value that was set (see heos.scene).
+            return [
+                _result_from_dict(
+                    {**result, "value": None},
+                    Operation(
+                        kind=result["kind"],
+                        name=result["name"],
+                        action=result["action"],
+                        value=result["value"],
+                    ),
+                )
+                for result in results
+            ]
+
+        return SceneResult(
+            results=_results(result["results"]),
+            rollback=_results(result["rollback"]),
+        )
+
+    def snapshot(self, concurrency=16, timeout=5.0) -> Iterator["PlayerStatus"]:
+        """Lets the daemon read the status of all players (see Registry.snapshot)."""
+
+        from .snapshot import PlayerStatus
+
+        statuses = self._client.request(
+            kind="registry",
+            action="snapshot",
+            concurrency=concurrency,
+            timeout=timeout,
+        )
+
+        for status in statuses:
+            del status["ok"]
+            yield PlayerStatus(**status)
+
+    def _get_names(self) -> Dict[str, List[str]]:
+        if self._names is None:
+            self._names = self._client.request(kind="registry", action="names")
+        return self._names
+
+
+class RemoteTarget:
+    """
+    Proxy for a player or group held by the daemon.
+
+    Mirrors the interface of the proxied class: reading or assigning a property
+    and calling a method are forwarded to the daemon. Enum values (e.g. play
+    states) are returned as their plain values and paged listings (e.g. the
+    queue) as an iterator over their items.
+    """
+
+    def __init__(self, client: DaemonClient, kind: str, name: str, cls: type):
+        self.__dict__.update(_client=client, _kind=kind, _cls=cls, name=name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        pass
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+
+        if isinstance(getattr(self._cls, attr, None), property):
+            return self._request(action="get", attr=attr)
+
+        def _call(*args):
+            return self._request(action="call", attr=attr, args=list(args))
+
+        return _call
+
+    def __setattr__(self, attr, value):
+        self._request(action="set", attr=attr, value=value)
+
+    def _request(self, **request):
+        return self._client.request(kind=self._kind, name=self.name, **request)
+
+
+_ERROR_TYPES = {
+    "KeyError": KeyError,
+    "ValueError": ValueError,
+    "TimeoutError": TimeoutError,
+    "ConnectionError": ConnectionError,
+}
+
+
+def _result_from_dict(result: Dict[str, Any], operation: "Operation") -> "Result":
+    from .batch import Result
+
+    error = None
+    if not result["ok"]:
+        error_type = _ERROR_TYPES.get(result["error_type"], RuntimeError)
+        error = error_type(result["error"])
+
+    return Result(
+        index=result["index"],
+        operation=operation,
+        value=result.get("value"),
+        error=error,
+    )
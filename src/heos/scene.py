@@ -0,0 +1,342 @@
+import json
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Dict, List
+
+from .batch import Operation, Result, run_batch
+from .topology import GroupInfo
+
+# Play states that a player can be set to in a scene.
+PLAY_STATES = ("play", "pause", "stop")
+
+
+@dataclass
+class GroupSpec:
+    """Group in a scene, given by the names of its leader and members."""
+
+    leader: str
+    members: List[str] = field(default_factory=list)
+
+
+@dataclass
+class PlayerSpec:
+    """Desired state of a player in a scene. Fields that are None are left as is."""
+
+    name: str
+    volume: int = None
+    mute: bool = None
+    play_state: str = None
+    input: str = None
+
+
+@dataclass
+class Scene:
+    """
+    Class representing a scene: the desired grouping and state of players.
+
+    Scenes are given as a dict (or as JSON/YAML), for example:
+
+        {
+            "groups": [{"leader": "Living Room", "members": ["Kitchen"]}],
+            "players": {
+                "Living Room": {"volume": 20, "input": "inputs/aux_in_1"},
+                "Kitchen": {"volume": 15, "mute": false},
+            },
+        }
+
+    Players that are given in a group without any members are ungrouped.
+    """
+
+    groups: List[GroupSpec] = field(default_factory=list)
+    players: List[PlayerSpec] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, dict_: Dict[str, Any]):
+        """Builds an instance from a dict (see above)."""
+
+        unknown = set(dict_) - {"groups", "players"}
+        if unknown:
+            raise ValueError(f"Unknown scene keys: {', '.join(sorted(unknown))}")
+
+        groups = [GroupSpec(**group) for group in dict_.get("groups", [])]
+
+        players = dict_.get("players", {})
+        if isinstance(players, dict):
+            players = [{"name": name, **spec} for name, spec in players.items()]
+        players = [PlayerSpec(**player) for player in players]
+
+        for player in players:
+            if player.play_state is not None and player.play_state not in PLAY_STATES:
+                raise ValueError(
+                    f"Invalid play state {player.play_state!r} for {player.name!r}"
+                )
+
+        return cls(groups=groups, players=players)
+
+    @classmethod
+    def parse(cls, content: str):
+        """Parses a scene from JSON or YAML."""
+
+        if content.lstrip().startswith("{"):
+            return cls.from_dict(json.loads(content))
+
+        import yaml
+
+        return cls.from_dict(yaml.safe_load(content) or {})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converts the scene to a (JSON-serializable) dict."""
+        return asdict(self)
+
+
+@dataclass
+class Change:
+    """Operation needed to apply (part of) a scene, with the operations undoing it."""
+
+    operation: Operation
+    undo: List[Operation] = field(default_factory=list)
+
+
+@dataclass
+class SceneResult:
+    """Class representing the result of applying a scene."""
+
+    results: List[Result] = field(default_factory=list)
+    rollback: List[Result] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        """Whether all changes succeeded."""
+        return all(result.ok for result in self.results)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converts the result to a (JSON-serializable) dict."""
+
+        return {
+            "ok": self.ok,
+            "results": [_result_to_dict(result) for result in self.results],
+            "rollback": [_result_to_dict(result) for result in self.rollback],
+        }
+
+
+def _result_to_dict(result: Result) -> Dict[str, Any]:
+    # Scenes only change state, so report the value that was set.
+    return {**result.to_dict(), "value": result.operation.value}
+
+
+def plan_scene(registry, scene: Scene, timeout: float = 5.0) -> List[List[Change]]:
+    """
+    Compares a scene to the live state of its players, returning the changes.
+
+    The live state is read concurrently (see heos.snapshot), so that planning
+    takes a single round trip. Changes are returned in three phases: first
+    (re)grouping players, then switching inputs (which plays on the group
+    that a player leads once regrouped) and finally setting volumes, mute and
+    play states. Changes within a phase are independent of each other.
+    """
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    players = registry.players
+
+    names = {spec.name for spec in scene.players}
+    for group in scene.groups:
+        names.update([group.leader, *group.members])
+
+    unknown = sorted(name for name in names if name not in players)
+    if unknown:
+        raise KeyError(f"Unknown players: {', '.join(unknown)}")
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        groups = executor.submit(_live_groups, registry) if scene.groups else None
+        statuses = {
+            status.name: status
+            for status in registry.snapshot(timeout=timeout, names=sorted(names))
+        }
+        groups = groups.result() if groups is not None else []
+
+    pids = {name: players[name].id for name in names}
+    names_by_pid = {pid: name for name, pid in pids.items()}
+    names_by_pid.update(
+        (player.id, name) for name, player in players.items() if name not in pids
+    )
+
+    grouping = _group_changes(scene, groups, pids, names_by_pid)
+    inputs, state = [], []
+
+    for spec in scene.players:
+        status = statuses[spec.name]
+        play_state = status.play_state.value if status.play_state else None
+
+        if spec.input is not None:
+            if (status.now_playing or {}).get("mid") != spec.input:
+                inputs.append(
+                    Change(Operation("player", spec.name, "play_input", spec.input))
+                )
+                # Switching inputs starts playback.
+                play_state = "play"
+
+        for attr, current in [
+            ("volume", status.volume),
+            ("mute", status.mute),
+        ]:
+            value = getattr(spec, attr)
+            if value is not None and value != current:
+                state.append(
+                    Change(
+                        Operation("player", spec.name, attr, value),
+                        undo=(
+                            [Operation("player", spec.name, attr, current)]
+                            if current is not None
+                            else []
+                        ),
+                    )
+                )
+
+        if spec.play_state is not None and spec.play_state != play_state:
+            state.append(
+                Change(
+                    Operation("player", spec.name, spec.play_state),
+                    undo=(
+                        [Operation("player", spec.name, play_state)]
+                        if play_state is not None
+                        else []
+                    ),
+                )
+            )
+
+    return [grouping, inputs, state]
+
+
+def _live_groups(registry) -> List[GroupInfo]:
+    try:
+        return registry.refresh_groups()
+    except (OSError, ValueError, KeyError):
+        # Fall back to the last known groups.
+        return registry.topology.groups
+
+
+def _group_changes(scene, groups, pids, names_by_pid) -> List[Change]:
+    current = {pid: group for group in groups for pid in group.players}
+
+    changes = []
+    for spec in scene.groups:
+        leader = pids[spec.leader]
+        members = [pids[member] for member in spec.members]
+
+        group = current.get(leader)
+        if group is None and not members:
+            continue
+        if (
+            group is not None
+            and group.leader == leader
+            and set(group.members) == set(members)
+        ):
+            continue
+
+        # Undo by ungrouping the leader and restoring the groups that any of
+        # the players were in before (in this order).
+        previous = {
+            current[pid].id: current[pid]
+            for pid in [leader, *members]
+            if pid in current
+        }
+        undo = [
+            Operation("player", names_by_pid[group.leader], "set_group", group.members)
+            for group in previous.values()
+        ]
+        if all(group.leader != leader for group in previous.values()):
+            undo.insert(0, Operation("player", spec.leader, "set_group", []))
+
+        changes.append(
+            Change(
+                Operation("player", spec.leader, "set_group", members),
+                undo=undo,
+            )
+        )
+
+    return changes
+
+
+def apply_scene(
+    registry,
+    scene: Scene,
+    concurrency: int = 16,
+    timeout: float = None,
+    rollback: bool = True,
+) -> SceneResult:
+    """
+    Applies a scene, only sending commands for state that differs from the scene.
+
+    The changes of each phase (see plan_scene) are sent concurrently, using
+    the batch engine (see heos.batch), so that a phase takes a single round
+    trip. Reading the live state and every change are limited to `timeout`
+    seconds. If any change fails, the next phase isn't started and (if
+    `rollback` is True) the changes that succeeded are undone. Switching
+    inputs can't be undone.
+    """
+
+    phases = plan_scene(registry, scene, timeout=timeout)
+
+    result = SceneResult()
+    applied: List[List[Change]] = []
+    regrouped = False
+
+    for changes in phases:
+        if not changes:
+            continue
+
+        phase_results = sorted(
+            run_batch(
+                registry,
+                [change.operation for change in changes],
+                concurrency=concurrency,
+                timeout=timeout,
+            ),
+            key=lambda phase_result: phase_result.index,
+        )
+
+        offset = len(result.results)
+        result.results.extend(
+            replace(phase_result, index=offset + phase_result.index)
+            for phase_result in phase_results
+        )
+
+        applied.append(
+            [
+                change
+                for change, phase_result in zip(changes, phase_results)
+                if phase_result.ok
+            ]
+        )
+        regrouped = regrouped or any(
+            change.operation.action == "set_group" for change in changes
+        )
+
+        if not all(phase_result.ok for phase_result in phase_results):
+            break
+
+    if not result.ok and rollback:
+        for changes in reversed(applied):
+            operations = [operation for change in changes for operation in change.undo]
+            if not operations:
+                continue
+
+            # Undo operations are sent one at a time, in order, as regrouping
+            # players depends on the groups that were restored before.
+            ordered = any(operation.action == "set_group" for operation in operations)
+            offset = len(result.rollback)
+            result.rollback.extend(
+                replace(rollback_result, index=offset + rollback_result.index)
+                for rollback_result in run_batch(
+                    registry,
+                    operations,
+                    concurrency=1 if ordered else concurrency,
+                    timeout=timeout,
+                )
+            )
+
+    if regrouped:
+        # Keep the known groups in line with the new grouping.
+        _live_groups(registry)
+
+    return result
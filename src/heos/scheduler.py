@@ -0,0 +1,162 @@
+import threading
+import time
+from typing import Dict, Hashable, Optional, Tuple
+
+from .client import Query, Response
+from .pool import ConnectionPool, default_pool
+
+
+class Scheduler:
+    """
+    Per-host scheduler for commands, layered on a connection pool.
+
+    The scheduler keeps interactive controls (e.g. a volume slider) responsive,
+    without flooding the devices with commands:
+
+    - Writes that are given a key (e.g. ("player/set_volume", pid)) are sent
+      one at a time per key. Writes that come in whilst an earlier write is
+      still waiting or in flight are coalesced: only the latest one is sent
+      and its response is shared by all callers.
+    - Identical reads (e.g. player/get_volume for the same player) that are in
+      flight at the same time are sent only once, sharing the response.
+    - Commands to a host are limited to `rate` commands per second (allowing
+      bursts of up to `burst` commands), if a rate is given.
+    """
+
+    def __init__(self, pool: ConnectionPool = None, rate: float = None, burst: int = 1):
+        self.pool = pool or default_pool()
+        self.rate = rate
+        self.burst = burst
+
+        self._lock = threading.Lock()
+        self._waiting: Dict[Tuple, "_Call"] = {}
+        self._in_flight: Dict[Tuple, "_Call"] = {}
+        self._limiters: Dict[str, "_RateLimiter"] = {}
+
+    def send(self, host: str, query: Query, key: Hashable = None) -> Response:
+        """
+        Sends a query to the given host, returning the (possibly shared) response.
+
+        Queries with a key are treated as writes that can be coalesced,
+        queries for get commands (without a key) as reads that can be shared.
+        """
+
+        if key is not None:
+            return self._send_write(host, query, (host, key))
+        if "/get_" in query.command:
+            return self._send_read(host, query, (host, query.line))
+
+        self._limiter(host).acquire()
+        return self._execute(host, query)
+
+    def _send_write(self, host, query, call_key):
+        with self._lock:
+            call = self._waiting.get(call_key)
+
+            if call is not None:
+                # Supersede the write that is still waiting to be sent.
+                call.query = query
+                previous, owner = None, False
+            else:
+                call = self._waiting[call_key] = _Call(query)
+                previous, owner = self._in_flight.get(call_key), True
+
+        if owner:
+            # Only one write per key is in flight at any time, newer writes
+            # are coalesced whilst we wait for the previous one to finish.
+            if previous is not None:
+                previous.done.wait()
+
+            self._limiter(host).acquire()
+
+            with self._lock:
+                del self._waiting[call_key]
+                self._in_flight[call_key] = call
+
+            self._run(host, call, call_key)
+
+        return call.result()
+
+    def _send_read(self, host, query, call_key):
+        with self._lock:
+            call = self._in_flight.get(call_key)
+            owner = call is None
+            if owner:
+                call = self._in_flight[call_key] = _Call(query)
+
+        if owner:
+            self._limiter(host).acquire()
+            self._run(host, call, call_key)
+
+        return call.result()
+
+    def _run(self, host, call, call_key):
+        try:
+            call.response = self._execute(host, call.query)
+        except BaseException as err:
+            call.error = err
+        finally:
+            with self._lock:
+                if self._in_flight.get(call_key) is call:
+                    del self._in_flight[call_key]
+            call.done.set()
+
+    def _execute(self, host, query):
+        with self.pool.connection(host) as client:
+            return client.send_query(query)
+
+    def _limiter(self, host) -> "_RateLimiter":
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = _RateLimiter(self.rate, self.burst)
+            return limiter
+
+
+class _Call:
+    """Query whose response is shared by one or more callers."""
+
+    def __init__(self, query: Query):
+        self.query = query
+        self.response: Optional[Response] = None
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+    def result(self) -> Response:
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+
+class _RateLimiter:
+    """Token bucket limiting the number of commands per second."""
+
+    def __init__(self, rate: float = None, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    def acquire(self):
+        """Takes a token, waiting until one is available."""
+
+        if self.rate is None:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+
+            # Reserve a token up front, so that concurrent callers queue up
+            # behind each other instead of all waking up at the same time.
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,505 @@
+import asyncio
+import json
+import random
+import socket
+import struct
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+
+@dataclass
+class SimulatedPlayer:
+    """State of a simulated HEOS player."""
+
+    pid: int
+    name: str
+    ip: str
+    model: str = "HEOS Simulator"
+    volume: int = 20
+    mute: bool = False
+    play_state: str = "stop"
+    now_playing: Dict[str, Any] = field(default_factory=dict)
+    queue: List[Dict[str, Any]] = field(default_factory=list)
+
+
+@dataclass
+class SimulatedGroup:
+    """State of a simulated HEOS player group."""
+
+    gid: int
+    name: str
+    leader: int
+    members: List[int]
+    volume: int = 20
+    mute: bool = False
+
+
+class Simulator:
+    """
+    In-process simulation of a HEOS system, for testing and benchmarking.
+
+    Simulates `n_devices` devices (one player each), listening on consecutive
+    loopback addresses (127.0.0.1, 127.0.0.2, ...) on the HEOS port. Every
+    device speaks the HEOS CLI protocol for the whole (shared) system, with a
+    configurable latency (plus or minus a random jitter) per command. The
+    simulator can optionally also answer SSDP searches for the HEOS URN.
+
+    Usage:
+
+        with Simulator(n_devices=3, latency=0.01) as simulator:
+            registry = Registry(file_path=...)
+    """
+
+    HEOS_URN = "urn:schemas-denon-com:device:ACT-Denon:1"
+
+    def __init__(
+        self,
+        n_devices: int = 1,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        port: int = 1255,
+        ssdp: bool = True,
+        ssdp_port: int = 1900,
+        max_age: int = 180,
+    ):
+        self.n_devices = n_devices
+        self.latency = latency
+        self.jitter = jitter
+        self.port = port
+        self.ssdp = ssdp
+        self.ssdp_port = ssdp_port
+        self.max_age = max_age
+
+        self.players: Dict[int, SimulatedPlayer] = {
+            pid: SimulatedPlayer(pid=pid, name=f"Player {idx + 1}", ip=ip)
+            for idx, (pid, ip) in enumerate(
+                (1000 + idx, f"127.0.0.{idx + 1}") for idx in range(n_devices)
+            )
+        }
+        self.groups: Dict[int, SimulatedGroup] = {}
+
+        # Browsable music sources and the items of their containers, keyed by
+        # (sid, cid), with the top-level items of a source keyed by (sid, None).
+        self.sources: List[Dict[str, Any]] = []
+        self.containers: Dict[Tuple[int, str], List[Dict[str, Any]]] = {}
+
+        # Number of commands handled, keyed by command name.
+        self.command_counts: Dict[str, int] = {}
+
+        self._loop = None
+        self._thread = None
+        self._servers = []
+        self._handlers = {}
+        self._ssdp_sock = None
+        self._subscribers = set()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.stop()
+
+    @property
+    def hosts(self) -> List[str]:
+        """Addresses of the simulated devices."""
+        return [player.ip for player in self.players.values()]
+
+    def add_group(self, name: str, pids: List[int]) -> SimulatedGroup:
+        """Groups the given players, with the first player acting as leader."""
+
+        group = SimulatedGroup(gid=pids[0], name=name, leader=pids[0], members=pids[1:])
+        self.groups[group.gid] = group
+        return group
+
+    def rename_player(self, pid: int, name: str):
+        """Renames a player (e.g. as if using the app), notifying listeners."""
+
+        self.players[pid].name = name
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._push, "players_changed", {})
+
+    def start(self):
+        """Starts the simulated devices in a background thread."""
+
+        started = threading.Event()
+        errors = []
+
+        async def _start():
+            try:
+                for host in self.hosts:
+                    server = await asyncio.start_server(self._handle, host, self.port)
+                    self._servers.append(server)
+            except OSError as err:
+                errors.append(err)
+            finally:
+                started.set()
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="heos-simulator", daemon=True
+        )
+        self._thread.start()
+
+        asyncio.run_coroutine_threadsafe(_start(), self._loop)
+        started.wait()
+
+        if errors:
+            self.stop()
+            raise errors[0]
+
+        if self.ssdp:
+            self._start_ssdp()
+
+    def stop(self):
+        """Stops the simulated devices."""
+
+        if self._ssdp_sock is not None:
+            self._ssdp_sock.close()
+            self._ssdp_sock = None
+
+        if self._loop is not None:
+
+            async def _stop():
+                for server in self._servers:
+                    server.close()
+
+                # Drop open connections, as clients may keep them alive.
+                for writer in list(self._handlers.values()):
+                    writer.close()
+                await asyncio.gather(*self._handlers, return_exceptions=True)
+
+                for server in self._servers:
+                    await server.wait_closed()
+                self._servers = []
+
+            asyncio.run_coroutine_threadsafe(_stop(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = self._thread = None
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._handlers[task] = writer
+
+        responses = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = asyncio.ensure_future(
+                    self._respond(writer, line.decode("ascii"))
+                )
+                responses.add(response)
+                response.add_done_callback(responses.discard)
+        except OSError:
+            pass
+        finally:
+            for response in responses:
+                response.cancel()
+            self._handlers.pop(task, None)
+            self._subscribers.discard(writer)
+            writer.close()
+
+    async def _respond(self, writer, line: str):
+        url = urlparse(line.strip())
+        command = url.netloc + url.path
+        params = dict(parse_qsl(url.query))
+
+        self.command_counts[command] = self.command_counts.get(command, 0) + 1
+
+        delay = self._delay()
+        if delay:
+            await asyncio.sleep(delay)
+
+        try:
+            fields, payload, events = self._execute(command, params, writer)
+            result = "success"
+        except (KeyError, ValueError) as err:
+            fields, payload, events = {"eid": 2, "text": str(err)}, None, []
+            result = "fail"
+
+        message = urlencode({**params, **fields})
+        self._write(writer, command, message, result=result, payload=payload)
+
+        for event, event_fields in events:
+            self._push(event, event_fields)
+
+    def _push(self, event, fields):
+        for subscriber in list(self._subscribers):
+            self._write(subscriber, f"event/{event}", urlencode(fields))
+
+    @staticmethod
+    def _write(writer, command, message, result=None, payload=None):
+        heos = {"command": command}
+        if result is not None:
+            heos["result"] = result
+        heos["message"] = message
+
+        data = {"heos": heos}
+        if payload is not None:
+            data["payload"] = payload
+
+        if not writer.is_closing():
+            writer.write(json.dumps(data).encode("utf-8") + b"\r\n")
+
+    def _execute(self, command, params, writer):
+        """Executes a command, returning message fields, payload and events."""
+
+        handler = getattr(self, "_cmd_" + command.replace("/", "_"), None)
+        if handler is None:
+            raise ValueError(f"Unsupported command {command}")
+
+        if command == "system/register_for_change_events":
+            return handler(params, writer)
+        return handler(params)
+
+    def _cmd_system_register_for_change_events(self, params, writer):
+        if params.get("enable") == "on":
+            self._subscribers.add(writer)
+        else:
+            self._subscribers.discard(writer)
+        return {}, None, []
+
+    def _cmd_system_heart_beat(self, params):
+        return {}, None, []
+
+    def _cmd_player_get_players(self, params):
+        payload = [
+            {"name": p.name, "pid": p.pid, "model": p.model, "ip": p.ip}
+            for p in self.players.values()
+        ]
+        return {}, payload, []
+
+    def _cmd_player_get_volume(self, params):
+        return {"level": self._player(params).volume}, None, []
+
+    def _cmd_player_set_volume(self, params):
+        player = self._player(params)
+        player.volume = min(max(int(params["level"]), 0), 100)
+        return {}, None, [("player_volume_changed", self._volume_fields(player))]
+
+    def _cmd_player_get_mute(self, params):
+        return {"state": "on" if self._player(params).mute else "off"}, None, []
+
+    def _cmd_player_set_mute(self, params):
+        player = self._player(params)
+        player.mute = params["state"] == "on"
+        return {}, None, [("player_volume_changed", self._volume_fields(player))]
+
+    def _cmd_player_get_play_state(self, params):
+        return {"state": self._player(params).play_state}, None, []
+
+    def _cmd_player_set_play_state(self, params):
+        player = self._player(params)
+        if params["state"] not in ("play", "pause", "stop"):
+            raise ValueError(f"Invalid state {params['state']}")
+        player.play_state = params["state"]
+        fields = {"pid": player.pid, "state": player.play_state}
+        return {}, None, [("player_state_changed", fields)]
+
+    def _cmd_player_get_now_playing_media(self, params):
+        return {}, dict(self._player(params).now_playing), []
+
+    def _cmd_player_play_next(self, params):
+        player = self._player(params)
+        return {}, None, [("player_now_playing_changed", {"pid": player.pid})]
+
+    _cmd_player_play_previous = _cmd_player_play_next
+
+    def _cmd_player_get_queue(self, params):
+        return self._paged(self._player(params).queue, params)
+
+    def _cmd_browse_get_music_sources(self, params):
+        return {}, list(self.sources), []
+
+    def _cmd_browse_browse(self, params):
+        items = self.containers[(int(params["sid"]), params.get("cid"))]
+        return self._paged(items, params)
+
+    def _cmd_browse_play_input(self, params):
+        player = self._player(params)
+        player.now_playing = {
+            "type": "station",
+            "song": params["input"],
+            "mid": params["input"],
+        }
+        player.play_state = "play"
+        return (
+            {},
+            None,
+            [
+                ("player_now_playing_changed", {"pid": player.pid}),
+                ("player_state_changed", {"pid": player.pid, "state": "play"}),
+            ],
+        )
+
+    def _cmd_browse_search(self, params):
+        query = params["search"].lower()
+        items = [
+            item
+            for (sid, _), container in self.containers.items()
+            if sid == int(params["sid"])
+            for item in container
+            if query in item.get("name", "").lower()
+        ]
+        return self._paged(items, params)
+
+    @staticmethod
+    def _paged(items, params):
+        if "range" in params:
+            start, end = (int(value) for value in params["range"].split(","))
+            page = items[start : end + 1]
+        else:
+            page = items
+        return {"returned": len(page), "count": len(items)}, page, []
+
+    def _cmd_group_get_groups(self, params):
+        return {}, [self._group_info(group) for group in self.groups.values()], []
+
+    def _cmd_group_get_group_info(self, params):
+        return {}, self._group_info(self._group(params)), []
+
+    def _cmd_group_set_group(self, params):
+        pids = [int(pid) for pid in params["pid"].split(",")]
+        for pid in pids:
+            self.players[pid]
+
+        # Players can only be in a single group, so drop any existing groups
+        # that the players are in.
+        for gid, group in list(self.groups.items()):
+            if set(pids) & {group.leader, *group.members}:
+                del self.groups[gid]
+
+        fields = {}
+        if len(pids) > 1:
+            name = " + ".join(self.players[pid].name for pid in pids)
+            group = self.add_group(name, pids)
+            fields = {"gid": group.gid, "name": group.name}
+
+        return fields, None, [("groups_changed", {})]
+
+    def _cmd_group_get_volume(self, params):
+        return {"level": self._group(params).volume}, None, []
+
+    def _cmd_group_set_volume(self, params):
+        group = self._group(params)
+        group.volume = min(max(int(params["level"]), 0), 100)
+        return {}, None, [("group_volume_changed", self._volume_fields(group))]
+
+    def _cmd_group_get_mute(self, params):
+        return {"state": "on" if self._group(params).mute else "off"}, None, []
+
+    def _cmd_group_set_mute(self, params):
+        group = self._group(params)
+        group.mute = params["state"] == "on"
+        return {}, None, [("group_volume_changed", self._volume_fields(group))]
+
+    def _player(self, params) -> SimulatedPlayer:
+        return self.players[int(params["pid"])]
+
+    def _group(self, params) -> SimulatedGroup:
+        return self.groups[int(params["gid"])]
+
+    def _group_info(self, group: SimulatedGroup):
+        leader = self.players[group.leader]
+        players = [{"name": leader.name, "pid": leader.pid, "role": "leader"}]
+        for pid in group.members:
+            players.append(
+                {"name": self.players[pid].name, "pid": pid, "role": "member"}
+            )
+        return {"name": group.name, "gid": group.gid, "players": players}
+
+    @staticmethod
+    def _volume_fields(target):
+        id_field = (
+            {"pid": target.pid}
+            if isinstance(target, SimulatedPlayer)
+            else {"gid": target.gid}
+        )
+        return {
+            **id_field,
+            "level": target.volume,
+            "mute": "on" if target.mute else "off",
+        }
+
+    def announce(self, pid: int, alive: bool = True, ip: str = None):
+        """
+        Multicasts an ssdp:alive (or ssdp:byebye) message for the given player.
+
+        An alternative address can be given to simulate a device that changed
+        its address.
+        """
+
+        player = self.players[pid]
+        lines = [
+            "NOTIFY * HTTP/1.1",
+            f"HOST: 239.255.255.250:{self.ssdp_port}",
+            f"NT: {self.HEOS_URN}",
+            f"NTS: ssdp:{'alive' if alive else 'byebye'}",
+            f"USN: uuid:simulated-{player.pid}::{self.HEOS_URN}",
+        ]
+        if alive:
+            lines += [
+                f"CACHE-CONTROL: max-age={self.max_age}",
+                f"LOCATION: http://{ip or player.ip}:60006/upnp/desc/"
+                "aios_device/aios_device.xml",
+            ]
+
+        message = "\r\n".join(lines + ["", ""]).encode("utf-8")
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+            sock.sendto(message, ("239.255.255.250", self.ssdp_port))
+
+    def _start_ssdp(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(("", self.ssdp_port))
+
+        membership = struct.pack(
+            "4sl", socket.inet_aton("239.255.255.250"), socket.INADDR_ANY
+        )
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+
+        self._ssdp_sock = sock
+        threading.Thread(
+            target=self._serve_ssdp, args=(sock,), name="heos-ssdp", daemon=True
+        ).start()
+
+    def _serve_ssdp(self, sock):
+        while True:
+            try:
+                data, address = sock.recvfrom(2048)
+            except OSError:
+                # Socket closed by stop.
+                return
+
+            if not data.startswith(b"M-SEARCH"):
+                continue
+            if self.HEOS_URN.encode() not in data:
+                continue
+
+            for player in list(self.players.values()):
+                response = "\r\n".join(
+                    [
+                        "HTTP/1.1 200 OK",
+                        f"CACHE-CONTROL: max-age={self.max_age}",
+                        f"LOCATION: http://{player.ip}:60006/upnp/desc/"
+                        "aios_device/aios_device.xml",
+                        f"ST: {self.HEOS_URN}",
+                        f"USN: uuid:simulated-{player.pid}::{self.HEOS_URN}",
+                        "",
+                        "",
+                    ]
+                )
+                try:
+                    sock.sendto(response.encode("utf-8"), address)
+                except OSError:
+                    return
@@ -0,0 +1,103 @@
+from dataclasses import dataclass, field
+from enum import Enum
+from functools import partial
+from typing import Any, Dict, Iterable, Iterator
+
+from ._errors import error_message
+from ._workers import run_tasks
+
+# Properties read for every player in a snapshot.
+FIELDS = ("volume", "mute", "play_state", "now_playing")
+
+
+@dataclass
+class PlayerStatus:
+    """
+    Class representing the status of a single player in a snapshot.
+
+    Fields that could not be read (before the deadline) are None, with the
+    corresponding errors listed in `errors`.
+    """
+
+    name: str
+    host: str
+    volume: int = None
+    mute: bool = None
+    play_state: Any = None
+    now_playing: Dict[str, Any] = None
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        """Whether all fields were read."""
+        return not self.errors
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converts the status to a (JSON-serializable) dict."""
+
+        play_state = self.play_state
+        if isinstance(play_state, Enum):
+            play_state = play_state.value
+
+        return {
+            "name": self.name,
+            "host": self.host,
+            "volume": self.volume,
+            "mute": self.mute,
+            "play_state": play_state,
+            "now_playing": self.now_playing,
+            "ok": self.ok,
+            "errors": self.errors,
+        }
+
+
+def take_snapshot(
+    registry,
+    concurrency: int = 16,
+    timeout: float = 5.0,
+    names: Iterable[str] = None,
+) -> Iterator[PlayerStatus]:
+    """
+    Reads the status of every player concurrently, yielding players as they complete.
+
+    Only the players with the given `names` are read, if names are given.
+
+    All fields of all players are read at the same time (using at most
+    `concurrency` threads, over the registry's pooled connections), so that
+    a slow device doesn't hold up the others. Players that haven't completed
+    within `timeout` seconds (for the snapshot as a whole) are yielded with
+    the fields that were read so far, with the others reported as timed out
+    (see heos._workers.run_tasks).
+    """
+
+    players = registry.players
+    if names is not None:
+        players = {name: players[name] for name in names}
+    statuses = {
+        name: PlayerStatus(name=name, host=player.host)
+        for name, player in players.items()
+    }
+    remaining = {name: len(FIELDS) for name in players}
+
+    tasks = (
+        ((name, attr), player.host, partial(getattr, player, attr))
+        for name, player in players.items()
+        for attr in FIELDS
+    )
+
+    for (name, attr), value, error in run_tasks(
+        tasks,
+        concurrency=concurrency,
+        per_host=registry.pool.max_per_host,
+        total_timeout=timeout,
+        name="heos-snapshot",
+    ):
+        status = statuses[name]
+        if error is None:
+            setattr(status, attr, value)
+        else:
+            status.errors[attr] = error_message(error)
+
+        remaining[name] -= 1
+        if not remaining[name]:
+            yield status
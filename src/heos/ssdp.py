@@ -14,34 +14,256 @@
 
 import http.client
 import io
+import logging
+import selectors
 import socket
+import struct
+import threading
+import time
 from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, List, Optional
 from urllib.parse import urlparse
 
+from ._compat import SLOTS
 
-def discover(service, timeout=5, retries=1, mx=3):
-    """Discovers UPnP services on the local network using SSDP."""
+logger = logging.getLogger(__name__)
 
-    socket.setdefaulttimeout(timeout)
+# Maximum time (in seconds) between checks of the stop event in iter_discover.
+STOP_POLL_INTERVAL = 0.1
+
+# Default multicast TTL of searches (i.e. the number of routers they may cross).
+DEFAULT_TTL = 2
+
+# ioctl requests and interface flags (from Linux's <net/if.h>), used for
+# listing the addresses of local interfaces.
+SIOCGIFFLAGS = 0x8913
+SIOCGIFADDR = 0x8915
+IFF_UP = 0x1
+IFF_LOOPBACK = 0x8
+IFF_MULTICAST = 0x1000
+
+
+def discover(
+    service,
+    timeout=5,
+    retries=1,
+    mx=3,
+    interfaces: Iterable[str] = None,
+    ttl: int = DEFAULT_TTL,
+):
+    """Discovers UPnP services on the local network using SSDP (see iter_discover)."""
 
     responses = {}
+    for response in iter_discover(
+        service,
+        timeout=timeout,
+        retries=retries,
+        mx=mx,
+        interfaces=interfaces,
+        ttl=ttl,
+    ):
+        responses[response.usn or response.location] = response
+
+    return list(responses.values())
+
+
+def iter_discover(
+    service,
+    timeout=5,
+    retries=1,
+    mx=3,
+    max_devices: int = None,
+    usns: Iterable[str] = None,
+    stop: threading.Event = None,
+    interfaces: Iterable[str] = None,
+    ttl: int = DEFAULT_TTL,
+) -> Iterator["SSDPResponse"]:
+    """
+    Discovers UPnP services using SSDP, yielding responses as they arrive.
+
+    Searches are sent on every (multicast-capable) local interface at the same
+    time, so that devices on all network segments are found in a single pass.
+    Searches can be restricted to specific `interfaces` (given by name or by
+    IPv4 address) and are forwarded across at most `ttl` routers. Responses
+    are merged by their USN, so devices that are reachable over multiple
+    interfaces are only yielded once.
+
+    Each discovery round waits at most `timeout` seconds for responses.
+    Discovery ends early once `max_devices` devices have responded, once all
+    devices in `usns` have been seen or once the `stop` event is set (which is
+    checked at least every `STOP_POLL_INTERVAL` seconds).
+    """
+
+    addresses = _interface_addresses(interfaces)
+    pending_usns = set(usns) if usns is not None else None
+    seen = set()
+
+    def _done():
+        return (
+            (max_devices is not None and len(seen) >= max_devices)
+            or (pending_usns is not None and not pending_usns)
+            or (stop is not None and stop.is_set())
+        )
+
     for _ in range(retries):
+        if _done():
+            return
+
+        message = SSDPMessage(st=service, mx=mx)
+        socks = _send_search(message, addresses, ttl=ttl)
+
+        try:
+            with selectors.DefaultSelector() as selector:
+                for sock in socks:
+                    selector.register(sock, selectors.EVENT_READ)
+
+                deadline = time.monotonic() + timeout
+                while not _done():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+
+                    if stop is not None:
+                        remaining = min(remaining, STOP_POLL_INTERVAL)
+
+                    for key, _ in selector.select(remaining):
+                        try:
+                            data = key.fileobj.recv(1024)
+                        except OSError:
+                            continue
+
+                        try:
+                            response = SSDPResponse.from_bytes(data)
+                        except (http.client.HTTPException, ValueError):
+                            # Ignore anything that isn't a (valid) SSDP response.
+                            continue
+
+                        usn = response.usn or response.location
+                        if usn in seen:
+                            continue
+                        seen.add(usn)
+
+                        if pending_usns is not None:
+                            pending_usns.discard(response.usn)
+
+                        yield response
+
+                        if _done():
+                            break
+        finally:
+            for sock in socks:
+                sock.close()
+
+
+def _send_search(message, addresses, ttl):
+    """Sends a search from each of the given addresses, returning the sockets."""
+
+    socks, error = [], None
+
+    for address in addresses:
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
 
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+
+            if address is not None:
+                sock.setsockopt(
+                    socket.IPPROTO_IP,
+                    socket.IP_MULTICAST_IF,
+                    socket.inet_aton(address),
+                )
+                sock.bind((address, 0))
+
+            sock.sendto(bytes(message), (message.address, message.port))
+        except OSError as err:
+            # Skip interfaces that are down or can't send multicast.
+            sock.close()
+            error = err
+        else:
+            socks.append(sock)
+
+    if not socks and error is not None:
+        raise error
+
+    return socks
+
+
+@dataclass(frozen=True, **SLOTS)
+class Interface:
+    """Local network interface with an IPv4 address."""
+
+    name: str
+    address: str
 
-        message = SSDPMessage(st=service, mx=mx)
-        sock.sendto(bytes(message), (message.address, message.port))
 
-        while True:
+def local_interfaces() -> List[Interface]:
+    """
+    Lists local interfaces that are up and can send multicast (excluding loopback).
+
+    Interfaces are only listed on platforms that support querying interface
+    addresses using ioctl (e.g. Linux). Returns an empty list otherwise.
+    """
+
+    try:
+        import fcntl
+    except ImportError:
+        return []
+
+    try:
+        names = [name for _, name in socket.if_nameindex()]
+    except OSError:
+        return []
+
+    interfaces = []
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for name in names:
+            request = struct.pack("256s", name[:15].encode("utf-8"))
+
             try:
-                response = SSDPResponse.from_bytes(sock.recv(1024))
-                responses[response.location] = response
-            except socket.timeout:
-                break
+                flags = fcntl.ioctl(sock.fileno(), SIOCGIFFLAGS, request)
+                address = fcntl.ioctl(sock.fileno(), SIOCGIFADDR, request)
+            except OSError:
+                # Interface without an IPv4 address.
+                continue
 
-    return list(responses.values())
+            flags = struct.unpack("H", flags[16:18])[0]
+            if flags & IFF_UP and flags & IFF_MULTICAST and not flags & IFF_LOOPBACK:
+                interfaces.append(
+                    Interface(name=name, address=socket.inet_ntoa(address[20:24]))
+                )
+
+    return interfaces
+
+
+def _interface_addresses(interfaces: Iterable[str] = None) -> List[Optional[str]]:
+    """
+    Resolves the addresses to send searches from.
+
+    Without any given interfaces, all local interfaces are used. None stands
+    for the interface of the default route, which is used if no interfaces
+    can be listed on this platform.
+    """
+
+    available = local_interfaces()
+
+    if interfaces is None:
+        return [interface.address for interface in available] or [None]
+
+    addresses = {interface.name: interface.address for interface in available}
+
+    resolved = []
+    for interface in interfaces:
+        if interface in addresses:
+            resolved.append(addresses[interface])
+        else:
+            try:
+                socket.inet_aton(interface)
+            except OSError:
+                raise ValueError(f"Unknown interface {interface!r}") from None
+            resolved.append(interface)
+
+    return resolved
 
 
 @dataclass
@@ -55,22 +277,22 @@ class SSDPMessage:
 
     def __str__(self):
         return "\r\n".join(
-        [
-            "M-SEARCH * HTTP/1.1",
-            f"HOST: {self.address}:{self.port}",
-            'MAN: "ssdp:discover"',
-            f"ST: {self.st}",
-            f"MX: {self.mx}",
-            "",
-            "",
-        ]
-    )
+            [
+                "M-SEARCH * HTTP/1.1",
+                f"HOST: {self.address}:{self.port}",
+                'MAN: "ssdp:discover"',
+                f"ST: {self.st}",
+                f"MX: {self.mx}",
+                "",
+                "",
+            ]
+        )
 
     def __bytes__(self):
         return str(self).encode("utf-8")
 
 
-@dataclass
+@dataclass(frozen=True, **SLOTS)
 class SSDPResponse:
     """Class respresenting an SSDP response message."""
 
@@ -90,11 +312,13 @@ class SSDPResponse:
         # noinspection PyTypeChecker
         r = http.client.HTTPResponse(cls._FakeSocket(response))
         r.begin()
+
+        cache_control = r.getheader("cache-control")
         return cls(
             location=r.getheader("location"),
             usn=r.getheader("usn"),
             st=r.getheader("st"),
-            cache=r.getheader("cache-control").split("=")[1],
+            cache=_max_age(cache_control),
         )
 
     @property
@@ -103,6 +327,156 @@ class SSDPResponse:
         return urlparse(self.location).hostname
 
 
+def _max_age(cache_control: Optional[str]) -> Optional[str]:
+    """Max-age of a CACHE-CONTROL header (e.g. "max-age=1800"), if valid."""
+
+    for directive in (cache_control or "").split(","):
+        name, _, value = directive.partition("=")
+        if name.strip().lower() == "max-age" and value.strip().isdigit():
+            return value.strip()
+    return None
+
+
+@dataclass(frozen=True, **SLOTS)
+class SSDPNotify:
+    """Class representing an SSDP NOTIFY message (e.g. ssdp:alive or ssdp:byebye)."""
+
+    nts: str
+    nt: str
+    usn: str
+    location: str = None
+    cache: str = None
+
+    @classmethod
+    def from_bytes(cls, message: bytes):
+        """Builds an instance from the given bytes."""
+
+        lines = message.decode("utf-8", errors="replace").splitlines()
+        if not lines or not lines[0].upper().startswith("NOTIFY "):
+            raise ValueError("Not an SSDP NOTIFY message")
+
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+
+        cache_control = headers.get("cache-control")
+        return cls(
+            nts=headers.get("nts"),
+            nt=headers.get("nt"),
+            usn=headers.get("usn"),
+            location=headers.get("location"),
+            cache=_max_age(cache_control),
+        )
+
+    @property
+    def alive(self) -> bool:
+        """Whether the device announced itself (rather than saying goodbye)."""
+        return self.nts != "ssdp:byebye"
+
+    @property
+    def host(self):
+        """Host that sent the message (if it included its location)."""
+        return urlparse(self.location).hostname if self.location else None
+
+
+class NotifyListener:
+    """
+    Listens for SSDP NOTIFY messages in a background thread.
+
+    Devices multicast an ssdp:alive message when they join the network (and
+    periodically after that) and an ssdp:byebye message when they leave. The
+    callback is called for every message for the given `service` (or for all
+    services if no service is given), on every given interface (default: all).
+    Errors raised by the callback are logged, without affecting later messages.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[SSDPNotify], Any],
+        service: str = None,
+        interfaces: Iterable[str] = None,
+        address: str = "239.255.255.250",
+        port: int = 1900,
+    ):
+        self.callback = callback
+        self.service = service
+        self.interfaces = interfaces
+        self.address = address
+        self.port = port
+
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts listening (joining the multicast group on every interface)."""
+
+        if self._thread is not None:
+            return
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(("", self.port))
+
+            for address in _interface_addresses(self.interfaces):
+                membership = socket.inet_aton(self.address) + socket.inet_aton(
+                    address or "0.0.0.0"
+                )
+                sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        except OSError:
+            sock.close()
+            raise
+
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(sock,), name="heos-ssdp-notify", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stops listening."""
+
+        self._stopped.set()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, sock):
+        with sock:
+            sock.settimeout(STOP_POLL_INTERVAL)
+
+            while not self._stopped.is_set():
+                try:
+                    data = sock.recv(2048)
+                except socket.timeout:
+                    continue
+                except OSError:
+                    logger.exception("Failed to receive SSDP message")
+                    self._stopped.wait(STOP_POLL_INTERVAL)
+                    continue
+
+                try:
+                    self._handle(data)
+                except Exception:  # pylint: disable=broad-except
+                    # Keep listening, one bad message (or callback) shouldn't
+                    # stop tracking devices for good.
+                    logger.exception("Failed to handle SSDP message %r", data)
+
+    def _handle(self, data: bytes):
+        try:
+            notify = SSDPNotify.from_bytes(data)
+        except ValueError:
+            # Ignore searches and anything that isn't a NOTIFY message.
+            return
+
+        if self.service is None or notify.nt == self.service:
+            self.callback(notify)
+
+
 # Example:
 # import ssdp
 # ssdp.discover("roku:ecp")
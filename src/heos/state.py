@@ -0,0 +1,134 @@
+import threading
+from typing import Any, Dict
+
+
+class StateCache:
+    """
+    In-memory cache of player and group state, kept up to date by an EventListener.
+
+    The cache only serves values while it is active, which is the case as long
+    as a listener is subscribed to change events from the device. Without
+    events we cannot tell whether cached values are still accurate, in which
+    case reads fall through to the device.
+
+    Values read from a device are stored with the `version` of the cache at
+    the time the read was sent. They are dropped if a change (e.g. an event)
+    came in for the same player or group in the mean time, as the value that
+    was read may already be outdated.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = False
+        self._version = 0
+        self._cleared = 0
+
+        # Cached values and versions at which they last changed, by kind and id.
+        self._values: Dict[str, Dict[int, Dict[str, Any]]] = {"player": {}, "group": {}}
+        self._changed: Dict[str, Dict[int, int]] = {"player": {}, "group": {}}
+
+    @property
+    def active(self) -> bool:
+        """Whether the cache is being kept up to date by change events."""
+        return self._active
+
+    @property
+    def version(self) -> int:
+        """Version of the cache, which is increased by every (pushed) change."""
+        return self._version
+
+    def activate(self):
+        """Marks the cache as active (e.g. after subscribing to change events)."""
+        self._active = True
+
+    def deactivate(self):
+        """Marks the cache as inactive, dropping all values as they may go stale."""
+
+        with self._lock:
+            self._active = False
+            self._clear("player")
+            self._clear("group")
+
+    def get_player(self, pid: int, key: str) -> Any:
+        """Returns a cached player value, or None if not (reliably) known."""
+        return self._get("player", int(pid), key)
+
+    def update_player(self, pid: int, since: int = None, **values):
+        """
+        Updates cached values for the given player.
+
+        Values that were read from the device should be given the `version`
+        of the cache from before the read was sent as `since`.
+        """
+        self._update("player", int(pid), values, since)
+
+    def invalidate_player(self, pid: int, *keys: str):
+        """Drops the given (or all if none given) cached values for a player."""
+        self._invalidate("player", int(pid), keys)
+
+    def invalidate_players(self):
+        """Drops all cached player values (e.g. after players have changed)."""
+
+        with self._lock:
+            self._clear("player")
+
+    def get_group(self, gid: int, key: str) -> Any:
+        """Returns a cached group value, or None if not (reliably) known."""
+        return self._get("group", int(gid), key)
+
+    def update_group(self, gid: int, since: int = None, **values):
+        """Updates cached values for the given group (see update_player)."""
+        self._update("group", int(gid), values, since)
+
+    def invalidate_group(self, gid: int, *keys: str):
+        """Drops the given (or all if none given) cached values for a group."""
+        self._invalidate("group", int(gid), keys)
+
+    def invalidate_groups(self):
+        """Drops all cached group values (e.g. after groups have changed)."""
+
+        with self._lock:
+            self._clear("group")
+
+    def _get(self, kind, id_, key):
+        if not self._active:
+            return None
+        return self._values[kind].get(id_, {}).get(key)
+
+    def _update(self, kind, id_, values, since):
+        if not self._active:
+            return
+
+        with self._lock:
+            changed = self._changed[kind]
+
+            if since is not None and (
+                self._cleared > since or changed.get(id_, 0) > since
+            ):
+                # Changed whilst the values were being read.
+                return
+
+            self._values[kind].setdefault(id_, {}).update(values)
+
+            if since is None:
+                # Changes pushed by the device supersede reads in flight.
+                self._version += 1
+                changed[id_] = self._version
+
+    def _invalidate(self, kind, id_, keys):
+        with self._lock:
+            self._version += 1
+            self._changed[kind][id_] = self._version
+
+            values = self._values[kind]
+            if not keys:
+                values.pop(id_, None)
+            else:
+                for key in keys:
+                    values.get(id_, {}).pop(key, None)
+
+    def _clear(self, kind):
+        self._version += 1
+        self._cleared = self._version
+        self._values[kind].clear()
+        self._changed[kind].clear()
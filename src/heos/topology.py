@@ -0,0 +1,127 @@
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from ._compat import SLOTS
+
+
+@dataclass(frozen=True, **SLOTS)
+class GroupInfo:
+    """Membership of a player group (using player ids)."""
+
+    id: int
+    name: str
+    leader: int
+    members: Tuple[int, ...]
+
+    @property
+    def players(self) -> Tuple[int, ...]:
+        """Ids of all players in the group, starting with the leader."""
+        return (self.leader,) + self.members
+
+    @classmethod
+    def from_payload(cls, entry: Dict[str, Any]):
+        """Builds an instance from an entry of a group/get_groups response."""
+
+        leader, members = None, []
+        for player in entry["players"]:
+            if player["role"] == "leader":
+                leader = int(player["pid"])
+            else:
+                members.append(int(player["pid"]))
+
+        return cls(
+            id=int(entry["gid"]),
+            name=entry["name"],
+            leader=leader,
+            members=tuple(members),
+        )
+
+
+class Topology:
+    """
+    In-memory index of the players and groups in a HEOS system.
+
+    Maps player names to ids (and back), players to the group they are in and
+    groups to their leader and members, so that group operations can resolve
+    their leader without querying the device. The index is updated
+    incrementally: only groups that were added, removed or changed are
+    touched when new group info (e.g. after a groups_changed event) comes in.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pids: Dict[str, int] = {}
+        self._names: Dict[int, str] = {}
+        self._groups: Dict[int, GroupInfo] = {}
+        self._player_groups: Dict[int, int] = {}
+
+    @property
+    def groups(self) -> List[GroupInfo]:
+        """Known groups."""
+        return list(self._groups.values())
+
+    def pid_of(self, name: str) -> Optional[int]:
+        """Id of the player with the given name (if known)."""
+        return self._pids.get(name)
+
+    def name_of(self, pid: int) -> Optional[str]:
+        """Name of the player with the given id (if known)."""
+        return self._names.get(int(pid))
+
+    def group(self, gid: int) -> Optional[GroupInfo]:
+        """Membership of the given group (if known)."""
+        return self._groups.get(int(gid))
+
+    def group_of(self, pid: int) -> Optional[GroupInfo]:
+        """Group that the given player is in (if any)."""
+
+        gid = self._player_groups.get(int(pid))
+        return self._groups.get(gid) if gid is not None else None
+
+    def leader_of(self, gid: int) -> Optional[int]:
+        """Id of the leader of the given group (if known)."""
+
+        group = self._groups.get(int(gid))
+        return group.leader if group is not None else None
+
+    def set_players(self, players: Iterable[Tuple[str, int]]):
+        """Replaces the known players, given as (name, pid) pairs."""
+
+        with self._lock:
+            self._pids = {name: int(pid) for name, pid in players}
+            self._names = {pid: name for name, pid in self._pids.items()}
+
+    def set_groups(self, groups: Iterable[GroupInfo]) -> Tuple[Set[int], ...]:
+        """
+        Updates the index to the given (complete) set of groups.
+
+        Returns the ids of groups that were added, removed and changed.
+        """
+
+        groups = {group.id: group for group in groups}
+
+        with self._lock:
+            added = groups.keys() - self._groups.keys()
+            removed = self._groups.keys() - groups.keys()
+            changed = {
+                gid
+                for gid in groups.keys() & self._groups.keys()
+                if groups[gid] != self._groups[gid]
+            }
+
+            for gid in removed | changed:
+                for pid in self._groups.pop(gid).players:
+                    if self._player_groups.get(pid) == gid:
+                        del self._player_groups[pid]
+
+            for gid in added | changed:
+                group = self._groups[gid] = groups[gid]
+                for pid in group.players:
+                    self._player_groups[pid] = gid
+
+        return added, removed, changed
+
+    def update_from_payload(self, payload: List[Dict[str, Any]]):
+        """Updates the index from the payload of a group/get_groups response."""
+        return self.set_groups(GroupInfo.from_payload(entry) for entry in payload)
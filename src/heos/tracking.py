@@ -0,0 +1,94 @@
+import threading
+from typing import Dict, Iterable, Set
+
+from . import ssdp
+
+
+class DeviceTracker:
+    """
+    Keeps the entries of a registry up to date using SSDP announcements.
+
+    Listens (passively) for the ssdp:alive and ssdp:byebye messages that HEOS
+    devices multicast when they join or leave the network:
+
+    - Announcements from known hosts renew the entries of their players,
+      without any network traffic.
+    - Announcements from unknown hosts (new devices, or devices that changed
+      address) update the registry from that device, in the background.
+    - Goodbyes expire the entries of the host (and let commands fail over to
+      other devices), after which the registry is revalidated in the background.
+    """
+
+    def __init__(self, registry, interfaces: Iterable[str] = None, port: int = 1900):
+        self.registry = registry
+
+        self._listener = ssdp.NotifyListener(
+            self._handle_notify,
+            service=registry.HEOS_URN,
+            interfaces=interfaces,
+            port=port,
+        )
+
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, str] = {}
+        self._refreshing: Set[str] = set()
+
+    def start(self):
+        """Starts tracking devices in a background thread."""
+        self._listener.start()
+
+    def stop(self):
+        """Stops tracking devices."""
+        self._listener.stop()
+
+    def _handle_notify(self, notify: ssdp.SSDPNotify):
+        with self._lock:
+            previous = self._hosts.pop(notify.usn, None)
+            host = notify.host or previous
+
+            if notify.alive and host is not None:
+                self._hosts[notify.usn] = host
+
+        if host is None:
+            return
+
+        if not notify.alive:
+            self._expire(host)
+        elif host in self.registry.hosts and previous in (None, host):
+            self.registry.renew(
+                host, max_age=int(notify.cache) if notify.cache else None
+            )
+            if self.registry.failover is not None:
+                self.registry.failover.mark_healthy(host)
+        else:
+            if previous is not None:
+                self.registry.expire(previous)
+            self._refresh_in_background(host)
+
+    def _expire(self, host):
+        if self.registry.failover is not None:
+            # Also sends commands for players on this host to other devices.
+            self.registry.failover.mark_failed(host)
+        else:
+            self.registry.expire(host)
+            self.registry.revalidate_in_background()
+
+    def _refresh_in_background(self, host):
+        with self._lock:
+            if host in self._refreshing:
+                return
+            self._refreshing.add(host)
+
+        threading.Thread(
+            target=self._refresh, args=(host,), name="heos-refresh", daemon=True
+        ).start()
+
+    def _refresh(self, host):
+        try:
+            self.registry.refresh_from(host)
+        except (OSError, EOFError, ValueError, KeyError):
+            # Device isn't ready (yet), we'll try again on its next announcement.
+            pass
+        finally:
+            with self._lock:
+                self._refreshing.discard(host)
@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from heos.pool import ConnectionPool
+from heos.registry import Registry
+from heos.simulator import Simulator
+
+
+class SimulatorTestCase(unittest.TestCase):
+    """Test case running a simulated HEOS system (see heos.simulator)."""
+
+    n_devices = 2
+
+    def setUp(self):
+        self.simulator = Simulator(n_devices=self.n_devices, ssdp=False)
+        self.simulator.start()
+        self.addCleanup(self.simulator.stop)
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.file_path = os.path.join(directory.name, ".heos")
+
+    def make_registry(self, expires: float = None, **kwargs) -> Registry:
+        """
+        Returns a registry for the simulated players, without discovering them.
+
+        The players are written to the registry's cache file, expiring at the
+        given time (default: in an hour).
+        """
+
+        if expires is None:
+            expires = time.time() + 3600
+
+        write_cache(self.file_path, self.simulator, expires=expires)
+
+        kwargs.setdefault("pool", ConnectionPool())
+        return Registry(file_path=self.file_path, **kwargs)
+
+
+def write_cache(file_path: str, simulator: Simulator, expires: float):
+    """Writes a registry cache file for the players of a simulator."""
+
+    players = {
+        player.name: {
+            "name": player.name,
+            "model": player.model,
+            "host": player.ip,
+            "id": player.pid,
+            "max_age": 180,
+            "expires": expires,
+        }
+        for player in simulator.players.values()
+    }
+
+    names = {player.pid: player.name for player in simulator.players.values()}
+    groups = {
+        group.name: {
+            "name": group.name,
+            "id": group.gid,
+            "leader": names[group.leader],
+            "members": [names[pid] for pid in group.members],
+        }
+        for group in simulator.groups.values()
+    }
+
+    with open(file_path, "w") as file_:
+        json.dump({"version": 1, "players": players, "groups": groups}, file_)
@@ -0,0 +1,129 @@
+import asyncio
+import unittest
+from collections import deque
+
+from heos.aio import AsyncClient
+from heos.client import Response
+
+from .helpers import SimulatorTestCase
+
+
+def _response(command, message, result="success"):
+    return Response(command=command, result=result, message=message, payload=None)
+
+
+class MatchTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.client = AsyncClient("127.0.0.1")
+
+    def _wait_for(self, command, **params):
+        future = self.loop.create_future()
+        expected = {key: str(value) for key, value in params.items()}
+        self.client._pending.setdefault(command, deque()).append((expected, future))
+        return future
+
+    def test_matches_by_params(self):
+        first = self._wait_for("player/get_volume", pid=1)
+        second = self._wait_for("player/get_volume", pid=2)
+
+        response = _response("player/get_volume", "pid=2&level=10")
+        self.assertIs(self.client._match(response), second)
+        self.assertEqual(self.client.in_flight, 1)
+
+        response = _response("player/get_volume", "pid=1&level=20")
+        self.assertIs(self.client._match(response), first)
+
+    def test_matches_responses_without_params_in_order(self):
+        first = self._wait_for("player/set_volume", pid=1, level=10)
+        self._wait_for("player/set_volume", pid=2, level=10)
+
+        response = _response("player/set_volume", "eid=2&text=Invalid", "fail")
+        self.assertIs(self.client._match(response), first)
+
+    def test_drops_conflicting_responses(self):
+        # A late response to a command that timed out doesn't belong to
+        # another command that is still waiting.
+        timed_out = self._wait_for("player/get_volume", pid=1)
+        timed_out.cancel()
+        waiting = self._wait_for("player/get_volume", pid=2)
+
+        response = _response("player/get_volume", "pid=1&level=11")
+        self.assertIsNone(self.client._match(response))
+        self.assertFalse(waiting.done())
+
+    def test_drops_done_commands(self):
+        waiting = self._wait_for("player/get_volume", pid=1)
+        for pid in range(2, 5):
+            self._wait_for("player/get_volume", pid=pid).cancel()
+
+        response = _response("player/get_volume", "pid=1&level=11")
+        self.assertIs(self.client._match(response), waiting)
+        self.assertEqual(self.client.in_flight, 0)
+
+
+class AsyncClientTest(SimulatorTestCase):
+    def test_matches_concurrent_commands(self):
+        self.simulator.players[1000].volume = 10
+        self.simulator.players[1001].volume = 30
+
+        async def _main():
+            async with AsyncClient("127.0.0.1", timeout=5) as client:
+                return await asyncio.gather(
+                    *(
+                        client.send_command("player/get_volume", {"pid": pid})
+                        for pid in [1000, 1001] * 10
+                    )
+                )
+
+        responses = asyncio.run(_main())
+
+        levels = [response.message_fields["level"] for response in responses]
+        self.assertEqual(levels, ["10", "30"] * 10)
+
+    def test_fails_pending_commands_on_garbage(self):
+        # Stall the device, so that the command is still pending.
+        self.simulator.latency = 1.0
+
+        async def _main():
+            async with AsyncClient("127.0.0.1", timeout=5) as client:
+                command = asyncio.ensure_future(
+                    client.send_command("player/get_volume", {"pid": 1000})
+                )
+                await asyncio.sleep(0.1)
+                client._reader.feed_data(b"garbage\r\n")
+                await command
+
+        # The command fails with the parse error, rather than hanging.
+        with self.assertRaises(ValueError):
+            asyncio.run(_main())
+
+    def test_dispatches_events(self):
+        async def _main():
+            events = []
+
+            async with AsyncClient("127.0.0.1", timeout=5) as client:
+                client.add_event_handler(lambda event: 1 / 0)
+                client.add_event_handler(events.append)
+
+                await client.send_command(
+                    "system/register_for_change_events", {"enable": "on"}
+                )
+                await client.send_command(
+                    "player/set_volume", {"pid": 1000, "level": 5}
+                )
+
+                # Events are still dispatched after a failing handler.
+                for _ in range(50):
+                    if events:
+                        break
+                    await asyncio.sleep(0.01)
+
+                return events, client.connected
+
+        with self.assertLogs("heos.aio", level="ERROR"):
+            events, connected = asyncio.run(_main())
+
+        self.assertEqual(events[0].command, "event/player_volume_changed")
+        self.assertTrue(connected)
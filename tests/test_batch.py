@@ -0,0 +1,168 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from heos.batch import Operation, parse_operations, run_batch
+
+
+class FakeTarget:
+    """Player that takes `latency` seconds per command."""
+
+    def __init__(self, name, host, latency=0.0, hang=None):
+        self.name = name
+        self.host = host
+        self.latency = latency
+        self.hang = hang
+        self.level = 0
+
+    @property
+    def volume(self):
+        return self.level
+
+    @volume.setter
+    def volume(self, value):
+        time.sleep(self.latency)
+        self.level = value
+
+    def play(self):
+        if self.hang is not None:
+            self.hang.wait()
+        time.sleep(self.latency)
+        return self.name
+
+    def fail(self):
+        raise ValueError(f"{self.name} failed")
+
+
+class FakeRegistry:
+    def __init__(self, targets, max_per_host=2):
+        self.players = {target.name: target for target in targets}
+        self.groups = {}
+        self.pool = SimpleNamespace(max_per_host=max_per_host)
+
+
+class RunBatchTest(unittest.TestCase):
+    def setUp(self):
+        # Released at the end of each test, so that hung threads exit.
+        self.hang = threading.Event()
+        self.addCleanup(self.hang.set)
+
+    def test_reports_results_and_errors(self):
+        kitchen = FakeTarget("Kitchen", "127.0.0.1")
+        kitchen.level = 15
+        registry = FakeRegistry([kitchen, FakeTarget("Den", "127.0.0.2")])
+
+        operations = [
+            Operation("player", "Den", "volume", 20),
+            Operation("player", "Kitchen", "volume"),
+            Operation("player", "Kitchen", "fail"),
+            Operation("player", "Attic", "play"),
+            Operation("player", "Kitchen", "_private"),
+        ]
+        results = {result.index: result for result in run_batch(registry, operations)}
+
+        self.assertEqual(len(results), 5)
+        self.assertTrue(results[0].ok)
+        self.assertEqual(registry.players["Den"].level, 20)
+        self.assertEqual(results[1].to_dict()["value"], 15)
+        self.assertEqual(results[2].to_dict()["error"], "Kitchen failed")
+        self.assertEqual(results[3].to_dict()["error"], "Unknown player 'Attic'")
+        self.assertEqual(results[3].to_dict()["error_type"], "KeyError")
+        self.assertIsInstance(results[4].error, ValueError)
+
+    def test_does_not_hold_up_other_hosts(self):
+        registry = FakeRegistry(
+            [
+                FakeTarget("Busy", "127.0.0.1", latency=0.2),
+                FakeTarget("Idle", "127.0.0.2", latency=0.2),
+            ]
+        )
+        operations = [Operation("player", "Busy", "play")] * 20
+        operations.append(Operation("player", "Idle", "play"))
+
+        started = time.monotonic()
+        for result in run_batch(registry, operations, concurrency=8):
+            if result.operation.name == "Idle":
+                elapsed = time.monotonic() - started
+                break
+
+        # The operation on the idle host isn't queued behind the busy host.
+        self.assertLess(elapsed, 0.35)
+
+    def test_limits_operations_per_host(self):
+        target = FakeTarget("Kitchen", "127.0.0.1", latency=0.1)
+        registry = FakeRegistry([target], max_per_host=2)
+
+        started = time.monotonic()
+        results = list(
+            run_batch(registry, [Operation("player", "Kitchen", "play")] * 4)
+        )
+
+        self.assertEqual(len(results), 4)
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+
+    def test_times_out_per_operation(self):
+        registry = FakeRegistry(
+            [
+                FakeTarget("Hung", "127.0.0.1", hang=self.hang),
+                FakeTarget("Slow", "127.0.0.2", latency=0.3),
+            ],
+            max_per_host=1,
+        )
+        operations = [
+            Operation("player", "Hung", "play"),
+            Operation("player", "Hung", "volume", 10),
+            Operation("player", "Slow", "play"),
+        ]
+
+        results = {
+            result.index: result
+            for result in run_batch(registry, operations, timeout=0.2)
+        }
+
+        # Only the hung operation times out. Its slot is freed for the next
+        # operation on the same host, whereas the other host isn't affected.
+        self.assertIsInstance(results[0].error, TimeoutError)
+        self.assertTrue(results[1].ok)
+        self.assertIsInstance(results[2].error, TimeoutError)
+
+        results = list(run_batch(registry, operations[2:], timeout=1.0))
+        self.assertTrue(results[0].ok)
+
+    def test_times_out_in_total(self):
+        registry = FakeRegistry(
+            [FakeTarget("Hung", "127.0.0.1", hang=self.hang)], max_per_host=1
+        )
+        operations = [Operation("player", "Hung", "play")] * 3
+
+        started = time.monotonic()
+        results = list(run_batch(registry, operations, total_timeout=0.2))
+
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual([result.index for result in results], [0, 1, 2])
+        self.assertTrue(
+            all(isinstance(result.error, TimeoutError) for result in results)
+        )
+
+
+class ParseOperationsTest(unittest.TestCase):
+    def test_parses_json_lines_and_lists(self):
+        expected = [
+            Operation("player", "Kitchen", "volume", 20),
+            Operation("group", "Downstairs", "pause"),
+        ]
+        lines = (
+            '{"player": "Kitchen", "action": "volume", "value": 20}\n\n'
+            '{"group": "Downstairs", "action": "pause"}\n'
+        )
+
+        self.assertEqual(parse_operations(lines), expected)
+        self.assertEqual(
+            parse_operations("[" + ",".join(lines.split("\n")[::2]) + "]"), expected
+        )
+        self.assertEqual(parse_operations(" "), [])
+
+    def test_requires_target(self):
+        with self.assertRaises(ValueError):
+            parse_operations('{"action": "pause"}')
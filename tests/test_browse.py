@@ -0,0 +1,73 @@
+import unittest
+
+from heos.browse import Browser, Paged
+from heos.pool import ConnectionPool
+
+from .helpers import SimulatorTestCase
+
+
+class PagedTest(unittest.TestCase):
+    def setUp(self):
+        self.items = [{"name": str(idx)} for idx in range(25)]
+        self.ranges = []
+
+    def _fetch(self, start, end):
+        self.ranges.append((start, end))
+        return self.items[start : end + 1], len(self.items)
+
+    def test_fetches_pages(self):
+        for prefetch in (True, False):
+            self.ranges.clear()
+            paged = Paged(self._fetch, page_size=10, prefetch=prefetch)
+
+            self.assertEqual(list(paged), self.items)
+            self.assertEqual(self.ranges, [(0, 9), (10, 19), (20, 29)])
+
+    def test_fetches_without_count(self):
+        def _fetch(start, end):
+            return self.items[start : end + 1], None
+
+        self.assertEqual(list(Paged(_fetch, page_size=5)), self.items)
+
+    def test_fetches_lazily(self):
+        paged = Paged(self._fetch, page_size=10, prefetch=False)
+
+        iterator = iter(paged)
+        self.assertEqual(next(iterator), {"name": "0"})
+        self.assertEqual(self.ranges, [(0, 9)])
+
+    def test_rejects_empty_pages(self):
+        with self.assertRaises(ValueError):
+            Paged(self._fetch, page_size=0)
+
+
+class BrowserTest(SimulatorTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.simulator.sources = [{"name": "Local Music", "sid": 1024}]
+        self.simulator.containers[(1024, None)] = [
+            {"name": f"Album {idx}", "cid": str(idx)} for idx in range(30)
+        ]
+
+        pool = ConnectionPool()
+        self.addCleanup(pool.close)
+        self.browser = Browser("127.0.0.1", pool=pool)
+
+    def test_browses_sources(self):
+        self.assertEqual(self.browser.sources, self.simulator.sources)
+
+        items = list(self.browser.browse(1024, page_size=7))
+        self.assertEqual([item["cid"] for item in items], [str(i) for i in range(30)])
+
+    def test_searches_sources(self):
+        items = list(self.browser.search(1024, "album 2", criteria=1))
+        self.assertEqual(len(items), 11)
+
+    def test_lists_queue(self):
+        registry = self.make_registry(revalidate=False)
+        self.simulator.players[1000].queue = [{"qid": idx} for idx in range(250)]
+
+        queue = registry.players["Player 1"].get_queue(page_size=100)
+
+        self.assertEqual([item["qid"] for item in queue], list(range(250)))
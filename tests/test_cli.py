@@ -0,0 +1,76 @@
+import os
+import time
+import unittest
+
+from click.testing import CliRunner
+
+from heos.cli.main import cli
+from heos.cli.targets import select_targets
+
+from .helpers import SimulatorTestCase, write_cache
+
+
+class SelectTargetsTest(unittest.TestCase):
+    available = ["Living Room", "Living Room 2", "Kitchen"]
+
+    def test_selects_names_and_globs(self):
+        self.assertEqual(
+            select_targets("player", self.available, ["Kitchen", "Living*"], False),
+            ["Kitchen", "Living Room", "Living Room 2"],
+        )
+
+    def test_selects_each_target_once(self):
+        self.assertEqual(
+            select_targets("player", self.available, ["Living*", "*2"], False),
+            ["Living Room", "Living Room 2"],
+        )
+
+    def test_selects_all(self):
+        self.assertEqual(
+            select_targets("player", self.available, [], True), self.available
+        )
+
+    def test_exits_on_unknown_names(self):
+        with self.assertRaises(SystemExit):
+            select_targets("player", self.available, ["Attic*"], False)
+
+
+class PlayerCommandTest(SimulatorTestCase):
+    n_devices = 3
+
+    def setUp(self):
+        super().setUp()
+
+        # Use a local registry, even if a daemon is running.
+        runner = CliRunner(env={"HEOS_DAEMON_SOCKET": self.file_path + ".sock"})
+        cwd = os.getcwd()
+        os.chdir(os.path.dirname(self.file_path))
+        self.addCleanup(os.chdir, cwd)
+
+        write_cache(".heos", self.simulator, expires=time.time() + 3600)
+        self.invoke = lambda *args: runner.invoke(cli, args, catch_exceptions=False)
+
+    def test_controls_selected_players(self):
+        result = self.invoke("player", "--name", "Player [12]", "set-volume", "30")
+
+        self.assertEqual(result.exit_code, 0)
+        volumes = [player.volume for player in self.simulator.players.values()]
+        self.assertEqual(volumes, [30, 30, 20])
+
+    def test_controls_all_players(self):
+        result = self.invoke("player", "--all", "play")
+
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(
+            {player.play_state for player in self.simulator.players.values()},
+            {"play"},
+        )
+
+    def test_fails_if_any_player_fails(self):
+        def _fail(params):
+            raise ValueError("Failed to set mute")
+
+        self.simulator._cmd_player_set_mute = _fail
+
+        result = self.invoke("player", "--all", "--timeout", "5", "mute")
+        self.assertEqual(result.exit_code, 1)
@@ -0,0 +1,135 @@
+import socket
+import unittest
+
+from heos.client import Client, LineBuffer, Query, encode_query
+
+from .helpers import SimulatorTestCase
+
+
+class LineBufferTest(unittest.TestCase):
+    def test_splits_lines(self):
+        buffer = LineBuffer()
+        buffer.feed(b'{"heos": 1}\r\n{"heos": 2}\r\n')
+
+        self.assertEqual(buffer.next_line(), (LineBuffer.RESPONSE, b'{"heos": 1}'))
+        self.assertEqual(buffer.next_line(), (LineBuffer.RESPONSE, b'{"heos": 2}'))
+        self.assertIsNone(buffer.next_line())
+        self.assertEqual(len(buffer), 0)
+
+    def test_waits_for_complete_lines(self):
+        buffer = LineBuffer()
+
+        buffer.feed(b'{"heos": ')
+        self.assertIsNone(buffer.next_line())
+
+        # Line ending split in between chunks.
+        buffer.feed(b"1}\r")
+        self.assertIsNone(buffer.next_line())
+
+        buffer.feed(b"\n")
+        self.assertEqual(buffer.next_line(), (LineBuffer.RESPONSE, b'{"heos": 1}'))
+
+    def test_classifies_events(self):
+        buffer = LineBuffer()
+        buffer.feed(b'{"heos": {"command": "event/groups_changed"}}\r\n')
+
+        kind, _ = buffer.next_line()
+        self.assertEqual(kind, LineBuffer.EVENT)
+
+    def test_skips_interim_replies(self):
+        buffer = LineBuffer()
+        buffer.feed(
+            b'{"heos": {"command": "browse/browse", '
+            b'"message": "command under process"}}\r\n'
+            b'{"heos": {"command": "browse/browse", "result": "success"}}\r\n'
+        )
+
+        _, line = buffer.next_line()
+        self.assertIn(b'"result": "success"', line)
+        self.assertIsNone(buffer.next_line())
+
+    def test_keeps_lines_intact_when_compacting(self):
+        buffer = LineBuffer()
+        lines = [f'{{"heos": {idx}}}'.encode() for idx in range(100)]
+
+        for line in lines:
+            # Feed byte by byte, consuming lines in between.
+            received = []
+            for byte in line + b"\r\n":
+                buffer.feed(bytes([byte]))
+                next_line = buffer.next_line()
+                if next_line is not None:
+                    received.append(next_line[1])
+            self.assertEqual(received, [line])
+
+    def test_receives_from_sockets(self):
+        buffer = LineBuffer(chunk_size=16)
+        left, right = socket.socketpair()
+        self.addCleanup(left.close)
+        self.addCleanup(right.close)
+
+        lines = [
+            b'{"heos": %d, "payload": "%s"}' % (idx, b"x" * idx * 10)
+            for idx in range(10)
+        ]
+        right.sendall(b"\r\n".join(lines) + b"\r\n")
+        right.close()
+
+        received = []
+        while buffer.recv_from(left):
+            next_line = buffer.next_line()
+            while next_line is not None:
+                received.append(next_line[1])
+                next_line = buffer.next_line()
+
+        self.assertEqual(received, lines)
+        self.assertEqual(len(buffer), 0)
+
+    def test_hands_over_large_lines(self):
+        buffer = LineBuffer(chunk_size=16)
+        line = b'{"heos": 1, "payload": "%s"}' % (b"x" * 1000)
+
+        buffer.feed(line + b"\r\n")
+        _, received = buffer.next_line()
+        buffer.feed(b'{"heos": 2}\r\n')
+
+        self.assertEqual(received, line)
+        self.assertEqual(buffer.next_line(), (LineBuffer.RESPONSE, b'{"heos": 2}'))
+
+
+class QueryTest(unittest.TestCase):
+    def test_encodes_params(self):
+        self.assertEqual(
+            encode_query("player/set_volume", {"pid": 1, "level": 20}),
+            b"heos://player/set_volume?pid=1&level=20\n",
+        )
+
+    def test_keeps_lists_and_inputs(self):
+        query = Query("browse/play_input", {"pid": "1,2", "input": "inputs/aux_in_1"})
+        self.assertEqual(
+            str(query), "heos://browse/play_input?pid=1,2&input=inputs/aux_in_1"
+        )
+
+    def test_distinguishes_value_types(self):
+        self.assertNotEqual(
+            encode_query("system/x", {"value": True}),
+            encode_query("system/x", {"value": 1}),
+        )
+
+
+class ClientTest(SimulatorTestCase):
+    def test_sends_commands(self):
+        with Client("127.0.0.1", timeout=5) as client:
+            response = client.send_command(
+                "player/set_volume", {"pid": 1000, "level": 42}
+            )
+            response.raise_for_result()
+
+            response = client.send_command("player/get_volume", {"pid": 1000})
+            self.assertEqual(response.message_fields["level"], "42")
+
+    def test_raises_for_failed_commands(self):
+        with Client("127.0.0.1", timeout=5) as client:
+            response = client.send_command("player/get_volume", {"pid": 1})
+            with self.assertRaises(ValueError):
+                response.raise_for_result()
@@ -0,0 +1,182 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from itertools import islice
+from types import SimpleNamespace
+
+from heos.batch import Operation
+from heos.daemon import Daemon
+from heos.remote import DaemonClient
+
+from .helpers import SimulatorTestCase
+
+
+class FakePlayer:
+    def __init__(self, name):
+        self.name = name
+        self.pool = "pool"
+        self.level = 20
+
+    @property
+    def volume(self):
+        return self.level
+
+    @volume.setter
+    def volume(self, value):
+        self.level = value
+
+    @property
+    def id(self):
+        return 1000
+
+    @property
+    def info(self):
+        return object()
+
+    def play(self):
+        return "playing"
+
+
+class HandleRequestTest(unittest.TestCase):
+    def setUp(self):
+        self.player = FakePlayer("Kitchen")
+        registry = SimpleNamespace(players={"Kitchen": self.player}, groups={})
+        self.daemon = Daemon(registry, socket_path="unused")
+
+    def _request(self, **request):
+        lines = self.daemon.handle_request(json.dumps(request).encode())
+        return [json.loads(line) for line in lines]
+
+    def _player_request(self, **request):
+        (response,) = self._request(kind="player", name="Kitchen", **request)
+        return response
+
+    def test_accesses_properties_and_methods(self):
+        response = self._player_request(action="set", attr="volume", value=30)
+        self.assertEqual(response, {"ok": True, "result": None})
+        self.assertEqual(self.player.level, 30)
+
+        response = self._player_request(action="get", attr="volume")
+        self.assertEqual(response["result"], 30)
+
+        response = self._player_request(action="call", attr="play")
+        self.assertEqual(response["result"], "playing")
+
+    def test_rejects_other_attributes(self):
+        for action, attr in [
+            ("set", "pool"),
+            ("get", "pool"),
+            ("set", "id"),
+            ("set", "_private"),
+            ("call", "volume"),
+            ("call", "__init__"),
+        ]:
+            response = self._player_request(action=action, attr=attr, value="x")
+            self.assertFalse(response["ok"], (action, attr))
+            self.assertEqual(response["type"], "ValueError")
+
+        self.assertEqual(self.player.pool, "pool")
+
+    def test_reports_results_that_cant_be_encoded(self):
+        response = self._player_request(action="get", attr="info")
+
+        self.assertFalse(response["ok"])
+        self.assertEqual(response["type"], "TypeError")
+
+    def test_reports_unknown_targets(self):
+        (response,) = self._request(kind="player", name="Attic", action="get")
+
+        self.assertEqual(response["error"], "Attic")
+        self.assertEqual(response["type"], "KeyError")
+
+
+class DaemonTest(SimulatorTestCase):
+    def setUp(self):
+        super().setUp()
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        socket_path = os.path.join(directory.name, "heos.sock")
+
+        daemon = Daemon(
+            self.make_registry(revalidate=False),
+            socket_path=socket_path,
+            listen=False,
+            collect_metrics=False,
+        )
+        thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(daemon.shutdown)
+
+        for _ in range(100):
+            self.client = DaemonClient.connect(socket_path)
+            if self.client is not None:
+                break
+            time.sleep(0.01)
+        self.addCleanup(self.client.close)
+
+        self.registry = self.client.registry()
+
+    def test_controls_players(self):
+        player = self.registry.players["Player 2"]
+
+        player.volume = 42
+        self.assertEqual(self.simulator.players[1001].volume, 42)
+        self.assertEqual(player.volume, 42)
+
+        player.play()
+        self.assertEqual(player.play_state, "play")
+
+    def test_rejects_internal_attributes(self):
+        player = self.registry.players["Player 2"]
+
+        with self.assertRaises(ValueError):
+            player.pool = "x"
+
+        # The player still works.
+        self.assertEqual(player.volume, 20)
+
+    def test_streams_batch_results(self):
+        operations = [
+            Operation("player", "Player 1", "volume", 10),
+            Operation("player", "Player 2", "volume"),
+            Operation("player", "Attic", "volume"),
+        ]
+
+        results = sorted(self.registry.batch(operations), key=lambda r: r.index)
+
+        self.assertEqual([result.ok for result in results], [True, True, False])
+        self.assertEqual(results[1].value, 20)
+        self.assertIsInstance(results[2].error, KeyError)
+
+        # The connection can be used for the next request.
+        self.assertEqual(self.registry.players["Player 1"].volume, 10)
+
+    def test_streams_snapshots(self):
+        statuses = list(self.registry.snapshot(timeout=5))
+        self.assertEqual(len(statuses), 2)
+        self.assertTrue(all(status.ok for status in statuses))
+
+    def test_streams_queue_in_pages(self):
+        self.simulator.players[1000].queue = [
+            {"qid": qid, "song": f"Song {qid}"} for qid in range(1, 1001)
+        ]
+        # Fetching all 10 pages of the queue takes at least a second.
+        self.simulator.latency = 0.1
+
+        started = time.monotonic()
+        queue = self.registry.players["Player 1"].queue
+        self.assertEqual([item["qid"] for item in islice(queue, 3)], [1, 2, 3])
+
+        # The first items are sent as soon as the first page was fetched.
+        self.assertLess(time.monotonic() - started, 0.6)
+
+        # The connection is closed after abandoning the stream, so use a new one.
+        client = DaemonClient.connect(self.client._sock.getpeername())
+        self.addCleanup(client.close)
+        items = list(client.registry().players["Player 1"].get_queue(500))
+        self.assertEqual(len(items), 1000)
@@ -0,0 +1,44 @@
+import time
+
+from heos.events import EventListener
+from heos.state import StateCache
+
+from .helpers import SimulatorTestCase
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out waiting for condition")
+        time.sleep(0.01)
+
+
+class EventListenerTest(SimulatorTestCase):
+    def test_updates_state(self):
+        state = StateCache()
+        listener = EventListener("127.0.0.1", state=state)
+        listener.start()
+        self.addCleanup(listener.stop)
+        wait_for(lambda: state.active)
+
+        registry = self.make_registry(revalidate=False, state=state)
+        registry.players["Player 2"].volume = 35
+
+        # Events from any device are seen by the listener.
+        wait_for(lambda: state.get_player(1001, "volume") == 35)
+        self.assertEqual(registry.players["Player 2"].volume, 35)
+
+    def test_tracks_renamed_players(self):
+        self.simulator.add_group("Downstairs", [1000, 1001])
+        registry = self.make_registry(revalidate=False)
+        listener = registry.listen()
+        self.addCleanup(listener.stop)
+        wait_for(lambda: registry.state.active)
+
+        self.simulator.rename_player(1001, "Kitchen")
+
+        wait_for(lambda: "Kitchen" in registry.players)
+        self.assertEqual(sorted(registry.players), ["Kitchen", "Player 1"])
+        self.assertEqual(registry._groups["Downstairs"].members, ["Kitchen"])
+        self.assertEqual(registry.groups["Downstairs"].leader_id, 1000)
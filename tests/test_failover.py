@@ -0,0 +1,61 @@
+import json
+import time
+from types import SimpleNamespace
+
+from heos.client import Query
+from heos.failover import Failover
+from heos.pool import PoolTimeoutError
+
+from .helpers import SimulatorTestCase
+
+
+class FailoverTest(SimulatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.registry = self.make_registry(revalidate=False)
+        self.addCleanup(self._wait_for_revalidation)
+
+    def _wait_for_revalidation(self):
+        # Failures are refreshed in the background, which writes the cache file.
+        thread = self.registry._revalidate_thread
+        if thread is not None:
+            thread.join(timeout=10)
+
+    def _move_player(self, name, host):
+        # As if the device got a new address since it was last seen.
+        with open(self.file_path) as file_:
+            config = json.load(file_)
+        config["players"][name]["host"] = host
+        with open(self.file_path, "w") as file_:
+            json.dump(config, file_)
+        self.registry.load()
+
+    def test_fails_over_to_other_hosts(self):
+        self._move_player("Player 2", "127.0.0.250")
+
+        self.registry.players["Player 2"].volume = 40
+
+        self.assertEqual(self.simulator.players[1001].volume, 40)
+        # The failed host is tried last for now.
+        self.assertEqual(self.registry.failover.hosts("127.0.0.250")[-1], "127.0.0.250")
+
+    def test_refreshes_failed_hosts(self):
+        self._move_player("Player 2", "127.0.0.250")
+
+        self.assertEqual(self.registry.players["Player 2"].volume, 20)
+
+        deadline = time.monotonic() + 5
+        while self.registry.players["Player 2"].host != "127.0.0.2":
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+
+    def test_does_not_fail_over_busy_hosts(self):
+        registry = SimpleNamespace(hosts=["a", "b"])
+        failover = Failover(registry)
+
+        def _send(host, query):
+            raise PoolTimeoutError(f"No free connection to {host}")
+
+        with self.assertRaises(PoolTimeoutError):
+            failover.send("a", Query("player/get_volume"), _send)
+        self.assertEqual(failover.hosts("a"), ["a", "b"])
@@ -0,0 +1,95 @@
+import unittest
+
+from heos import metrics
+from heos.client import Client
+from heos.metrics import CommandMetrics, MetricsRegistry
+
+from .helpers import SimulatorTestCase
+
+
+class MetricsRegistryTest(unittest.TestCase):
+    def test_aggregates_metrics(self):
+        registry = MetricsRegistry(buckets=(0.01, 0.1))
+        registry(
+            CommandMetrics(
+                host="127.0.0.1",
+                command="player/get_volume",
+                phases={"write": 0.001, "wait": 0.05},
+                bytes_out=30,
+                bytes_in=100,
+            )
+        )
+        registry(
+            CommandMetrics(
+                host="127.0.0.1",
+                command="player/get_volume",
+                phases={"wait": 0.5},
+                retries=1,
+                error=TimeoutError(),
+            )
+        )
+
+        exported = registry.to_dict()
+        (duration,) = [
+            histogram
+            for histogram in exported["histograms"]
+            if histogram["name"] == "heos_command_duration_seconds"
+        ]
+        self.assertEqual(duration["buckets"], {"0.01": 0, "0.1": 1, "+Inf": 2})
+        self.assertEqual(duration["count"], 2)
+
+        counters = {
+            (counter["name"], counter["labels"].get("error")): counter["value"]
+            for counter in exported["counters"]
+        }
+        self.assertEqual(counters[("heos_command_bytes_received_total", None)], 100)
+        self.assertEqual(counters[("heos_command_retries_total", None)], 1)
+        self.assertEqual(counters[("heos_command_errors_total", "TimeoutError")], 1)
+
+    def test_exports_prometheus_format(self):
+        registry = MetricsRegistry(buckets=(0.1,))
+        registry(
+            CommandMetrics(host="h", command='a"b', phases={"wait": 0.05}, bytes_out=1)
+        )
+
+        lines = registry.to_prometheus().splitlines()
+
+        self.assertIn("# TYPE heos_command_duration_seconds histogram", lines)
+        self.assertIn(
+            'heos_command_duration_seconds_bucket{command="a\\"b",le="0.1"} 1', lines
+        )
+        self.assertIn('heos_command_bytes_sent_total{command="a\\"b"} 1', lines)
+
+        registry.reset()
+        self.assertEqual(registry.to_dict(), {"histograms": [], "counters": []})
+
+
+class ClientMetricsTest(SimulatorTestCase):
+    def test_measures_commands(self):
+        measured = []
+
+        with Client("127.0.0.1", on_metrics=measured.append) as client:
+            client.send_command("player/get_volume", params={"pid": 1000})
+
+        (command,) = measured
+        self.assertEqual(command.command, "player/get_volume")
+        self.assertEqual(set(command.phases), {"connect", "write", "wait", "decode"})
+        self.assertGreater(command.bytes_in, 0)
+        self.assertIsNone(command.error)
+
+    def test_collects_in_default_registry(self):
+        registry = metrics.enable()
+        self.addCleanup(metrics.disable)
+        registry.reset()
+
+        with Client("127.0.0.1") as client:
+            client.send_command("player/get_volume", params={"pid": 1000})
+
+        metrics.disable()
+        with Client("127.0.0.1") as client:
+            client.send_command("player/get_volume", params={"pid": 1000})
+
+        self.assertIn(
+            'heos_command_duration_seconds_count{command="player/get_volume"} 1',
+            registry.to_prometheus().splitlines(),
+        )
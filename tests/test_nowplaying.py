@@ -0,0 +1,87 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from heos.nowplaying import ArtworkCache, NowPlayingCache, media_key
+
+
+class NowPlayingCacheTest(unittest.TestCase):
+    def test_identifies_media(self):
+        track = {"type": "song", "mid": "1", "qid": 2, "song": "A"}
+        self.assertEqual(media_key(track), media_key({**track, "song": "B"}))
+
+        station = {"type": "station", "mid": "1", "song": "A", "artist": "X"}
+        self.assertNotEqual(media_key(station), media_key({**station, "song": "B"}))
+        self.assertEqual(media_key(None), ())
+
+    def test_notifies_changes(self):
+        cache = NowPlayingCache(ttl=60)
+        changes = []
+        cache.add_callback(lambda pid, now_playing: changes.append(pid))
+
+        self.assertTrue(cache.update(1, {"mid": "1", "qid": 1}))
+        self.assertFalse(cache.update(1, {"mid": "1", "qid": 1, "album": "B"}))
+        self.assertTrue(cache.update(1, {"mid": "2", "qid": 2}))
+
+        self.assertEqual(changes, [1, 1])
+        self.assertEqual(cache.get(1), {"mid": "2", "qid": 2})
+
+        cache.invalidate(1)
+        self.assertIsNone(cache.get(1))
+        self.assertFalse(cache.update(1, {"mid": "2", "qid": 2}))
+
+    def test_only_detects_changes_without_ttl(self):
+        cache = NowPlayingCache(ttl=0)
+        cache.update(1, {"mid": "1"})
+        self.assertIsNone(cache.get(1))
+
+    def test_handles_missing_media(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = NowPlayingCache(artwork=ArtworkCache(directory))
+
+            self.assertTrue(cache.update(1, None))
+            self.assertIsNone(cache.artwork_path(1))
+
+
+class ArtworkCacheTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+        self.urls = []
+        for idx in range(3):
+            image = self.directory / f"image{idx}.jpg"
+            image.write_bytes(b"x" * 100)
+            self.urls.append(image.as_uri())
+
+    def test_fetches_images(self):
+        cache = ArtworkCache(str(self.directory / "artwork"))
+        self.assertIsNone(cache.cached(self.urls[0]))
+
+        path = cache.get(self.urls[0])
+
+        self.assertEqual(Path(path).read_bytes(), b"x" * 100)
+        self.assertEqual(cache.cached(self.urls[0]), path)
+
+    def test_evicts_least_recently_used(self):
+        cache = ArtworkCache(str(self.directory / "artwork"), max_entries=2)
+
+        first = cache.get(self.urls[0])
+        second = cache.get(self.urls[1])
+        os.utime(second, (time.time() - 60, time.time() - 60))
+
+        cache.get(self.urls[2])
+
+        self.assertTrue(os.path.exists(first))
+        self.assertFalse(os.path.exists(second))
+
+    def test_limits_size(self):
+        cache = ArtworkCache(str(self.directory / "artwork"), max_bytes=250)
+
+        for url in self.urls:
+            cache.get(url)
+
+        self.assertEqual(len(os.listdir(self.directory / "artwork")), 2)
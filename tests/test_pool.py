@@ -0,0 +1,51 @@
+import time
+
+from heos.pool import ConnectionPool, PoolTimeoutError
+
+from .helpers import SimulatorTestCase
+
+
+class ConnectionPoolTest(SimulatorTestCase):
+    def test_reuses_connections(self):
+        with ConnectionPool() as pool:
+            with pool.connection("127.0.0.1") as client:
+                client.send_command("system/heart_beat")
+            with pool.connection("127.0.0.1") as other:
+                self.assertIs(other, client)
+            with pool.connection("127.0.0.2") as other:
+                self.assertIsNot(other, client)
+
+    def test_limits_connections_per_host(self):
+        with ConnectionPool(max_per_host=1, acquire_timeout=0.1) as pool:
+            client = pool.acquire("127.0.0.1")
+
+            with self.assertRaises(PoolTimeoutError):
+                pool.acquire("127.0.0.1")
+
+            # Other hosts are unaffected.
+            pool.release(pool.acquire("127.0.0.2"))
+
+            pool.release(client)
+            self.assertIs(pool.acquire("127.0.0.1"), client)
+
+    def test_evicts_idle_connections(self):
+        with ConnectionPool(idle_timeout=0.05) as pool:
+            with pool.connection("127.0.0.1") as client:
+                client.send_command("system/heart_beat")
+
+            time.sleep(0.1)
+
+            with pool.connection("127.0.0.1") as other:
+                self.assertIsNot(other, client)
+            self.assertFalse(client.connected)
+
+    def test_discards_connections_on_error(self):
+        with ConnectionPool() as pool:
+            with self.assertRaises(RuntimeError):
+                with pool.connection("127.0.0.1") as client:
+                    client.send_command("system/heart_beat")
+                    raise RuntimeError()
+
+            self.assertFalse(client.connected)
+            with pool.connection("127.0.0.1") as other:
+                self.assertIsNot(other, client)
@@ -0,0 +1,72 @@
+import time
+import unittest
+
+from heos.ramp import Ramp
+
+
+class FakeTarget:
+    def __init__(self, id=1, volume=0, delay=0.0):
+        self.id = id
+        self.levels = []
+        self.delay = delay
+        self._volume = volume
+
+    @property
+    def volume(self):
+        return self._volume
+
+    @volume.setter
+    def volume(self, value):
+        time.sleep(self.delay)
+        self._volume = value
+        self.levels.append(value)
+
+
+class RampTest(unittest.TestCase):
+    def test_ramps_to_level(self):
+        target = FakeTarget(volume=10)
+
+        ramp = Ramp(target, 30, duration=0.3, interval=0.02).start()
+
+        self.assertTrue(ramp.wait(timeout=5))
+        self.assertEqual(target.volume, 30)
+        self.assertEqual(target.levels, sorted(set(target.levels)))
+        self.assertEqual(ramp.steps, len(target.levels))
+
+    def test_skips_steps_for_slow_devices(self):
+        target = FakeTarget(volume=0, delay=0.05)
+
+        start = time.monotonic()
+        ramp = Ramp(target, 100, duration=0.3, interval=0.01).start()
+        ramp.wait(timeout=5)
+
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(target.volume, 100)
+        self.assertGreater(ramp.skipped, 0)
+
+    def test_cancels_previous_ramp(self):
+        target = FakeTarget(volume=50)
+
+        first = Ramp(target, 0, duration=5).start()
+        second = Ramp(target, 50, duration=0).start()
+
+        self.assertTrue(first.wait(timeout=5))
+        self.assertTrue(first.cancelled)
+        self.assertTrue(second.wait(timeout=5))
+        self.assertFalse(second.cancelled)
+
+    def test_raises_errors(self):
+        class FailingTarget(FakeTarget):
+            @FakeTarget.volume.setter
+            def volume(self, value):
+                raise ConnectionError("Gone")
+
+        ramp = Ramp(FailingTarget(id=2), 20, duration=0).start()
+
+        with self.assertRaises(ConnectionError):
+            ramp.wait(timeout=5)
+
+    def test_validates_arguments(self):
+        for kwargs in [{"level": 101}, {"curve": "bounce"}, {"interval": 0}]:
+            with self.assertRaises(ValueError):
+                Ramp(FakeTarget(), **{"level": 50, "duration": 1, **kwargs})
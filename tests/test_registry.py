@@ -0,0 +1,113 @@
+import json
+import threading
+import time
+from unittest import mock
+
+from heos.registry import Registry
+
+from .helpers import SimulatorTestCase
+
+
+class RegistryTest(SimulatorTestCase):
+    def test_loads_players(self):
+        registry = self.make_registry(revalidate=False)
+
+        self.assertEqual(sorted(registry.players), ["Player 1", "Player 2"])
+        self.assertEqual(registry.hosts, ["127.0.0.1", "127.0.0.2"])
+        self.assertEqual(registry.expired, [])
+
+        registry.players["Player 2"].volume = 35
+        self.assertEqual(self.simulator.players[1001].volume, 35)
+
+    def test_saves_and_loads(self):
+        registry = self.make_registry(revalidate=False)
+        registry.expire("127.0.0.2")
+        registry.save()
+
+        loaded = Registry(file_path=self.file_path, revalidate=False)
+
+        self.assertEqual(loaded._players, registry._players)
+        self.assertEqual(loaded.expired, ["Player 2"])
+
+    def test_revalidates_expired_entries(self):
+        registry = self.make_registry(expires=time.time() - 1, revalidate=False)
+        self.assertEqual(len(registry.expired), 2)
+
+        self.simulator.players[1001].name = "Kitchen"
+        registry.revalidate(timeout=5)
+
+        self.assertEqual(registry.expired, [])
+        self.assertEqual(sorted(registry.players), ["Kitchen", "Player 1"])
+
+        with open(self.file_path) as file_:
+            self.assertIn("Kitchen", json.load(file_)["players"])
+
+    def test_revalidates_in_background(self):
+        self.make_registry(expires=time.time() - 1)
+
+        # Loading an expired registry starts revalidating it.
+        registry = Registry(file_path=self.file_path)
+        registry.revalidate_in_background().join(timeout=10)
+
+        self.assertEqual(registry.expired, [])
+
+    def test_keeps_stale_entries_if_offline(self):
+        registry = self.make_registry(expires=time.time() - 1, revalidate=False)
+        self.simulator.stop()
+
+        with mock.patch("heos.ssdp.iter_discover", return_value=[]):
+            with self.assertRaises(ConnectionError):
+                registry.revalidate(timeout=1)
+
+        self.assertEqual(sorted(registry.players), ["Player 1", "Player 2"])
+        with open(self.file_path) as file_:
+            self.assertEqual(len(json.load(file_)["players"]), 2)
+
+    def test_does_not_save_empty_discovery(self):
+        with mock.patch("heos.ssdp.iter_discover", return_value=[]):
+            registry = Registry(file_path=self.file_path)
+
+        self.assertEqual(registry.players, {})
+        with self.assertRaises(FileNotFoundError):
+            open(self.file_path)
+
+    def test_updates_groups(self):
+        registry = self.make_registry(revalidate=False)
+        self.assertEqual(registry.groups, {})
+
+        self.simulator.add_group("Downstairs", [1000, 1001])
+        groups = registry.refresh_groups()
+
+        self.assertEqual([group.name for group in groups], ["Downstairs"])
+        self.assertEqual(list(registry.groups), ["Downstairs"])
+        self.assertEqual(registry.groups["Downstairs"].leader.name, "Player 1")
+
+        registry.update_groups([])
+        self.assertEqual(registry.groups, {})
+        self.assertIsNone(registry.topology.group_of(1001))
+
+    def test_does_not_lose_updates_whilst_revalidating(self):
+        registry = self.make_registry(expires=time.time() - 1, revalidate=False)
+        self.simulator.latency = 0.2
+
+        thread = threading.Thread(target=registry.revalidate)
+        thread.start()
+        time.sleep(0.1)
+
+        # Expiring a host whilst revalidating waits for the revalidation.
+        registry.expire("127.0.0.2")
+        thread.join()
+
+        self.assertEqual(registry.expired, ["Player 2"])
+
+    def test_keeps_players_on_renewal(self):
+        registry = self.make_registry(revalidate=False)
+        player = registry.players["Player 1"]
+
+        registry.renew("127.0.0.1", max_age=60)
+        self.assertIs(registry.players["Player 1"], player)
+
+        registry.update_players(
+            [{"name": "Kitchen", "pid": 1000, "model": "HEOS 1", "ip": "127.0.0.1"}]
+        )
+        self.assertEqual(list(registry.players), ["Kitchen"])
@@ -0,0 +1,133 @@
+import time
+
+from heos.scene import Scene, apply_scene, plan_scene
+
+from .helpers import SimulatorTestCase
+
+
+class SceneTest(SimulatorTestCase):
+    n_devices = 3
+
+    def setUp(self):
+        super().setUp()
+        self.registry = self.make_registry(revalidate=False)
+
+    def test_plans_nothing_for_current_state(self):
+        scene = Scene.from_dict(
+            {"players": {"Player 1": {"volume": 20, "mute": False}}}
+        )
+        self.assertEqual(plan_scene(self.registry, scene), [[], [], []])
+
+    def test_plans_differences(self):
+        scene = Scene.from_dict(
+            {
+                "groups": [{"leader": "Player 1", "members": ["Player 2"]}],
+                "players": {
+                    "Player 1": {"volume": 30, "mute": False},
+                    "Player 3": {"play_state": "play"},
+                },
+            }
+        )
+
+        grouping, inputs, state = plan_scene(self.registry, scene)
+
+        self.assertEqual(
+            [(change.operation.action, change.operation.value) for change in grouping],
+            [("set_group", [1001])],
+        )
+        self.assertEqual([change.undo[0].name for change in grouping], ["Player 1"])
+        self.assertEqual(inputs, [])
+        self.assertEqual(
+            [(change.operation.name, change.operation.action) for change in state],
+            [("Player 1", "volume"), ("Player 3", "play")],
+        )
+        self.assertEqual(state[0].undo[0].value, 20)
+        self.assertEqual(state[1].undo[0].action, "stop")
+
+    def test_applies_scene(self):
+        scene = Scene.from_dict(
+            {
+                "groups": [{"leader": "Player 1", "members": ["Player 2"]}],
+                "players": {"Player 3": {"volume": 40}},
+            }
+        )
+
+        result = apply_scene(self.registry, scene)
+
+        self.assertTrue(result.ok)
+        self.assertEqual(self.simulator.players[1002].volume, 40)
+
+        (group,) = self.simulator.groups.values()
+        self.assertEqual((group.leader, group.members), (1000, [1001]))
+        self.assertEqual(self.registry.topology.group_of(1001).leader, 1000)
+
+        # Applying the scene again doesn't change anything.
+        self.assertEqual(apply_scene(self.registry, scene).results, [])
+
+    def test_groups_before_switching_inputs(self):
+        scene = Scene.from_dict(
+            {
+                "groups": [{"leader": "Player 1", "members": ["Player 2"]}],
+                "players": {"Player 1": {"input": "inputs/aux_in_1"}},
+            }
+        )
+
+        phases = plan_scene(self.registry, scene)
+        self.assertEqual(
+            [[change.operation.action for change in phase] for phase in phases],
+            [["set_group"], ["play_input"], []],
+        )
+
+        self.assertTrue(apply_scene(self.registry, scene).ok)
+        self.assertEqual(self.simulator.players[1000].play_state, "play")
+
+    def test_limits_reading_state(self):
+        self.simulator.latency = 1.0
+        scene = Scene.from_dict({"players": {"Player 1": {"volume": 50}}})
+
+        start = time.monotonic()
+        result = apply_scene(self.registry, scene, timeout=0.2)
+
+        self.assertLess(time.monotonic() - start, 0.9)
+        self.assertFalse(result.ok)
+
+        # Let the abandoned change complete, rather than leak into other tests.
+        deadline = time.monotonic() + 5
+        while self.simulator.players[1000].volume != 50:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+
+    def _fail_mute(self):
+        def _fail(params):
+            raise ValueError("Failed to set mute")
+
+        self.simulator._cmd_player_set_mute = _fail
+
+    def test_rolls_back_on_failure(self):
+        self._fail_mute()
+
+        scene = Scene.from_dict(
+            {"players": {"Player 1": {"volume": 50}, "Player 2": {"mute": True}}}
+        )
+
+        result = apply_scene(self.registry, scene)
+
+        self.assertFalse(result.ok)
+        self.assertEqual(
+            [(res.operation.action, res.ok) for res in result.rollback],
+            [("volume", True)],
+        )
+        self.assertEqual(self.simulator.players[1000].volume, 20)
+
+    def test_keeps_changes_without_rollback(self):
+        self._fail_mute()
+
+        scene = Scene.from_dict(
+            {"players": {"Player 1": {"volume": 50}, "Player 2": {"mute": True}}}
+        )
+
+        result = apply_scene(self.registry, scene, rollback=False)
+
+        self.assertFalse(result.ok)
+        self.assertEqual(result.rollback, [])
+        self.assertEqual(self.simulator.players[1000].volume, 50)
@@ -0,0 +1,57 @@
+import threading
+
+from heos.client import Query
+from heos.pool import ConnectionPool
+from heos.scheduler import Scheduler
+
+from .helpers import SimulatorTestCase
+
+
+class SchedulerTest(SimulatorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.simulator.latency = 0.1
+
+        self.pool = ConnectionPool(max_per_host=8)
+        self.addCleanup(self.pool.close)
+        self.scheduler = Scheduler(self.pool)
+
+    def _run_concurrently(self, calls):
+        threads = [threading.Thread(target=call) for call in calls]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_coalesces_keyed_writes(self):
+        def _set_volume(level):
+            query = Query("player/set_volume", {"pid": 1000, "level": level})
+            key = ("player/set_volume", 1000)
+            return lambda: self.scheduler.send("127.0.0.1", query, key=key)
+
+        self._run_concurrently([_set_volume(level) for level in range(1, 11)])
+
+        # The first write is sent right away, the others are coalesced into
+        # a single write (with the latest level) after it finishes.
+        self.assertEqual(self.simulator.command_counts["player/set_volume"], 2)
+        self.assertEqual(self.simulator.players[1000].volume, 10)
+
+    def test_shares_reads(self):
+        responses = []
+
+        def _get_volume():
+            query = Query("player/get_volume", {"pid": 1000})
+            responses.append(self.scheduler.send("127.0.0.1", query))
+
+        self._run_concurrently([_get_volume] * 10)
+
+        self.assertEqual(self.simulator.command_counts["player/get_volume"], 1)
+        self.assertEqual(len(responses), 10)
+        self.assertEqual(len({id(response) for response in responses}), 1)
+
+    def test_sends_other_writes(self):
+        query = Query("player/set_play_state", {"pid": 1000, "state": "play"})
+
+        self._run_concurrently([lambda: self.scheduler.send("127.0.0.1", query)] * 3)
+
+        self.assertEqual(self.simulator.command_counts["player/set_play_state"], 3)
@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+from .helpers import SimulatorTestCase
+
+
+class SnapshotTest(SimulatorTestCase):
+    n_devices = 3
+
+    def setUp(self):
+        super().setUp()
+        self.registry = self.make_registry(revalidate=False)
+
+    def _stall(self, host, seconds):
+        respond = self.simulator._respond
+
+        async def _respond(writer, line):
+            if writer.get_extra_info("sockname")[0] == host:
+                await asyncio.sleep(seconds)
+            await respond(writer, line)
+
+        self.simulator._respond = _respond
+
+    def test_reads_all_players(self):
+        self.simulator.players[1001].volume = 35
+        self.simulator.players[1002].play_state = "play"
+
+        statuses = {status.name: status for status in self.registry.snapshot(timeout=5)}
+
+        self.assertEqual(sorted(statuses), ["Player 1", "Player 2", "Player 3"])
+        self.assertTrue(all(status.ok for status in statuses.values()))
+        self.assertEqual(statuses["Player 2"].volume, 35)
+        self.assertEqual(statuses["Player 3"].to_dict()["play_state"], "play")
+
+    def test_reads_given_players(self):
+        statuses = list(self.registry.snapshot(names=["Player 2"]))
+        self.assertEqual([status.name for status in statuses], ["Player 2"])
+
+    def test_yields_players_as_they_complete(self):
+        self._stall("127.0.0.2", 2.0)
+
+        started = time.monotonic()
+        statuses = self.registry.snapshot(timeout=0.5)
+
+        first = next(statuses)
+        self.assertNotEqual(first.name, "Player 2")
+        self.assertLess(time.monotonic() - started, 0.4)
+
+        rest = {status.name: status for status in statuses}
+        self.assertLess(time.monotonic() - started, 1.0)
+
+        # The stalled player is reported with the fields that timed out.
+        stalled = rest["Player 2"]
+        self.assertFalse(stalled.ok)
+        self.assertEqual(
+            list(stalled.errors), ["volume", "mute", "play_state", "now_playing"]
+        )
+        self.assertEqual(stalled.errors["volume"], "Timed out after 0.5 seconds")
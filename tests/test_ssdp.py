@@ -0,0 +1,124 @@
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from heos import ssdp
+from heos.ssdp import Interface, NotifyListener, SSDPNotify, SSDPResponse
+from heos.tracking import DeviceTracker
+
+URN = "urn:schemas-denon-com:device:ACT-Denon:1"
+
+
+def notify(nts="ssdp:alive", usn="uuid:1", host="10.0.0.1", max_age=1800):
+    lines = ["NOTIFY * HTTP/1.1", f"NT: {URN}", f"NTS: {nts}", f"USN: {usn}"]
+    if host is not None:
+        lines.append(f"LOCATION: http://{host}:60006/upnp/desc.xml")
+    if max_age is not None:
+        lines.append(f"CACHE-CONTROL: max-age={max_age}")
+    return "\r\n".join(lines + ["", ""]).encode()
+
+
+class MessageTest(unittest.TestCase):
+    def test_parses_responses(self):
+        response = SSDPResponse.from_bytes(
+            b"HTTP/1.1 200 OK\r\n"
+            b"CACHE-CONTROL: no-cache, max-age=120\r\n"
+            b"LOCATION: http://10.0.0.1:60006/upnp/desc.xml\r\n"
+            b"ST: " + URN.encode() + b"\r\n"
+            b"USN: uuid:1\r\n\r\n"
+        )
+
+        self.assertEqual((response.host, response.cache), ("10.0.0.1", "120"))
+
+    def test_parses_notifications(self):
+        alive = SSDPNotify.from_bytes(notify())
+        self.assertEqual(
+            (alive.alive, alive.host, alive.cache), (True, "10.0.0.1", "1800")
+        )
+
+        byebye = SSDPNotify.from_bytes(notify("ssdp:byebye", host=None, max_age=None))
+        self.assertEqual((byebye.alive, byebye.host, byebye.cache), (False, None, None))
+
+        with self.assertRaises(ValueError):
+            SSDPNotify.from_bytes(b"M-SEARCH * HTTP/1.1\r\n\r\n")
+
+
+class InterfaceTest(unittest.TestCase):
+    def test_resolves_interfaces(self):
+        interfaces = [Interface("eth0", "10.0.0.2"), Interface("wlan0", "10.0.1.2")]
+
+        with mock.patch.object(ssdp, "local_interfaces", return_value=interfaces):
+            self.assertEqual(ssdp._interface_addresses(None), ["10.0.0.2", "10.0.1.2"])
+            self.assertEqual(
+                ssdp._interface_addresses(["wlan0", "192.168.1.2"]),
+                ["10.0.1.2", "192.168.1.2"],
+            )
+            with self.assertRaises(ValueError):
+                ssdp._interface_addresses(["eth1"])
+
+    def test_falls_back_to_default_interface(self):
+        with mock.patch.object(ssdp, "local_interfaces", return_value=[]):
+            self.assertEqual(ssdp._interface_addresses(None), [None])
+
+    def test_lists_local_interfaces(self):
+        for interface in ssdp.local_interfaces():
+            self.assertNotEqual(interface.address, "127.0.0.1")
+
+
+class NotifyListenerTest(unittest.TestCase):
+    def test_filters_services(self):
+        received = []
+        listener = NotifyListener(received.append, service=URN)
+
+        listener._handle(notify())
+        listener._handle(notify().replace(URN.encode(), b"upnp:rootdevice"))
+        listener._handle(b"M-SEARCH * HTTP/1.1\r\n\r\n")
+
+        self.assertEqual([message.usn for message in received], ["uuid:1"])
+
+
+class DeviceTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.refreshed = threading.Event()
+
+        def _record(name):
+            return lambda *args, **kwargs: self.calls.append((name, *args))
+
+        def _refresh_from(host):
+            self.calls.append(("refresh_from", host))
+            self.refreshed.set()
+
+        self.registry = SimpleNamespace(
+            HEOS_URN=URN,
+            hosts=["10.0.0.1"],
+            failover=None,
+            renew=_record("renew"),
+            expire=_record("expire"),
+            revalidate_in_background=_record("revalidate"),
+            refresh_from=_refresh_from,
+        )
+        self.tracker = DeviceTracker(self.registry)
+
+    def _notify(self, *args, **kwargs):
+        self.tracker._handle_notify(SSDPNotify.from_bytes(notify(*args, **kwargs)))
+
+    def test_renews_known_hosts(self):
+        self._notify(max_age=60)
+        self.assertEqual(self.calls, [("renew", "10.0.0.1")])
+
+    def test_expires_hosts_saying_goodbye(self):
+        self._notify()
+        self._notify("ssdp:byebye", host=None)
+
+        self.assertEqual(self.calls[1:], [("expire", "10.0.0.1"), ("revalidate",)])
+
+    def test_refreshes_from_moved_devices(self):
+        self._notify()
+        self._notify(host="10.0.0.9")
+
+        self.assertTrue(self.refreshed.wait(timeout=5))
+        self.assertEqual(
+            self.calls[1:], [("expire", "10.0.0.1"), ("refresh_from", "10.0.0.9")]
+        )
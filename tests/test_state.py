@@ -0,0 +1,43 @@
+import unittest
+
+from heos.state import StateCache
+
+
+class StateCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.state = StateCache()
+        self.state.activate()
+
+    def test_serves_values_whilst_active(self):
+        self.state.update_player(1, volume=10)
+        self.assertEqual(self.state.get_player(1, "volume"), 10)
+
+        self.state.deactivate()
+        self.assertIsNone(self.state.get_player(1, "volume"))
+
+        self.state.update_player(1, volume=20)
+        self.state.activate()
+        self.assertIsNone(self.state.get_player(1, "volume"))
+
+    def test_drops_reads_superseded_by_events(self):
+        since = self.state.version
+        self.state.update_player(1, volume=30)
+        self.state.update_player(1, since=since, volume=10)
+
+        self.assertEqual(self.state.get_player(1, "volume"), 30)
+
+    def test_drops_reads_superseded_by_invalidation(self):
+        since = self.state.version
+        self.state.invalidate_groups()
+        self.state.update_group(1, since=since, volume=10)
+
+        self.assertIsNone(self.state.get_group(1, "volume"))
+
+    def test_keeps_concurrent_reads(self):
+        since = self.state.version
+        self.state.update_player(1, since=since, volume=10)
+        self.state.update_player(1, since=since, mute=True)
+        self.state.update_player(2, volume=30)
+
+        self.assertEqual(self.state.get_player(1, "volume"), 10)
+        self.assertEqual(self.state.get_player(1, "mute"), True)
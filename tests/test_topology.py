@@ -0,0 +1,58 @@
+import unittest
+
+from heos.topology import GroupInfo, Topology
+
+
+class TopologyTest(unittest.TestCase):
+    def setUp(self):
+        self.topology = Topology()
+        self.topology.set_players([("Kitchen", 1), ("Living Room", 2), ("Den", 3)])
+        self.topology.set_groups([GroupInfo(10, "Downstairs", 1, (2,))])
+
+    def test_resolves_players(self):
+        self.assertEqual(self.topology.pid_of("Den"), 3)
+        self.assertEqual(self.topology.name_of(3), "Den")
+        self.assertIsNone(self.topology.pid_of("Attic"))
+
+    def test_resolves_groups(self):
+        self.assertEqual(self.topology.group_of(2).id, 10)
+        self.assertIsNone(self.topology.group_of(3))
+        self.assertEqual(self.topology.leader_of(10), 1)
+        self.assertIsNone(self.topology.leader_of(11))
+
+    def test_returns_diff(self):
+        added, removed, changed = self.topology.set_groups(
+            [GroupInfo(10, "Downstairs", 1, (2, 3)), GroupInfo(11, "Empty", 4, ())]
+        )
+        self.assertEqual((added, removed, changed), ({11}, set(), {10}))
+        self.assertEqual(self.topology.group_of(3).id, 10)
+
+        added, removed, changed = self.topology.set_groups(
+            [GroupInfo(11, "Empty", 4, ())]
+        )
+        self.assertEqual((added, removed, changed), (set(), {10}, set()))
+        self.assertIsNone(self.topology.group_of(2))
+
+    def test_moves_players_between_groups(self):
+        self.topology.set_groups(
+            [GroupInfo(10, "Downstairs", 1, ()), GroupInfo(11, "Den", 3, (2,))]
+        )
+        self.assertEqual(self.topology.group_of(2).id, 11)
+        self.assertEqual(self.topology.group_of(1).id, 10)
+
+    def test_updates_from_payload(self):
+        payload = [
+            {
+                "name": "Upstairs",
+                "gid": "12",
+                "players": [
+                    {"name": "Den", "pid": "3", "role": "member"},
+                    {"name": "Kitchen", "pid": "1", "role": "leader"},
+                ],
+            }
+        ]
+
+        added, removed, _ = self.topology.update_from_payload(payload)
+
+        self.assertEqual((added, removed), ({12}, {10}))
+        self.assertEqual(self.topology.group(12).players, (1, 3))